@@ -0,0 +1,92 @@
+"""Analytics over one user's full history.
+
+Inserts ``--rows`` expenses (1M by default) for one user, then times
+``GET /users/<id>/analytics/`` cold (snapshot loaded from the database),
+warm (cached snapshot, metrics only) and after a write has invalidated
+the snapshot, and reports the snapshot's size.
+
+    python -m benchmarks.bench_analytics [--rows 1000000]
+"""
+
+import argparse
+import random
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+
+from benchmarks.utils import Timer, bench_app, create_user, login
+from src.extensions import db
+from src.models.categories import Category
+from src.models.expenses import Expense
+from src.models.rollups import DailyExpenseRollup
+from src.services.analytics import analytics_engine
+
+CHUNK_SIZE = 50_000
+CATEGORIES = 12
+DAYS = 3650
+
+
+def insert_history(user_id: int, category_ids: list[int], rows: int):
+    rng = random.Random(7)
+    start = datetime(2015, 1, 1)
+    for offset in range(0, rows, CHUNK_SIZE):
+        db.session.execute(
+            insert(Expense),
+            [
+                {
+                    "amount_minor": int(rng.lognormvariate(7, 1)),
+                    "currency": "USD",
+                    "category_id": rng.choice(category_ids),
+                    "user_id": user_id,
+                    "created_at": start
+                    + timedelta(seconds=rng.randrange(DAYS * 86400)),
+                }
+                for _ in range(min(CHUNK_SIZE, rows - offset))
+            ],
+        )
+    DailyExpenseRollup.rebuild(user_id)
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    with bench_app(BCRYPT_LOG_ROUNDS=4) as app:
+        user = create_user("analyst")
+        category_ids = [
+            Category.create({"name": f"C{i}", "user_id": user.id}).id
+            for i in range(CATEGORIES)
+        ]
+        with Timer() as timer:
+            insert_history(user.id, category_ids, args.rows)
+        print(f"inserted {args.rows:,} expenses in {timer.elapsed:.1f}s")
+
+        client = app.test_client()
+        headers = {"Authorization": f"Bearer {login(client, 'analyst')}"}
+        url = f"/users/{user.id}/analytics/"
+
+        def fetch(label: str, **query):
+            with Timer() as timer:
+                response = client.get(url, query_string=query, headers=headers)
+            assert response.status_code == 200, response.get_json()
+            print(f"{label:<12} {timer.elapsed * 1000:>8.0f} ms")
+
+        fetch("cold")
+        fetch("warm")
+        fetch("warm/iqr", outliers="iqr", window=30)
+        snapshot = analytics_engine.snapshot(user.id)
+        print(f"snapshot     {snapshot.nbytes / 2**20:>8.1f} MiB")
+        Expense.create(
+            {
+                "amount": 1,
+                "category_id": category_ids[0],
+                "user_id": user.id,
+            }
+        )
+        fetch("after write")
+
+
+if __name__ == "__main__":
+    main()
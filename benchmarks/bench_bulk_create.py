@@ -0,0 +1,58 @@
+"""Throughput of bulk expense creation vs. the single-item endpoint.
+
+Creates ``--rows`` expenses once through ``POST /users/<id>/expenses/``
+(one request and commit per expense) and once through
+``POST /users/<id>/expenses/bulk`` for each chunk size, and reports
+rows/sec.
+
+    python -m benchmarks.bench_bulk_create [--rows 2000]
+"""
+
+import argparse
+import time
+
+from benchmarks.utils import bench_app, create_user, login
+from src.models.categories import Category
+
+CHUNK_SIZES = (100, 500, 2000)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=2000)
+    args = parser.parse_args()
+
+    with bench_app(BCRYPT_LOG_ROUNDS=4) as app:
+        user = create_user("importer")
+        category = Category.create({"name": "Bench", "user_id": user.id})
+        client = app.test_client()
+        headers = {"Authorization": f"Bearer {login(client, 'importer')}"}
+        url = f"/users/{user.id}/expenses/"
+        items = [
+            {"amount": i / 100, "note": f"row {i}", "category_id": category.id}
+            for i in range(args.rows)
+        ]
+
+        started = time.perf_counter()
+        for item in items:
+            client.post(url, json=item, headers=headers)
+        single = args.rows / (time.perf_counter() - started)
+        print(f"{'single-item':<16} {single:>10,.0f} rows/s")
+
+        for chunk_size in CHUNK_SIZES:
+            app.config["BULK_INSERT_CHUNK_SIZE"] = chunk_size
+            started = time.perf_counter()
+            response = client.post(
+                url + "bulk", json={"items": items}, headers=headers
+            )
+            elapsed = time.perf_counter() - started
+            assert len(response.get_json()["created"]) == args.rows
+            rate = args.rows / elapsed
+            print(
+                f"{'bulk/' + str(chunk_size):<16} {rate:>10,.0f} rows/s "
+                f"({rate / single:.0f}x)"
+            )
+
+
+if __name__ == "__main__":
+    main()
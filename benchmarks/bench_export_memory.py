@@ -0,0 +1,102 @@
+"""Memory profile of the streaming expense export.
+
+Seeds one user with ``--rows`` expenses, streams
+``GET /users/<id>/expenses/export`` and samples the process RSS while the
+body is consumed. With the server-side cursor, RSS stays flat however far
+into the export the client gets.
+
+    python -m benchmarks.bench_export_memory [--rows 1000000] [--format csv]
+"""
+
+import argparse
+import os
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+
+from benchmarks.utils import bench_app, create_user, login
+from src.extensions import db
+from src.models.categories import Category
+from src.models.expenses import Expense
+
+SEED_BATCH = 10_000
+
+
+def rss_mb() -> float:
+    with open("/proc/self/statm") as statm:
+        pages = int(statm.read().split()[1])
+    return pages * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+
+
+def seed(user_id: int, category_id: int, rows: int):
+    start = datetime(2015, 1, 1)
+    for offset in range(0, rows, SEED_BATCH):
+        db.session.execute(
+            insert(Expense),
+            [
+                {
+                    "amount_minor": i % 5000,
+                    "note": f"expense {i}",
+                    "category_id": category_id,
+                    "user_id": user_id,
+                    "created_at": start + timedelta(minutes=i),
+                    "updated_at": start + timedelta(minutes=i),
+                }
+                for i in range(offset, min(offset + SEED_BATCH, rows))
+            ],
+        )
+        db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument(
+        "--format", choices=["ndjson", "csv"], default="ndjson"
+    )
+    args = parser.parse_args()
+
+    with bench_app(BCRYPT_LOG_ROUNDS=4) as app:
+        user = create_user("exporter")
+        category = Category.create({"name": "Bench", "user_id": user.id})
+        started = time.perf_counter()
+        seed(user.id, category.id, args.rows)
+        print(
+            f"seeded {args.rows} rows in {time.perf_counter() - started:.1f}s"
+        )
+
+        client = app.test_client()
+        token = login(client, "exporter")
+        db.session.remove()
+
+        baseline = rss_mb()
+        started = time.perf_counter()
+        response = client.get(
+            f"/users/{user.id}/expenses/export?format={args.format}",
+            headers={"Authorization": f"Bearer {token}"},
+            buffered=False,
+        )
+        sent = lines = 0
+        report_every = max(args.rows // 10, 1)
+        next_report = report_every
+        print(f"{'rows':>10} {'MiB sent':>9} {'RSS MiB':>8}")
+        for chunk in response.response:
+            sent += len(chunk)
+            lines += chunk.count(b"\n")
+            if lines >= next_report:
+                print(
+                    f"{lines:>10} {sent / 1024 / 1024:>9.1f} {rss_mb():>8.1f}"
+                )
+                next_report += report_every
+        response.close()
+        elapsed = time.perf_counter() - started
+        print(
+            f"exported {lines} lines in {elapsed:.1f}s "
+            f"({lines / elapsed:,.0f} rows/s); RSS before {baseline:.1f} MiB, "
+            f"after {rss_mb():.1f} MiB"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Rows/sec of the statement import pipeline.
+
+Writes a ``--rows`` line CSV statement to a temporary file and imports it
+with each chunk size, reporting rows/sec. ``--trace-memory`` also reports
+the peak traced memory (tracemalloc slows the run down considerably, so
+the rates are then not comparable). Set ``BENCH_DATABASE_URI`` to compare
+SQLite with Postgres.
+
+    python -m benchmarks.bench_import [--rows 100000] [--trace-memory]
+"""
+
+import argparse
+import os
+import tempfile
+import tracemalloc
+from datetime import datetime, timedelta
+
+from benchmarks.utils import Timer, bench_app, create_user
+from src.extensions import db
+from src.models.categories import Category
+from src.models.expenses import Expense
+from src.services.imports import import_expenses
+
+CHUNK_SIZES = (500, 1000, 5000)
+
+
+def write_statement(path: str, rows: int):
+    start = datetime(2020, 1, 1)
+    with open(path, "w", newline="") as f:
+        f.write("date,amount,description,category\n")
+        for i in range(rows):
+            created_at = (start + timedelta(minutes=i)).isoformat()
+            f.write(f"{created_at},{1 + i % 500 / 100:.2f},row {i},Bench\n")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--trace-memory", action="store_true")
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "statement.csv")
+    write_statement(path, args.rows)
+    with bench_app(BCRYPT_LOG_ROUNDS=4):
+        user = create_user("importer")
+        Category.create({"name": "Bench", "user_id": user.id})
+        print(f"{db.engine.dialect.name}, {args.rows:,} rows")
+        for chunk_size in CHUNK_SIZES:
+            db.session.execute(db.delete(Expense))
+            db.session.commit()
+            if args.trace_memory:
+                tracemalloc.start()
+            with Timer() as timer, open(path, newline="") as stream:
+                report = import_expenses(
+                    stream, "csv", user.id, chunk_size=chunk_size
+                )
+            assert report.imported == args.rows, report.as_dict()
+            line = (
+                f"chunk {chunk_size:<6} {args.rows / timer.elapsed:>10,.0f} "
+                "rows/s"
+            )
+            if args.trace_memory:
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                line += f"  peak {peak / 2**20:6.1f} MiB"
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
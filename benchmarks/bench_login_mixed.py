@@ -0,0 +1,112 @@
+"""Login vs. expense-list latency under a mixed load.
+
+Runs login threads and expense-list threads against one in-process app and
+reports p99 latencies for both, first with the hash pool effectively
+unbounded (every request hashes as soon as it arrives, like the old inline
+calls) and then with the bounded pool.
+
+    python -m benchmarks.bench_login_mixed [--seconds 10] [--logins 16]
+"""
+
+import argparse
+import threading
+import time
+from http import HTTPStatus
+
+from benchmarks.utils import bench_app, create_user, login, percentile
+from src.extensions import db
+from src.models.categories import Category
+from src.models.expenses import Expense
+
+
+def run(config: dict, seconds: float, login_threads: int, read_threads: int):
+    with bench_app(**config) as app:
+        user = create_user("reader")
+        category = Category.create({"name": "Bench", "user_id": user.id})
+        db.session.add_all(
+            Expense(amount=i, category_id=category.id, user_id=user.id)
+            for i in range(100)
+        )
+        db.session.commit()
+        create_user("burst")
+        client = app.test_client()
+        token = login(client, "reader")
+        url = f"/users/{user.id}/expenses/?limit=100"
+
+        latencies = {"login": [], "list": []}
+        rejected = [0]
+        stop = time.perf_counter() + seconds
+
+        def login_worker():
+            worker_client = app.test_client()
+            while time.perf_counter() < stop:
+                start = time.perf_counter()
+                response = worker_client.post(
+                    "/auth/login",
+                    json={"login": "burst", "password": "password123@AAA"},
+                )
+                elapsed = time.perf_counter() - start
+                if response.status_code == HTTPStatus.SERVICE_UNAVAILABLE:
+                    rejected[0] += 1
+                    time.sleep(0.01)
+                else:
+                    latencies["login"].append(elapsed)
+
+        def read_worker():
+            worker_client = app.test_client()
+            headers = {"Authorization": f"Bearer {token}"}
+            while time.perf_counter() < stop:
+                start = time.perf_counter()
+                worker_client.get(url, headers=headers)
+                latencies["list"].append(time.perf_counter() - start)
+
+        threads = [
+            threading.Thread(target=login_worker) for _ in range(login_threads)
+        ] + [threading.Thread(target=read_worker) for _ in range(read_threads)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return latencies, rejected[0]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--logins", type=int, default=16)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--rounds", type=int, default=12)
+    args = parser.parse_args()
+
+    scenarios = {
+        "unbounded": {
+            "PASSWORD_HASH_WORKERS": args.logins,
+            "PASSWORD_HASH_MAX_PENDING": args.logins,
+        },
+        "bounded": {
+            "PASSWORD_HASH_WORKERS": args.workers,
+            "PASSWORD_HASH_MAX_PENDING": args.workers,
+        },
+    }
+    print(
+        f"{'scenario':<10} {'logins':>7} {'503s':>6} "
+        f"{'login p99 ms':>13} {'list p99 ms':>12} {'lists':>7}"
+    )
+    for name, config in scenarios.items():
+        latencies, rejected = run(
+            {"BCRYPT_LOG_ROUNDS": args.rounds, **config},
+            args.seconds,
+            args.logins,
+            args.readers,
+        )
+        print(
+            f"{name:<10} {len(latencies['login']):>7} {rejected:>6} "
+            f"{percentile(latencies['login'], 99) * 1000:>13.1f} "
+            f"{percentile(latencies['list'], 99) * 1000:>12.1f} "
+            f"{len(latencies['list']):>7}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""ORM + marshmallow listing vs. the ``fields=`` row projection.
+
+For each page size, times ``Expense.filter`` dumped through
+``ExpenseSchema(many=True)`` against ``Expense.filter_rows`` serialized
+through the compiled serializer, both dumping ``id, amount,
+category_id, created_at``, and
+reports rows/sec and peak Python memory (tracemalloc).
+
+    python -m benchmarks.bench_projection [--repeat 5]
+"""
+
+import argparse
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+
+from benchmarks.utils import bench_app, create_user
+from src.extensions import db
+from src.models.categories import Category
+from src.models.expenses import Expense
+from src.schemas.compiled import compile_schema
+from src.schemas.expenses import ExpenseSchema
+
+PAGE_SIZES = (100, 1_000, 10_000)
+FIELDS = ["id", "amount", "category_id", "created_at"]
+COLUMNS = ["id", "amount_minor", "currency", "category_id", "created_at"]
+
+
+def orm_page(user_id: int, limit: int):
+    expenses = Expense.filter(user_id=user_id, limit=limit)
+    return ExpenseSchema(many=True, only=FIELDS).dump(expenses)
+
+
+def projected_page(user_id: int, limit: int):
+    rows = Expense.filter_rows(COLUMNS, user_id=user_id, limit=limit)
+    return compile_schema(ExpenseSchema, only=FIELDS).dump_many(rows)
+
+
+def measure(func, user_id: int, limit: int, repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        db.session.expunge_all()
+        started = time.perf_counter()
+        func(user_id, limit)
+        best = min(best, time.perf_counter() - started)
+    db.session.expunge_all()
+    tracemalloc.start()
+    func(user_id, limit)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    db.session.expunge_all()
+    return limit / best, peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with bench_app(BCRYPT_LOG_ROUNDS=4):
+        user = create_user("projector")
+        category = Category.create({"name": "Bench", "user_id": user.id})
+        start = datetime(2020, 1, 1)
+        db.session.execute(
+            insert(Expense),
+            [
+                {
+                    "amount_minor": i,
+                    "currency": "USD",
+                    "note": f"expense {i}",
+                    "category_id": category.id,
+                    "user_id": user.id,
+                    "created_at": start + timedelta(minutes=i),
+                    "updated_at": start + timedelta(minutes=i),
+                }
+                for i in range(max(PAGE_SIZES))
+            ],
+        )
+        db.session.commit()
+
+        print(
+            f"{'page':>6} {'orm rows/s':>12} {'orm KiB':>9} "
+            f"{'proj rows/s':>12} {'proj KiB':>9}"
+        )
+        for limit in PAGE_SIZES:
+            orm_rate, orm_peak = measure(orm_page, user.id, limit, args.repeat)
+            proj_rate, proj_peak = measure(
+                projected_page, user.id, limit, args.repeat
+            )
+            print(
+                f"{limit:>6} {orm_rate:>12,.0f} {orm_peak:>9,.0f} "
+                f"{proj_rate:>12,.0f} {proj_peak:>9,.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
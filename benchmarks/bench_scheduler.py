@@ -0,0 +1,73 @@
+"""Throughput of the recurring expense scheduler.
+
+Creates ``--rules`` monthly rules, a ``--due`` fraction of them due, and
+times one ``RecurringExpense.materialize_due`` run per batch size (the
+rules are reset in between), reporting rules and expenses per second.
+
+    python -m benchmarks.bench_scheduler [--rules 100000] [--due 0.5]
+"""
+
+import argparse
+from datetime import datetime
+
+from sqlalchemy import delete, insert, update
+
+from benchmarks.utils import Timer, bench_app, create_user
+from src.extensions import db
+from src.models.categories import Category
+from src.models.expenses import Expense
+from src.models.recurring import RecurringExpense
+from src.models.rollups import DailyExpenseRollup
+
+BATCH_SIZES = (500, 2000, 10000)
+NOW = datetime(2024, 6, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rules", type=int, default=100000)
+    parser.add_argument("--due", type=float, default=0.5)
+    args = parser.parse_args()
+
+    with bench_app():
+        user = create_user("scheduler")
+        category = Category.create({"name": "Bills", "user_id": user.id})
+        due = int(args.rules * args.due)
+        rows = [
+            {
+                "amount_minor": 1000 + i % 5000,
+                "currency": "USD",
+                "note": f"rule {i}",
+                "category_id": category.id,
+                "user_id": user.id,
+                "frequency": "monthly",
+                "starts_at": datetime(2024, 5 if i < due else 7, 1 + i % 28),
+                "next_run_at": datetime(2024, 5 if i < due else 7, 1 + i % 28),
+            }
+            for i in range(args.rules)
+        ]
+        db.session.execute(insert(RecurringExpense), rows)
+        db.session.commit()
+        print(f"{args.rules:,} rules, {due:,} due")
+
+        for batch_size in BATCH_SIZES:
+            with Timer() as timer:
+                ran, created = RecurringExpense.materialize_due(
+                    NOW, batch_size=batch_size
+                )
+            print(
+                f"batch/{batch_size:<6} {ran / timer.elapsed:>10,.0f} rules/s "
+                f"{created / timer.elapsed:>10,.0f} expenses/s"
+            )
+            db.session.execute(delete(Expense))
+            db.session.execute(delete(DailyExpenseRollup))
+            db.session.execute(
+                update(RecurringExpense).values(
+                    occurrences=0, next_run_at=RecurringExpense.starts_at
+                )
+            )
+            db.session.commit()
+
+
+if __name__ == "__main__":
+    main()
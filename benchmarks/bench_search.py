@@ -0,0 +1,112 @@
+"""Full-text ``q=`` search vs. ``ILIKE '%term%'`` over expense notes.
+
+Loads ``--rows`` expenses with generated notes, spread over ``--users``
+users, then times a page of one user's results (``--limit``) for each
+term through ``Expense.filter(q=...)``
+(FTS5 on SQLite, tsvector/GIN on Postgres via ``BENCH_DATABASE_URI``) and
+through the same list query filtered with ``note ILIKE '%term%'``.
+ILIKE has to scan until it fills a page, so it is slowest for rare terms;
+for very common ones it finds a page quickly but cannot rank, while the
+index ranks every match. The other users' notes should not matter: the
+index matches within the searched user's notes.
+
+    python -m benchmarks.bench_search [--rows 1000000] [--users 1]
+        [--limit 100]
+"""
+
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+
+from benchmarks.utils import bench_app, create_user, percentile
+from src.extensions import db
+from src.models.categories import Category
+from src.models.expenses import Expense
+from src.models.users import User
+
+WORDS = (
+    "coffee lunch dinner groceries rent taxi train parking cinema gym "
+    "books pharmacy bakery fuel insurance phone internet gift"
+).split()
+# Rare (1% of notes), common (1 in 6) and absent.
+TERMS = ("uber", "coffee", "zebra")
+BATCH = 10_000
+
+
+def load(owners: list[tuple[int, int]], rows: int):
+    """Insert ``rows`` expenses, round robin over ``(user_id,
+    category_id)`` pairs."""
+    rng = random.Random(42)
+    start = datetime(2015, 1, 1)
+    for offset in range(0, rows, BATCH):
+        batch = []
+        for i in range(offset, min(offset + BATCH, rows)):
+            user_id, category_id = owners[i % len(owners)]
+            words = rng.sample(WORDS, 3)
+            if rng.random() < 0.01:
+                words.append("uber")
+            batch.append(
+                {
+                    "amount_minor": 100,
+                    "note": " ".join(words),
+                    "category_id": category_id,
+                    "user_id": user_id,
+                    "created_at": start + timedelta(minutes=i),
+                }
+            )
+        db.session.execute(insert(Expense.__table__), batch)
+        db.session.commit()
+
+
+def timed(func, repeat: int = 5) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+        db.session.expunge_all()
+    return percentile(samples, 50) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=1)
+    parser.add_argument("--limit", type=int, default=100)
+    args = parser.parse_args()
+
+    with bench_app(BCRYPT_LOG_ROUNDS=4):
+        owners = []
+        for index in range(args.users):
+            owner = create_user(f"searcher{index}")
+            category = Category.create(
+                {"name": f"Bench {index}", "user_id": owner.id}
+            )
+            owners.append((owner.id, category.id))
+        load(owners, args.rows)
+        user = db.session.get(User, owners[0][0])
+        print(
+            f"{db.engine.dialect.name}, {args.rows:,} rows over "
+            f"{args.users} user(s)"
+        )
+        for term in TERMS:
+            fts = timed(
+                lambda: Expense.filter(user.id, q=term, limit=args.limit)
+            )
+            stmt = (
+                Expense.filter_stmt(user.id)
+                .where(Expense.note.ilike(f"%{term}%"))
+                .limit(args.limit)
+            )
+            ilike = timed(lambda: db.session.scalars(stmt).all())
+            print(
+                f"{term:<10} q= {fts:8.1f} ms   ILIKE {ilike:8.1f} ms "
+                f"({ilike / fts:.1f}x)"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Micro-benchmark of marshmallow vs. compiled list serialization.
+
+Dumps in-memory ``Expense`` and ``Category`` objects through
+``Schema(many=True).dump`` and through ``compile_schema(...).dump_many``,
+with and without the final JSON encoding, and reports objects/sec.
+
+    python -m benchmarks.bench_serializer [--rows 10000] [--repeat 5]
+"""
+
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+
+from src.models.categories import Category
+from src.models.expenses import Expense
+from src.schemas.categories import CategorySchema
+from src.schemas.compiled import compile_schema
+from src.schemas.expenses import ExpenseSchema
+
+
+def make_objects(rows: int):
+    start = datetime(2020, 1, 1)
+    expenses = [
+        Expense(
+            id=i,
+            amount=i / 100,
+            note=f"expense {i}",
+            category_id=i % 7,
+            user_id=1,
+            created_at=start + timedelta(minutes=i),
+            updated_at=start + timedelta(minutes=i),
+            deleted_at=None,
+        )
+        for i in range(rows)
+    ]
+    categories = [
+        Category(
+            id=i,
+            name=f"category {i}",
+            description=None,
+            color="#aabbcc",
+            user_id=1,
+            created_at=start,
+            updated_at=start,
+            deleted_at=None,
+        )
+        for i in range(rows)
+    ]
+    return expenses, categories
+
+
+def best_rate(func, objs, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(objs)
+        best = min(best, time.perf_counter() - started)
+    return len(objs) / best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    expenses, categories = make_objects(args.rows)
+    print(
+        f"{'schema':<10} {'stage':<12} {'marshmallow/s':>14} "
+        f"{'compiled/s':>12} {'speedup':>8}"
+    )
+    for name, schema_cls, objs in (
+        ("expense", ExpenseSchema, expenses),
+        ("category", CategorySchema, categories),
+    ):
+        schema = schema_cls(many=True)
+        compiled = compile_schema(schema_cls)
+        stages = {
+            "dump": (schema.dump, compiled.dump_many),
+            "dump+json": (
+                lambda o: json.dumps(schema.dump(o)),
+                lambda o: json.dumps(compiled.dump_many(o)),
+            ),
+        }
+        for stage, (slow, fast) in stages.items():
+            slow_rate = best_rate(slow, objs, args.repeat)
+            fast_rate = best_rate(fast, objs, args.repeat)
+            print(
+                f"{name:<10} {stage:<12} {slow_rate:>14,.0f} "
+                f"{fast_rate:>12,.0f} {fast_rate / slow_rate:>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
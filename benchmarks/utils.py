@@ -0,0 +1,72 @@
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+
+from src import create_app
+from src.extensions import db
+from src.models.users import User
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+@contextmanager
+def bench_app(**config):
+    """Yield an app on a throwaway SQLite file (or BENCH_DATABASE_URI)."""
+    tmpdir = tempfile.mkdtemp()
+    app = create_app(
+        {
+            "TESTING": True,
+            "SQLALCHEMY_DATABASE_URI": os.getenv(
+                "BENCH_DATABASE_URI",
+                f"sqlite:///{os.path.join(tmpdir, 'bench.sqlite')}",
+            ),
+            "JWT_SECRET_KEY": os.getenv(
+                "JWT_SECRET_KEY", "benchmark-secret-key-not-for-production"
+            ),
+            **config,
+        }
+    )
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def create_user(username: str, password: str = "password123@AAA") -> User:
+    user = User.create(
+        data={
+            "first_name": "Bench",
+            "last_name": "User",
+            "username": username,
+            "email": f"{username}@example.com",
+        },
+        commit=False,
+    )
+    user.set_password(password)
+    db.session.commit()
+    return user
+
+
+def login(client, username: str, password: str = "password123@AAA") -> str:
+    response = client.post(
+        "/auth/login", json={"login": username, "password": password}
+    )
+    return response.get_json()["access_token"]
+
+
+class Timer:
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
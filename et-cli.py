@@ -2,17 +2,52 @@
 import sys
 import subprocess
 
+USAGE = """Usage:
+  ./et-cli.py lint
+  ./et-cli.py import FILE --user USERNAME [--format csv|ofx]
+                          [--default-category ID] [--chunk-size N]
+  ./et-cli.py fx-load FILE [--base CURRENCY]
+  ./et-cli.py run-scheduler [--batch-size N]"""
+
 
 def run_lint():
     subprocess.run(["poetry", "run", "black", "."], check=True)
     subprocess.run(["poetry", "run", "flake8", "."], check=True)
 
 
+def run_import(args):
+    subprocess.run(
+        ["poetry", "run", "flask", "--app", "app", "import-expenses", *args],
+        check=True,
+    )
+
+
+def run_fx_load(args):
+    subprocess.run(
+        ["poetry", "run", "flask", "--app", "app", "fx", "load", *args],
+        check=True,
+    )
+
+
+def run_scheduler(args):
+    subprocess.run(
+        ["poetry", "run", "flask", "--app", "app", "run-scheduler", *args],
+        check=True,
+    )
+
+
 def main():
-    if len(sys.argv) != 2 or sys.argv[1] != "lint":
-        print("Usage: ./et-cli.py lint")
+    if len(sys.argv) == 2 and sys.argv[1] == "lint":
+        run_lint()
+    elif len(sys.argv) > 2 and sys.argv[1] == "import":
+        run_import(sys.argv[2:])
+    elif len(sys.argv) > 2 and sys.argv[1] == "fx-load":
+        run_fx_load(sys.argv[2:])
+    elif len(sys.argv) >= 2 and sys.argv[1] == "run-scheduler":
+        run_scheduler(sys.argv[2:])
+    else:
+        print(USAGE)
         sys.exit(1)
-    run_lint()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,126 @@
+"""partition expenses by created_at month (opt-in, Postgres only)
+
+Revision ID: 2c8f6a1d9b35
+Revises: 9e4b2d7c1a63
+Create Date: 2026-10-18 20:05:41.523117
+
+Runs only on Postgres with EXPENSES_PARTITIONING=1 in the environment and
+is a no-op otherwise (SQLite included). The flag is read once, when this
+revision is applied; a database already past it is not converted. Do not
+downgrade through this revision to change that: it would also undo every
+later migration and the data they hold.
+"""
+from datetime import date
+import os
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2c8f6a1d9b35'
+down_revision = '9e4b2d7c1a63'
+branch_labels = None
+depends_on = None
+
+# Monthly partitions created ahead of the current month.
+MONTHS_AHEAD = 3
+
+
+def _relkind(bind, name):
+    return bind.execute(
+        sa.text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:name)"),
+        {"name": name},
+    ).scalar()
+
+
+def _add_months(month, months):
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _copy_table(old, primary_key, partition_by=''):
+    """Create a new ``expenses`` shaped like the renamed table ``old``,
+    with its primary and foreign keys."""
+    op.execute(
+        f"ALTER TABLE {old} RENAME CONSTRAINT expenses_pkey TO {old}_pkey"
+    )
+    op.execute(
+        f"CREATE TABLE expenses (LIKE {old} INCLUDING DEFAULTS "
+        f"INCLUDING CONSTRAINTS) {partition_by}"
+    )
+    op.execute(
+        f"ALTER TABLE expenses ADD CONSTRAINT expenses_pkey "
+        f"PRIMARY KEY ({primary_key})"
+    )
+    op.execute(
+        "ALTER TABLE expenses ADD CONSTRAINT fk_expense_category_id "
+        "FOREIGN KEY (category_id) REFERENCES categories (id)"
+    )
+    op.execute(
+        "ALTER TABLE expenses ADD CONSTRAINT fk_expense_user_id "
+        "FOREIGN KEY (user_id) REFERENCES users (id)"
+    )
+
+
+def _finish_copy(old):
+    """Move the rows and the id sequence over, drop ``old`` and rebuild
+    the indexes."""
+    op.execute(f"INSERT INTO expenses SELECT * FROM {old}")
+    # The sequence is the only object outside ``old`` that depends on it
+    # (its partitions and constraints go with it); anything else makes
+    # the DROP fail rather than disappear silently.
+    op.execute("ALTER SEQUENCE expenses_id_seq OWNED BY expenses.id")
+    op.execute(f"DROP TABLE {old}")
+    op.create_index(
+        'idx_expense_created_at_id', 'expenses', ['created_at', 'id']
+    )
+    op.create_index(
+        'idx_expense_user_created_at_id',
+        'expenses',
+        ['user_id', sa.text('created_at DESC'), sa.text('id DESC')],
+        postgresql_where=sa.text('deleted_at IS NULL'),
+    )
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return
+    if os.getenv('EXPENSES_PARTITIONING', '').lower() not in ('1', 'true'):
+        return
+    if _relkind(bind, 'expenses') == 'p':
+        return
+
+    op.execute("ALTER TABLE expenses RENAME TO expenses_unpartitioned")
+    _copy_table(
+        'expenses_unpartitioned',
+        'id, created_at',
+        'PARTITION BY RANGE (created_at)',
+    )
+    oldest = bind.execute(
+        sa.text("SELECT min(created_at) FROM expenses_unpartitioned")
+    ).scalar()
+    month = (oldest.date() if oldest else date.today()).replace(day=1)
+    last = _add_months(date.today().replace(day=1), MONTHS_AHEAD)
+    while month <= last:
+        end = _add_months(month, 1)
+        op.execute(
+            f"CREATE TABLE expenses_p{month:%Y_%m} PARTITION OF expenses "
+            f"FOR VALUES FROM ('{month}') TO ('{end}')"
+        )
+        month = end
+    op.execute("CREATE TABLE expenses_default PARTITION OF expenses DEFAULT")
+    _finish_copy('expenses_unpartitioned')
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return
+    if _relkind(bind, 'expenses') != 'p':
+        return
+
+    op.execute("ALTER TABLE expenses RENAME TO expenses_partitioned")
+    _copy_table('expenses_partitioned', 'id')
+    _finish_copy('expenses_partitioned')
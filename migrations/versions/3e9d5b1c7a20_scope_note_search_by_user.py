@@ -0,0 +1,82 @@
+"""index the owner of each expense note for per-user search
+
+Revision ID: 3e9d5b1c7a20
+Revises: bae6f3852334
+Create Date: 2026-10-19 09:14:52.610384
+
+SQLite: the FTS5 table gains a user_id column (and its triggers keep it in
+step). Postgres: the generated tsvector gains a __u<user_id> lexeme.
+Either way a search is matched within one user's notes.
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '3e9d5b1c7a20'
+down_revision = 'bae6f3852334'
+branch_labels = None
+depends_on = None
+
+
+def _sqlite_index(columns):
+    values = ', '.join(f'new.{column}' for column in columns)
+    old_values = ', '.join(f'old.{column}' for column in columns)
+    names = ', '.join(columns)
+    op.execute("DROP TRIGGER IF EXISTS expenses_fts_au")
+    op.execute("DROP TRIGGER IF EXISTS expenses_fts_ad")
+    op.execute("DROP TRIGGER IF EXISTS expenses_fts_ai")
+    op.execute("DROP TABLE IF EXISTS expenses_fts")
+    op.execute(
+        f"CREATE VIRTUAL TABLE expenses_fts USING fts5("
+        f"{names}, content='expenses', content_rowid='id')"
+    )
+    op.execute(
+        "CREATE TRIGGER expenses_fts_ai AFTER INSERT ON expenses BEGIN "
+        f"INSERT INTO expenses_fts(rowid, {names}) "
+        f"VALUES (new.id, {values}); END"
+    )
+    op.execute(
+        "CREATE TRIGGER expenses_fts_ad AFTER DELETE ON expenses BEGIN "
+        f"INSERT INTO expenses_fts(expenses_fts, rowid, {names}) "
+        f"VALUES ('delete', old.id, {old_values}); END"
+    )
+    op.execute(
+        f"CREATE TRIGGER expenses_fts_au AFTER UPDATE OF {names} "
+        "ON expenses BEGIN "
+        f"INSERT INTO expenses_fts(expenses_fts, rowid, {names}) "
+        f"VALUES ('delete', old.id, {old_values}); "
+        f"INSERT INTO expenses_fts(rowid, {names}) "
+        f"VALUES (new.id, {values}); END"
+    )
+    op.execute("INSERT INTO expenses_fts(expenses_fts) VALUES ('rebuild')")
+
+
+def _postgres_index(expression):
+    op.execute("DROP INDEX idx_expense_note_tsv")
+    op.execute("ALTER TABLE expenses DROP COLUMN note_tsv")
+    op.execute(
+        "ALTER TABLE expenses ADD COLUMN note_tsv tsvector "
+        f"GENERATED ALWAYS AS ({expression}) STORED"
+    )
+    op.execute(
+        "CREATE INDEX idx_expense_note_tsv ON expenses USING gin (note_tsv)"
+    )
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        _sqlite_index(['note', 'user_id'])
+    elif dialect == 'postgresql':
+        _postgres_index(
+            "to_tsvector('simple', coalesce(note, '')) || "
+            "coalesce(('__u' || user_id::text)::tsvector, ''::tsvector)"
+        )
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        _sqlite_index(['note'])
+    elif dialect == 'postgresql':
+        _postgres_index("to_tsvector('simple', coalesce(note, ''))")
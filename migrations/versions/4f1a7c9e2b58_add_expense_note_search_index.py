@@ -0,0 +1,66 @@
+"""add full-text search index over expense notes
+
+Revision ID: 4f1a7c9e2b58
+Revises: 2c8f6a1d9b35
+Create Date: 2026-10-18 20:31:09.842615
+
+SQLite: external-content FTS5 table kept in sync by triggers.
+Postgres: generated tsvector column with a GIN index.
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '4f1a7c9e2b58'
+down_revision = '2c8f6a1d9b35'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE expenses_fts USING fts5("
+            "note, content='expenses', content_rowid='id')"
+        )
+        op.execute(
+            "CREATE TRIGGER expenses_fts_ai AFTER INSERT ON expenses BEGIN "
+            "INSERT INTO expenses_fts(rowid, note) VALUES (new.id, new.note); "
+            "END"
+        )
+        op.execute(
+            "CREATE TRIGGER expenses_fts_ad AFTER DELETE ON expenses BEGIN "
+            "INSERT INTO expenses_fts(expenses_fts, rowid, note) "
+            "VALUES ('delete', old.id, old.note); END"
+        )
+        op.execute(
+            "CREATE TRIGGER expenses_fts_au AFTER UPDATE OF note ON expenses "
+            "BEGIN "
+            "INSERT INTO expenses_fts(expenses_fts, rowid, note) "
+            "VALUES ('delete', old.id, old.note); "
+            "INSERT INTO expenses_fts(rowid, note) VALUES (new.id, new.note); "
+            "END"
+        )
+        op.execute("INSERT INTO expenses_fts(expenses_fts) VALUES ('rebuild')")
+    elif dialect == 'postgresql':
+        op.execute(
+            "ALTER TABLE expenses ADD COLUMN note_tsv tsvector "
+            "GENERATED ALWAYS AS (to_tsvector('simple', coalesce(note, ''))) "
+            "STORED"
+        )
+        op.execute(
+            "CREATE INDEX idx_expense_note_tsv ON expenses USING gin (note_tsv)"
+        )
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute("DROP TRIGGER expenses_fts_au")
+        op.execute("DROP TRIGGER expenses_fts_ad")
+        op.execute("DROP TRIGGER expenses_fts_ai")
+        op.execute("DROP TABLE expenses_fts")
+    elif dialect == 'postgresql':
+        op.execute("DROP INDEX idx_expense_note_tsv")
+        op.execute("ALTER TABLE expenses DROP COLUMN note_tsv")
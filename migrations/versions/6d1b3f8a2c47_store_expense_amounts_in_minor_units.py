@@ -0,0 +1,139 @@
+"""store expense amounts as integer minor units with a currency
+
+Revision ID: 6d1b3f8a2c47
+Revises: 4f1a7c9e2b58
+Create Date: 2026-10-18 21:02:17.306518
+
+Adds amount_minor and currency next to the float amount and backfills
+them in id ranges of MIGRATION_BATCH_SIZE rows, each committed on its
+own, so writers wait for one batch at most rather than the whole table.
+A final pass picks up rows written meanwhile, then amount is dropped and
+the daily rollups are rebuilt with integer totals per currency.
+
+Existing amounts are taken to be in DEFAULT_CURRENCY (USD unless set) and
+rounded to its minor unit.
+"""
+import os
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6d1b3f8a2c47'
+down_revision = '4f1a7c9e2b58'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = int(os.getenv('MIGRATION_BATCH_SIZE', 10000))
+CURRENCY = os.getenv('DEFAULT_CURRENCY', 'USD')
+# Currencies whose minor unit is not a hundredth; see src.services.money.
+EXPONENTS = {
+    'BHD': 3, 'CLP': 0, 'ISK': 0, 'JOD': 3, 'JPY': 0, 'KRW': 0,
+    'KWD': 3, 'OMR': 3, 'TND': 3, 'VND': 0,
+}
+BACKFILL = (
+    "UPDATE expenses SET amount_minor = CAST(ROUND(amount * {scale}) AS "
+    "BIGINT), currency = '{currency}' WHERE {where}"
+)
+
+
+def _rollups_table(total_column):
+    columns = [
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('category_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+    ]
+    keys = ['user_id', 'category_id', 'day']
+    if total_column == 'total_minor':
+        columns.append(sa.Column('currency', sa.String(length=3),
+                                 nullable=False))
+        columns.append(sa.Column('total_minor', sa.BigInteger(),
+                                 nullable=False))
+        keys.append('currency')
+    else:
+        columns.append(sa.Column('total', sa.Float(), nullable=False))
+    op.drop_table('daily_expense_rollups')
+    op.create_table('daily_expense_rollups',
+    *columns,
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['category_id'], ['categories.id'], name='fk_daily_expense_rollup_category_id'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], name='fk_daily_expense_rollup_user_id'),
+    sa.PrimaryKeyConstraint(*keys)
+    )
+
+
+def upgrade():
+    scale = 10 ** EXPONENTS.get(CURRENCY, 2)
+    # Constant defaults: no table rewrite on Postgres 11+.
+    op.add_column('expenses', sa.Column('amount_minor', sa.BigInteger(),
+                                        nullable=False, server_default='0'))
+    op.add_column('expenses', sa.Column('currency', sa.String(length=3),
+                                        nullable=False,
+                                        server_default=CURRENCY))
+
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        low, high = bind.execute(
+            sa.text("SELECT min(id), max(id) FROM expenses")
+        ).one()
+        for start in range(low or 0, (high or 0) + 1, BATCH_SIZE):
+            bind.execute(sa.text(BACKFILL.format(
+                scale=scale,
+                currency=CURRENCY,
+                where=f"id >= {start} AND id < {start + BATCH_SIZE}",
+            )))
+    # Rows inserted or changed by the old code while the batches ran.
+    op.execute(BACKFILL.format(
+        scale=scale,
+        currency=CURRENCY,
+        where=f"amount_minor <> CAST(ROUND(amount * {scale}) AS BIGINT)",
+    ))
+
+    # A plain DROP COLUMN (SQLite 3.35+) keeps the table, and with it the
+    # full-text triggers a batch recreate would lose.
+    op.drop_column('expenses', 'amount')
+    if op.get_bind().dialect.name == 'postgresql':
+        op.alter_column('expenses', 'amount_minor', server_default=None)
+        op.alter_column('expenses', 'currency', server_default=None)
+
+    _rollups_table('total_minor')
+    op.execute(
+        "INSERT INTO daily_expense_rollups "
+        "(user_id, category_id, day, currency, total_minor, count) "
+        "SELECT user_id, category_id, date(created_at), currency, "
+        "sum(amount_minor), count(*) "
+        "FROM expenses "
+        "WHERE deleted_at IS NULL AND user_id IS NOT NULL "
+        "GROUP BY user_id, category_id, date(created_at), currency"
+    )
+
+
+def downgrade():
+    op.add_column('expenses', sa.Column('amount', sa.Float(),
+                                        nullable=False, server_default='0'))
+    scale = sa.case(
+        {currency: 10 ** exponent
+         for currency, exponent in EXPONENTS.items()},
+        value=sa.column('currency'),
+        else_=100,
+    )
+    expenses = sa.table('expenses', sa.column('amount'),
+                        sa.column('amount_minor'), sa.column('currency'))
+    op.execute(expenses.update().values(
+        amount=sa.cast(expenses.c.amount_minor, sa.Float) / scale
+    ))
+    if op.get_bind().dialect.name == 'postgresql':
+        op.alter_column('expenses', 'amount', server_default=None)
+    op.drop_column('expenses', 'currency')
+    op.drop_column('expenses', 'amount_minor')
+
+    _rollups_table('total')
+    op.execute(
+        "INSERT INTO daily_expense_rollups "
+        "(user_id, category_id, day, total, count) "
+        "SELECT user_id, category_id, date(created_at), sum(amount), count(*) "
+        "FROM expenses "
+        "WHERE deleted_at IS NULL AND user_id IS NOT NULL "
+        "GROUP BY user_id, category_id, date(created_at)"
+    )
@@ -0,0 +1,50 @@
+"""create model indexes and expense list index
+
+Revision ID: 7d2f4b8c6e10
+Revises: 3c5e7a9d1f24
+Create Date: 2026-10-18 10:03:51.402117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7d2f4b8c6e10'
+down_revision = '3c5e7a9d1f24'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('categories', schema=None) as batch_op:
+        batch_op.create_index('idx_category_name', ['name'], unique=False)
+
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.create_index('idx_user_username', ['username'], unique=False)
+
+    with op.batch_alter_table('expenses', schema=None) as batch_op:
+        batch_op.create_index('idx_expense_created_at_id', ['created_at', 'id'], unique=False)
+
+    # Partial index serving the keyset-paginated list query.
+    op.create_index(
+        'idx_expense_user_created_at_id',
+        'expenses',
+        ['user_id', sa.text('created_at DESC'), sa.text('id DESC')],
+        unique=False,
+        postgresql_where=sa.text('deleted_at IS NULL'),
+        sqlite_where=sa.text('deleted_at IS NULL'),
+    )
+
+
+def downgrade():
+    op.drop_index('idx_expense_user_created_at_id', table_name='expenses')
+
+    with op.batch_alter_table('expenses', schema=None) as batch_op:
+        batch_op.drop_index('idx_expense_created_at_id')
+
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_index('idx_user_username')
+
+    with op.batch_alter_table('categories', schema=None) as batch_op:
+        batch_op.drop_index('idx_category_name')
@@ -0,0 +1,65 @@
+"""unique live usernames and emails, case-insensitively
+
+Revision ID: bae6f3852334
+Revises: 0a8d536f16f4
+Create Date: 2026-10-18 20:32:32.792463
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'bae6f3852334'
+down_revision = '0a8d536f16f4'
+branch_labels = None
+depends_on = None
+
+# The original UNIQUE constraints are unnamed: Postgres calls them
+# users_<column>_key, and on SQLite batch mode names them with this
+# convention so they can be dropped.
+SQLITE_NAMING = {'uq': 'uq_%(table_name)s_%(column_0_name)s'}
+COLUMNS = ('username', 'email')
+
+
+def _constraint_name(column, dialect):
+    if dialect == 'postgresql':
+        return f'users_{column}_key'
+    return f'uq_users_{column}'
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    with op.batch_alter_table(
+        'users', schema=None, naming_convention=SQLITE_NAMING
+    ) as batch_op:
+        batch_op.drop_index('idx_user_username')
+        for column in COLUMNS:
+            batch_op.drop_constraint(
+                _constraint_name(column, dialect), type_='unique'
+            )
+
+    for column in COLUMNS:
+        op.create_index(
+            f'uq_user_{column}_lower',
+            'users',
+            [sa.text(f'lower({column})')],
+            unique=True,
+            postgresql_where=sa.text('deleted_at IS NULL'),
+            sqlite_where=sa.text('deleted_at IS NULL'),
+        )
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    for column in COLUMNS:
+        op.drop_index(f'uq_user_{column}_lower', table_name='users')
+
+    with op.batch_alter_table(
+        'users', schema=None, naming_convention=SQLITE_NAMING
+    ) as batch_op:
+        for column in COLUMNS:
+            batch_op.create_unique_constraint(
+                _constraint_name(column, dialect), [column]
+            )
+        batch_op.create_index('idx_user_username', ['username'], unique=False)
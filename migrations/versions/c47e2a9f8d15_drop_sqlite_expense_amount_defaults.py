@@ -0,0 +1,71 @@
+"""drop the leftover amount_minor and currency defaults on SQLite
+
+Revision ID: c47e2a9f8d15
+Revises: 3e9d5b1c7a20
+Create Date: 2026-10-19 10:02:37.184920
+
+6d1b3f8a2c47 added both columns with temporary server defaults for the
+backfill and dropped them on Postgres only; SQLite kept them, so an
+insert without an amount stored 0 instead of failing. SQLite cannot alter
+a column, so expenses is recreated, and with it the full-text triggers.
+"""
+import os
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c47e2a9f8d15'
+down_revision = '3e9d5b1c7a20'
+branch_labels = None
+depends_on = None
+
+CURRENCY = os.getenv('DEFAULT_CURRENCY', 'USD')
+
+FTS_TRIGGERS = (
+    "CREATE TRIGGER expenses_fts_ai AFTER INSERT ON expenses BEGIN "
+    "INSERT INTO expenses_fts(rowid, note, user_id) "
+    "VALUES (new.id, new.note, new.user_id); END",
+    "CREATE TRIGGER expenses_fts_ad AFTER DELETE ON expenses BEGIN "
+    "INSERT INTO expenses_fts(expenses_fts, rowid, note, user_id) "
+    "VALUES ('delete', old.id, old.note, old.user_id); END",
+    "CREATE TRIGGER expenses_fts_au AFTER UPDATE OF note, user_id "
+    "ON expenses BEGIN "
+    "INSERT INTO expenses_fts(expenses_fts, rowid, note, user_id) "
+    "VALUES ('delete', old.id, old.note, old.user_id); "
+    "INSERT INTO expenses_fts(rowid, note, user_id) "
+    "VALUES (new.id, new.note, new.user_id); END",
+)
+
+
+def _set_defaults(amount_minor, currency):
+    # Reflection loses the name of the inline recurring_expense_id key and
+    # the DESC columns of the list index; both are restored.
+    with op.batch_alter_table(
+        'expenses',
+        recreate='always',
+        naming_convention={'fk': 'fk_expense_%(column_0_name)s'},
+    ) as batch_op:
+        batch_op.alter_column('amount_minor', server_default=amount_minor)
+        batch_op.alter_column('currency', server_default=currency)
+    op.drop_index('idx_expense_user_created_at_id', table_name='expenses')
+    op.create_index(
+        'idx_expense_user_created_at_id',
+        'expenses',
+        ['user_id', sa.text('created_at DESC'), sa.text('id DESC')],
+        sqlite_where=sa.text('deleted_at IS NULL'),
+    )
+    for trigger in FTS_TRIGGERS:
+        op.execute(trigger)
+    op.execute("INSERT INTO expenses_fts(expenses_fts) VALUES ('rebuild')")
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'sqlite':
+        _set_defaults(None, None)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'sqlite':
+        _set_defaults('0', CURRENCY)
@@ -0,0 +1,35 @@
+"""add a categories-only counter to user data versions
+
+Revision ID: e81f3a6c2d57
+Revises: 5b7e0c2d9f41
+Create Date: 2026-10-19 14:05:41.902316
+
+The category cache used to be checked against the user's data version,
+which every expense write moves on.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e81f3a6c2d57'
+down_revision = '5b7e0c2d9f41'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user_data_versions') as batch_op:
+        batch_op.add_column(
+            sa.Column(
+                'categories_version',
+                sa.Integer(),
+                server_default='0',
+                nullable=False,
+            )
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('user_data_versions') as batch_op:
+        batch_op.drop_column('categories_version')
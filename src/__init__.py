@@ -5,14 +5,22 @@ from datetime import timedelta
 from dotenv import load_dotenv
 from typing import Optional
 from marshmallow import ValidationError
-from datetime import datetime, timezone
 import os
 
+from src.commands import register_commands
 from src.extensions import db, migrate, bcrypt, jwt
+from src.models.unmanaged import include_object
 from src.views.expenses import blueprint as ExpenseBlueprint
 from src.views.auth import blueprint as AuthBlueprint
+from src.views.analytics import blueprint as AnalyticsBlueprint
+from src.views.budgets import blueprint as BudgetBlueprint
 from src.views.categories import blueprint as CategoryBlueprint
-from src.models.users import User
+from src.views.recurring import blueprint as RecurringExpenseBlueprint
+from src.services.analytics import analytics_engine
+from src.services.categories import category_cache
+from src.services.fx import fx_converter
+from src.services.identity import identity_resolver
+from src.services.passwords import password_hasher
 
 
 def error_message(
@@ -36,28 +44,17 @@ def register_jwt_handlers(jwt):
     def user_identity_lookup(user):
         return str(user.id)
 
+    @jwt.additional_claims_loader
+    def add_token_version_claim(user):
+        return {"ver": user.token_version}
+
     @jwt.user_lookup_loader
     def user_lookup_callback(_jwt_header, jwt_data):
-        identity = jwt_data["sub"]
-        user = User.get_by_id(int(identity))
-        if user and (not user.active or user.deleted_at is not None):
-            return None
-        return user
+        return identity_resolver.lookup_user(jwt_data)
 
     @jwt.token_in_blocklist_loader
     def check_if_token_revoked(jwt_header, jwt_payload):
-        user = db.session.execute(
-            User.select_with_deleted().where(
-                User.id == int(jwt_payload["sub"])
-            )
-        ).scalar_one_or_none()
-        if user is None or user.deleted_at is not None or not user.active:
-            return True
-        last_logout = user.last_logout_at
-        if last_logout is None:
-            return False
-        token_iat = datetime.fromtimestamp(jwt_payload["iat"], tz=timezone.utc)
-        return token_iat <= last_logout.replace(tzinfo=timezone.utc)
+        return identity_resolver.is_token_revoked(jwt_payload)
 
     @jwt.unauthorized_loader
     def handle_unauthorized_error(err):
@@ -100,7 +97,7 @@ def register_app_handlers(app):
             HTTPStatus.BAD_REQUEST,
             "Bad Request",
             "Invalid input data",
-            err.messages,
+            err.normalized_messages(),
         )
 
     @app.errorhandler(HTTPStatus.NOT_FOUND)
@@ -131,22 +128,49 @@ def create_app(config: Optional[dict] = None):
     app.config["JWT_REFRESH_COOKIE_PATH"] = "/auth/refresh"
     app.config["JWT_COOKIE_CSRF_PROTECT"] = True
 
+    app.config["BULK_INSERT_CHUNK_SIZE"] = int(
+        os.getenv("BULK_INSERT_CHUNK_SIZE", 500)
+    )
+    app.config["IMPORT_CHUNK_SIZE"] = int(os.getenv("IMPORT_CHUNK_SIZE", 1000))
+    app.config["SCHEDULER_BATCH_SIZE"] = int(
+        os.getenv("SCHEDULER_BATCH_SIZE", 1000)
+    )
+    app.config["SCHEDULER_MAX_OCCURRENCES"] = int(
+        os.getenv("SCHEDULER_MAX_OCCURRENCES", 100)
+    )
+    app.config["CATEGORY_REASSIGN_BATCH_SIZE"] = int(
+        os.getenv("CATEGORY_REASSIGN_BATCH_SIZE", 5000)
+    )
+    app.config["DEFAULT_CURRENCY"] = os.getenv("DEFAULT_CURRENCY", "USD")
+    # "float" keeps the original JSON numbers for amounts; clients can ask
+    # for exact strings per request with "X-Money-Format: decimal".
+    app.config["MONEY_FORMAT"] = os.getenv("MONEY_FORMAT", "float")
+
     if config:
         app.config.update(config)
 
     db.init_app(app)
-    migrate.init_app(app, db)
+    migrate.init_app(app, db, include_object=include_object)
     bcrypt.init_app(app)
     jwt.init_app(app)
+    identity_resolver.init_app(app)
+    fx_converter.init_app(app)
+    analytics_engine.init_app(app)
+    category_cache.init_app(app)
+    password_hasher.init_app(app)
 
     from src import models  # noqa: F401
 
     register_jwt_handlers(jwt)
     register_app_handlers(app)
+    register_commands(app)
 
     api = Api(app)
     api.register_blueprint(ExpenseBlueprint)
     api.register_blueprint(AuthBlueprint)
     api.register_blueprint(CategoryBlueprint)
+    api.register_blueprint(RecurringExpenseBlueprint)
+    api.register_blueprint(BudgetBlueprint)
+    api.register_blueprint(AnalyticsBlueprint)
 
     return app
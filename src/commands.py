@@ -0,0 +1,211 @@
+from datetime import date
+from pathlib import Path
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+from src.extensions import db
+from src.models.budgets import Budget
+from src.models.categories import Category
+from src.models.partitions import (
+    add_months,
+    ensure_partitions,
+    existing_partitions,
+    is_partitioned,
+)
+from src.models.recurring import RecurringExpense
+from src.models.rollups import DailyExpenseRollup
+from src.models.users import User
+from src.services.fx import FX_LOAD_CHUNK_SIZE, load_rates
+from src.services.imports import PARSERS, decode_lines, import_expenses
+from src.services.money import CURRENCY_EXPONENTS
+
+
+def _user_id(login):
+    if login is None:
+        return None
+    user = User.get_by_username_or_email(login)
+    if user is None:
+        raise click.BadParameter(f"No user {login!r}", param_hint="--user")
+    return user.id
+
+
+@click.command("import-expenses")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--user", "login", required=True, help="Username or email.")
+@click.option(
+    "--format",
+    "file_format",
+    type=click.Choice(sorted(PARSERS)),
+    help="Defaults to the file extension.",
+)
+@click.option(
+    "--default-category",
+    "default_category_id",
+    type=int,
+    help="Category id for rows without a known category.",
+)
+@click.option("--chunk-size", type=int, help="Defaults to IMPORT_CHUNK_SIZE.")
+def import_expenses_command(
+    path, login, file_format, default_category_id, chunk_size
+):
+    """Import a CSV or OFX bank statement as expenses."""
+    user_id = _user_id(login)
+    file_format = file_format or Path(path).suffix.lstrip(".").lower()
+    if file_format not in PARSERS:
+        raise click.BadParameter(
+            "Cannot tell the file format", param_hint="--format"
+        )
+    if default_category_id is not None and not Category.get_active_ids(
+        user_id, [default_category_id]
+    ):
+        raise click.BadParameter(
+            f"No category {default_category_id} for {login!r}",
+            param_hint="--default-category",
+        )
+
+    def progress(report):
+        click.echo(
+            f"{report.processed:,} lines: {report.imported:,} imported, "
+            f"{report.duplicates:,} duplicates, {report.error_count:,} errors",
+            err=True,
+        )
+
+    with open(path, "rb") as stream:
+        report = import_expenses(
+            decode_lines(stream),
+            file_format,
+            user_id,
+            default_category_id,
+            chunk_size=chunk_size,
+            on_progress=progress,
+        )
+    for error in report.errors:
+        click.echo(f"line {error['line']}: {error['messages']}")
+    if report.error_count > len(report.errors):
+        click.echo(
+            f"... {report.error_count - len(report.errors):,} more errors"
+        )
+    click.echo(
+        f"Imported {report.imported:,} of {report.processed:,} lines "
+        f"({report.duplicates:,} duplicates, {report.skipped:,} skipped, "
+        f"{report.error_count:,} errors)"
+    )
+
+
+rollups_cli = AppGroup("rollups", help="Maintain the daily expense rollups.")
+
+
+@rollups_cli.command("rebuild")
+@click.option("--user", "login", help="Only this username or email.")
+def rebuild_rollups_command(login):
+    """Recompute the rollups from the expenses, then budget spending from
+    the rollups."""
+    user_id = _user_id(login)
+    rows = DailyExpenseRollup.rebuild(user_id)
+    budget_rows = Budget.rebuild_spending(user_id)
+    db.session.commit()
+    click.echo(
+        f"Rebuilt {rows:,} rollup rows and {budget_rows:,} budget months"
+    )
+
+
+@rollups_cli.command("verify")
+@click.option("--user", "login", help="Only this username or email.")
+def verify_rollups_command(login):
+    """Compare the rollups with the expenses; exits 1 on any mismatch."""
+    mismatches = DailyExpenseRollup.verify(_user_id(login))
+    for user_id, category_id, day, currency, stored, expected in mismatches:
+        click.echo(
+            f"user {user_id} category {category_id} {day} {currency}: "
+            f"stored {stored}, expected {expected}"
+        )
+    if mismatches:
+        raise click.ClickException(
+            f"{len(mismatches):,} mismatched rollup rows; run rollups rebuild"
+        )
+    click.echo("Rollups match the expenses")
+
+
+partitions_cli = AppGroup(
+    "partitions", help="Manage the monthly partitions of expenses."
+)
+
+
+@partitions_cli.command("ensure")
+@click.option(
+    "--months-ahead",
+    type=int,
+    default=3,
+    show_default=True,
+    help="Months after the current one to create partitions for.",
+)
+def ensure_partitions_command(months_ahead):
+    """Create the missing monthly partitions (run e.g. daily from cron)."""
+    connection = db.session.connection()
+    if not is_partitioned(connection):
+        click.echo("expenses is not partitioned; nothing to do")
+        return
+    through = add_months(date.today().replace(day=1), months_ahead)
+    created = ensure_partitions(connection, through)
+    db.session.commit()
+    for name in created:
+        click.echo(f"Created {name}")
+    click.echo(f"{len(created)} partitions created")
+
+
+@partitions_cli.command("list")
+def list_partitions_command():
+    """List the partitions of expenses."""
+    for name in existing_partitions(db.session.connection()):
+        click.echo(name)
+
+
+fx_cli = AppGroup("fx", help="Manage the exchange rate table.")
+
+
+@fx_cli.command("load")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option(
+    "--base",
+    type=click.Choice(sorted(CURRENCY_EXPONENTS), case_sensitive=False),
+    help="Base currency of a file with a column per currency.",
+)
+@click.option(
+    "--chunk-size",
+    type=int,
+    default=FX_LOAD_CHUNK_SIZE,
+    show_default=True,
+    help="Rates committed per transaction.",
+)
+def load_rates_command(path, base, chunk_size):
+    """Load exchange rates from a CSV file (date,base,quote,rate or an
+    ECB-style Date,USD,JPY,... file with --base)."""
+    with open(path, encoding="utf-8-sig", newline="") as stream:
+        try:
+            loaded = load_rates(stream, base, chunk_size)
+        except ValueError as error:
+            raise click.ClickException(str(error))
+    click.echo(f"Loaded {loaded:,} rates")
+
+
+@click.command("run-scheduler")
+@click.option(
+    "--batch-size", type=int, help="Defaults to SCHEDULER_BATCH_SIZE."
+)
+def run_scheduler_command(batch_size):
+    """Enter the expenses of every recurring rule that is due (run e.g.
+    every few minutes from cron)."""
+    rules, created = RecurringExpense.materialize_due(
+        batch_size=batch_size or current_app.config["SCHEDULER_BATCH_SIZE"],
+        max_occurrences=current_app.config["SCHEDULER_MAX_OCCURRENCES"],
+    )
+    click.echo(f"Ran {rules:,} recurring rules, created {created:,} expenses")
+
+
+def register_commands(app):
+    app.cli.add_command(import_expenses_command)
+    app.cli.add_command(rollups_cli)
+    app.cli.add_command(partitions_cli)
+    app.cli.add_command(fx_cli)
+    app.cli.add_command(run_scheduler_command)
@@ -1,3 +1,8 @@
 from .categories import Category  # noqa: F401
 from .expenses import Expense  # noqa: F401
 from .users import User  # noqa: F401
+from .data_versions import UserDataVersion  # noqa: F401
+from .rollups import DailyExpenseRollup  # noqa: F401
+from .fx_rates import FxRate, FxRateRevision  # noqa: F401
+from .recurring import RecurringExpense  # noqa: F401
+from .budgets import Budget, BudgetAlert, BudgetSpending  # noqa: F401
@@ -1,11 +1,18 @@
-from sqlalchemy.orm import Mapped, mapped_column
-from sqlalchemy import DateTime, Integer, func, select
+from sqlalchemy.orm import Mapped, Session, mapped_column
+from sqlalchemy import DateTime, Integer, event, func, inspect, select
 from flask_smorest import abort
 from datetime import datetime, timezone
 from http import HTTPStatus
+import os
 
 from src.extensions import db
 
+# Loading strategy of every relationship. Related rows are loaded
+# explicitly where they are used (``selectinload``/``joinedload``); the
+# tests set "raise" so that an unplanned lazy load, the start of an N+1,
+# fails instead of quietly querying once per row.
+RELATIONSHIP_LAZY = os.getenv("RELATIONSHIP_LAZY", "select")
+
 
 class BaseModel(db.Model):
     __abstract__ = True
@@ -94,3 +101,31 @@ class SoftDeleteModel(BaseModel):
         if commit:
             db.session.commit()
         return self
+
+
+class UserDataModel(BaseModel):
+    """Rows owned by a user whose changes bump ``UserDataVersion``."""
+
+    __abstract__ = True
+
+
+@event.listens_for(Session, "before_flush")
+def _collect_changed_user_data(session, _flush_context, _instances):
+    changed = session.info.setdefault("changed_user_ids", set())
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if not isinstance(obj, UserDataModel):
+            continue
+        if obj in session.dirty and not session.is_modified(obj):
+            continue
+        history = inspect(obj).attrs.user_id.history
+        changed.update(history.added or history.unchanged or ())
+        changed.update(history.deleted or ())
+
+
+@event.listens_for(Session, "after_flush")
+def _bump_changed_user_data(session, _flush_context):
+    from src.models.data_versions import UserDataVersion
+
+    changed = session.info.pop("changed_user_ids", None)
+    if changed:
+        UserDataVersion.bump(changed, connection=session.connection())
@@ -0,0 +1,306 @@
+from collections import defaultdict
+from datetime import date, datetime, timezone
+from typing import Optional
+from flask_smorest import abort
+from http import HTTPStatus
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import (
+    BigInteger,
+    Date,
+    DateTime,
+    Integer,
+    String,
+    and_,
+    delete,
+    func,
+    select,
+)
+from sqlalchemy.dialects import postgresql, sqlite
+
+from src.models.base import CreateUpdateModel, SoftDeleteModel, UserDataModel
+from src.models.expenses import Expense
+from src.models.functions import period_start
+from src.models.rollups import DailyExpenseRollup, RollupDeltas
+from src.services.money import default_currency
+from src.extensions import db
+
+
+def _dialect_insert(connection):
+    if connection.dialect.name == "postgresql":
+        return postgresql.insert
+    return sqlite.insert
+
+
+class Budget(UserDataModel, SoftDeleteModel, CreateUpdateModel):
+    """A monthly spending limit on one category, in ``currency``; only
+    expenses in that currency count towards it.
+
+    What has been spent each month is kept in ``BudgetSpending`` and
+    updated from the same deltas as the daily rollups, so reading a
+    budget's status is a key lookup rather than a sum over the month.
+    """
+
+    __tablename__ = "budgets"
+    user_id: Mapped[int] = mapped_column(
+        db.ForeignKey("users.id", name="fk_budget_user_id"), nullable=False
+    )
+    category_id: Mapped[int] = mapped_column(
+        db.ForeignKey("categories.id", name="fk_budget_category_id"),
+        nullable=False,
+    )
+    amount_minor: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    currency: Mapped[str] = mapped_column(
+        String(3), nullable=False, default=default_currency
+    )
+    # Percentage of the amount at which the month's alert is recorded.
+    alert_at: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=100, server_default="100"
+    )
+
+    def __init__(self, **kwargs):
+        super().__init__(**Expense.with_minor_units(kwargs))
+
+    @classmethod
+    def get_active(cls, user_id: int, category_id: int):
+        stmt = cls.select_active().where(
+            cls.user_id == user_id, cls.category_id == category_id
+        )
+        return db.session.execute(stmt).scalars().first()
+
+    @classmethod
+    def get_by_user_id_and_id_or_404(cls, user_id: int, id: int):
+        stmt = cls.select_active().where(cls.id == id, cls.user_id == user_id)
+        result = db.session.execute(stmt).scalars().first()
+        if not result:
+            abort(
+                HTTPStatus.NOT_FOUND,
+                message=f"Budget with id {id} not found for user {user_id}",
+            )
+        return result
+
+    @classmethod
+    def statuses(cls, user_id: int, month: date) -> list[dict]:
+        """Amount, spending and alert of each of the user's budgets in
+        ``month`` (its first day), read in one query."""
+        stmt = (
+            select(
+                cls.id,
+                cls.category_id,
+                cls.amount_minor,
+                cls.currency,
+                cls.alert_at,
+                func.coalesce(BudgetSpending.spent_minor, 0).label(
+                    "spent_minor"
+                ),
+                BudgetAlert.created_at.label("alerted_at"),
+            )
+            .outerjoin(
+                BudgetSpending,
+                and_(
+                    BudgetSpending.budget_id == cls.id,
+                    BudgetSpending.month == month,
+                ),
+            )
+            .outerjoin(
+                BudgetAlert,
+                and_(
+                    BudgetAlert.budget_id == cls.id,
+                    BudgetAlert.month == month,
+                ),
+            )
+            .where(cls.user_id == user_id, cls.deleted_at.is_(None))
+            .order_by(cls.category_id, cls.id)
+        )
+        return [
+            {
+                **row._asdict(),
+                "month": month,
+                "remaining_minor": row.amount_minor - row.spent_minor,
+                "over_budget": row.spent_minor > row.amount_minor,
+            }
+            for row in db.session.execute(stmt)
+        ]
+
+    @classmethod
+    def apply_spending(cls, deltas: RollupDeltas, connection=None):
+        """Add the expense ``deltas`` to the spending of the live budgets
+        they fall under, recording alerts for the months that reach them.
+        Called by ``DailyExpenseRollup.apply``."""
+        monthly = defaultdict(int)
+        for row in deltas.rows():
+            key = (row["user_id"], row["category_id"], row["currency"])
+            monthly[(*key, row["day"].replace(day=1))] += row["total_minor"]
+        monthly = {key: total for key, total in monthly.items() if total}
+        if not monthly:
+            return
+        connection = connection or db.session.connection()
+        budgets = {
+            (row.user_id, row.category_id, row.currency): row.id
+            for row in connection.execute(
+                select(
+                    cls.id, cls.user_id, cls.category_id, cls.currency
+                ).where(
+                    cls.deleted_at.is_(None),
+                    cls.user_id.in_({key[0] for key in monthly}),
+                    cls.category_id.in_({key[1] for key in monthly}),
+                )
+            )
+        }
+        BudgetSpending.add(
+            [
+                {
+                    "budget_id": budgets[key[:3]],
+                    "month": key[3],
+                    "spent_minor": total,
+                }
+                for key, total in sorted(monthly.items())
+                if key[:3] in budgets
+            ],
+            connection,
+        )
+
+    def backfill_spending(self):
+        """Load the spending of a new budget from the daily rollups."""
+        self.rebuild_spending(budget_ids=[self.id])
+
+    @classmethod
+    def rebuild_spending(
+        cls,
+        user_id: Optional[int] = None,
+        budget_ids: Optional[list[int]] = None,
+    ) -> int:
+        """Recompute the spending of live budgets (all, one user's, or
+        ``budget_ids``) from the daily rollups; alerts already recorded are
+        kept. Returns the number of rows written; the caller commits."""
+        rollup = DailyExpenseRollup
+        month = period_start("month", rollup.day)
+        stmt = (
+            select(cls.id, month, func.sum(rollup.total_minor))
+            .join(
+                rollup,
+                and_(
+                    rollup.user_id == cls.user_id,
+                    rollup.category_id == cls.category_id,
+                    rollup.currency == cls.currency,
+                ),
+            )
+            .where(cls.deleted_at.is_(None))
+            .group_by(cls.id, month)
+        )
+        clear = delete(BudgetSpending)
+        if user_id is not None:
+            stmt = stmt.where(cls.user_id == user_id)
+            clear = clear.where(
+                BudgetSpending.budget_id.in_(
+                    select(cls.id).where(cls.user_id == user_id)
+                )
+            )
+        if budget_ids is not None:
+            stmt = stmt.where(cls.id.in_(budget_ids))
+            clear = clear.where(BudgetSpending.budget_id.in_(budget_ids))
+        db.session.execute(clear)
+        rows = [
+            {
+                "budget_id": budget_id,
+                "month": date.fromisoformat(month),
+                "spent_minor": int(total),
+            }
+            for budget_id, month, total in db.session.execute(stmt)
+        ]
+        BudgetSpending.add(rows)
+        return len(rows)
+
+
+class BudgetSpending(db.Model):
+    """Running total of the expenses counted against a budget in a month
+    (keyed by its first day), in minor units of the budget's currency."""
+
+    __tablename__ = "budget_spending"
+    budget_id: Mapped[int] = mapped_column(
+        db.ForeignKey("budgets.id", name="fk_budget_spending_budget_id"),
+        primary_key=True,
+    )
+    month: Mapped[date] = mapped_column(Date, primary_key=True)
+    spent_minor: Mapped[int] = mapped_column(
+        BigInteger, nullable=False, default=0
+    )
+
+    @classmethod
+    def add(cls, rows: list[dict], connection=None):
+        """Add ``spent_minor`` to the stored totals, then record an alert
+        for every month whose new total reaches its budget's ``alert_at``
+        percentage."""
+        if not rows:
+            return
+        connection = connection or db.session.connection()
+        stmt = _dialect_insert(connection)(cls.__table__)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[cls.budget_id, cls.month],
+            set_={"spent_minor": cls.spent_minor + stmt.excluded.spent_minor},
+        ).returning(cls.budget_id, cls.month, cls.spent_minor)
+        totals = connection.execute(stmt, rows).all()
+        limits = {
+            row.id: (row.amount_minor, row.alert_at)
+            for row in connection.execute(
+                select(Budget.id, Budget.amount_minor, Budget.alert_at).where(
+                    Budget.id.in_({row.budget_id for row in totals})
+                )
+            )
+        }
+        BudgetAlert.record(
+            [
+                row
+                for row in totals
+                if row.spent_minor * 100
+                >= limits[row.budget_id][0] * limits[row.budget_id][1]
+            ],
+            connection,
+        )
+
+
+class BudgetAlert(db.Model):
+    """The first time a budget's spending reached its ``alert_at``
+    percentage in a month. Recorded once per budget and month, even if
+    spending later drops back and crosses again."""
+
+    __tablename__ = "budget_alerts"
+    budget_id: Mapped[int] = mapped_column(
+        db.ForeignKey("budgets.id", name="fk_budget_alert_budget_id"),
+        primary_key=True,
+    )
+    month: Mapped[date] = mapped_column(Date, primary_key=True)
+    spent_minor: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+
+    @classmethod
+    def record(cls, crossings, connection):
+        if not crossings:
+            return
+        now = datetime.now(timezone.utc)
+        stmt = (
+            _dialect_insert(connection)(cls.__table__)
+            .values(
+                [
+                    {
+                        "budget_id": row.budget_id,
+                        "month": row.month,
+                        "spent_minor": row.spent_minor,
+                        "created_at": now,
+                    }
+                    for row in crossings
+                ]
+            )
+            .on_conflict_do_nothing(index_elements=[cls.budget_id, cls.month])
+        )
+        connection.execute(stmt)
+
+
+# One live budget per category; deleted ones may be recreated.
+db.Index(
+    "uq_budget_user_category",
+    Budget.user_id,
+    Budget.category_id,
+    unique=True,
+    postgresql_where=Budget.deleted_at.is_(None),
+    sqlite_where=Budget.deleted_at.is_(None),
+)
@@ -1,20 +1,26 @@
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import String
+from sqlalchemy import String, and_, func, inspect, select
 from flask_smorest import abort
 from http import HTTPStatus
 
-from src.models.base import SoftDeleteModel, CreateUpdateModel
+from src.models.base import (
+    RELATIONSHIP_LAZY,
+    CreateUpdateModel,
+    SoftDeleteModel,
+    UserDataModel,
+)
+from src.models.rollups import DailyExpenseRollup
 from src.extensions import db
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Optional
 
 if TYPE_CHECKING:
     from src.models.expenses import Expense
     from src.models.users import User
 
 
-class Category(SoftDeleteModel, CreateUpdateModel):
+class Category(UserDataModel, SoftDeleteModel, CreateUpdateModel):
     __tablename__ = "categories"
-    __tableargs__ = db.Index("idx_category_name", "name")
+    __table_args__ = (db.Index("idx_category_name", "name"),)
     name: Mapped[str] = mapped_column(String(50), nullable=False, unique=True)
     user_id: Mapped[int] = mapped_column(
         db.ForeignKey("users.id", name="fk_category_user_id"),
@@ -24,8 +30,12 @@ class Category(SoftDeleteModel, CreateUpdateModel):
     color: Mapped[str] = mapped_column(
         String(7), nullable=True
     )  # e.g., Hex color code
-    expenses: Mapped[list["Expense"]] = relationship(back_populates="category")
-    user: Mapped["User"] = relationship(back_populates="categories")
+    expenses: Mapped[list["Expense"]] = relationship(
+        back_populates="category", lazy=RELATIONSHIP_LAZY
+    )
+    user: Mapped["User"] = relationship(
+        back_populates="categories", lazy=RELATIONSHIP_LAZY
+    )
 
     @classmethod
     def get_by_user_id_and_id_or_404(cls, user_id: int, id: int):
@@ -37,3 +47,116 @@ class Category(SoftDeleteModel, CreateUpdateModel):
                 message=f"Category with id {id} not found for user {user_id}",
             )
         return result
+
+    def in_use(self) -> bool:
+        """Whether live expenses or recurring rules still use the
+        category."""
+        from src.models.recurring import RecurringExpense
+
+        rollup = DailyExpenseRollup
+        rule = RecurringExpense
+        stmt = select(
+            select(rollup.day)
+            .where(
+                rollup.user_id == self.user_id,
+                rollup.category_id == self.id,
+            )
+            .exists()
+            | select(rule.id)
+            .where(
+                rule.user_id == self.user_id,
+                rule.category_id == self.id,
+                rule.deleted_at.is_(None),
+            )
+            .exists()
+        )
+        return db.session.scalar(stmt)
+
+    @classmethod
+    def get_by_ids(cls, ids) -> dict[int, "Category"]:
+        """The categories with ``ids`` (soft-deleted ones included, as
+        expenses keep pointing at them), in one query."""
+        stmt = select(cls).where(cls.id.in_(set(ids)))
+        return {
+            category.id: category
+            for category in db.session.execute(stmt).scalars()
+        }
+
+    @classmethod
+    def get_active_ids(cls, user_id: int, ids) -> set[int]:
+        """Return which of ``ids`` are live categories of ``user_id``, in
+        one query."""
+        stmt = select(cls.id).where(
+            cls.user_id == user_id,
+            cls.deleted_at.is_(None),
+            cls.id.in_(set(ids)),
+        )
+        return set(db.session.execute(stmt).scalars())
+
+    @classmethod
+    def page_with_stats(
+        cls, user_id: int, limit: int = 100, cursor_id: Optional[int] = None
+    ) -> list[dict]:
+        """A page of the user's live categories (by id, after
+        ``cursor_id``) as column dicts, each with the ``stats`` of its live
+        expenses: count, last day used and a total per currency.
+
+        One query: the page is LEFT JOINed to the daily rollups and grouped
+        per category and currency, so categories without expenses are
+        included and no expense row is read.
+        """
+        page = select(cls.id).where(
+            cls.user_id == user_id, cls.deleted_at.is_(None)
+        )
+        if cursor_id:
+            page = page.where(cls.id > cursor_id)
+        page = page.order_by(cls.id).limit(limit).subquery()
+        rollup = DailyExpenseRollup
+        stmt = (
+            select(
+                cls,
+                rollup.currency,
+                func.sum(rollup.count).label("count"),
+                func.sum(rollup.total_minor).label("total_minor"),
+                func.max(rollup.day).label("last_used_on"),
+            )
+            .join(page, page.c.id == cls.id)
+            .outerjoin(
+                rollup,
+                and_(
+                    rollup.user_id == cls.user_id,
+                    rollup.category_id == cls.id,
+                ),
+            )
+            .group_by(cls.id, rollup.currency)
+            .order_by(cls.id, rollup.currency)
+        )
+        columns = [attr.key for attr in inspect(cls).column_attrs]
+        categories = {}
+        for (
+            category,
+            currency,
+            count,
+            total,
+            last_used_on,
+        ) in db.session.execute(stmt):
+            if category.id not in categories:
+                categories[category.id] = {
+                    **{key: getattr(category, key) for key in columns},
+                    "stats": {"count": 0, "last_used_on": None, "totals": []},
+                }
+            if currency is None:
+                continue
+            stats = categories[category.id]["stats"]
+            stats["count"] += count
+            stats["last_used_on"] = max(
+                filter(None, (stats["last_used_on"], last_used_on))
+            )
+            stats["totals"].append(
+                {
+                    "currency": currency,
+                    "total_minor": int(total),
+                    "count": count,
+                }
+            )
+        return list(categories.values())
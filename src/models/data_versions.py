@@ -0,0 +1,82 @@
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import DateTime, Integer, select
+from sqlalchemy.dialects import postgresql, sqlite
+from datetime import datetime, timezone
+from typing import Iterable, Optional
+
+from src.extensions import db
+
+
+class UserDataVersion(db.Model):
+    """Per-user change marker for expenses and categories.
+
+    ``version`` is bumped in the same transaction as every write to a
+    user's data, so ``(version, updated_at)`` identifies the state of
+    everything the user can read and backs ETag / Last-Modified checks
+    without touching the data itself. ``categories_version`` moves only
+    with the user's categories, for caches of them alone.
+    """
+
+    __tablename__ = "user_data_versions"
+    user_id: Mapped[int] = mapped_column(
+        db.ForeignKey("users.id", name="fk_user_data_version_user_id"),
+        primary_key=True,
+    )
+    version: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, server_default="0"
+    )
+    categories_version: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, server_default="0"
+    )
+    updated_at: Mapped[datetime] = mapped_column(DateTime, nullable=True)
+
+    @classmethod
+    def get_marker(cls, user_id: int) -> tuple[int, Optional[datetime]]:
+        row = db.session.execute(
+            select(cls.version, cls.updated_at).where(cls.user_id == user_id)
+        ).first()
+        return (row.version, row.updated_at) if row else (0, None)
+
+    @classmethod
+    def get_categories_version(cls, user_id: int) -> int:
+        return (
+            db.session.execute(
+                select(cls.categories_version).where(cls.user_id == user_id)
+            ).scalar()
+            or 0
+        )
+
+    @classmethod
+    def bump(
+        cls,
+        user_ids: Iterable[int],
+        connection=None,
+        counter: str = "version",
+    ):
+        """Record a change to the data of ``user_ids`` by incrementing
+        ``counter`` (``version`` or ``categories_version``).
+
+        Set-based writes that bypass the ORM must call this themselves;
+        ORM flushes are tracked automatically (see ``src.models.base``).
+        """
+        user_ids = sorted({user_id for user_id in user_ids if user_id})
+        if not user_ids:
+            return
+        connection = connection or db.session.connection()
+        dialect_insert = (
+            postgresql.insert
+            if connection.dialect.name == "postgresql"
+            else sqlite.insert
+        )
+        now = datetime.now(timezone.utc)
+        stmt = dialect_insert(cls.__table__).values(
+            [
+                {"user_id": user_id, counter: 1, "updated_at": now}
+                for user_id in user_ids
+            ]
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[cls.user_id],
+            set_={counter: getattr(cls, counter) + 1, "updated_at": now},
+        )
+        connection.execute(stmt)
@@ -1,12 +1,38 @@
-from sqlalchemy import String, Float
-from sqlalchemy.orm import Mapped, mapped_column, relationship
-from datetime import datetime
+from sqlalchemy import BigInteger, Date, String, case, event, inspect
+from sqlalchemy.orm import (
+    Mapped,
+    Session,
+    joinedload,
+    mapped_column,
+    relationship,
+    selectinload,
+)
+from datetime import datetime, time, timezone
+from decimal import Decimal
 from typing import Optional
 from flask_smorest import abort
 from http import HTTPStatus
-from sqlalchemy import and_, or_
+from sqlalchemy import and_, func, insert, null, or_, select, update
+from sqlalchemy.exc import SQLAlchemyError
 
-from src.models.base import SoftDeleteModel, CreateUpdateModel
+from src.models.base import (
+    RELATIONSHIP_LAZY,
+    CreateUpdateModel,
+    SoftDeleteModel,
+    UserDataModel,
+)
+from src.models.data_versions import UserDataVersion
+from src.models.functions import period_start
+from src.models.fx_rates import FxRate
+from src.models.rollups import DailyExpenseRollup, RollupDeltas, full_days
+from src.models.search import attach_search_ddl, ranked_matches
+from src.services.fx import fx_converter
+from src.services.money import (
+    average_minor,
+    default_currency,
+    from_minor,
+    to_minor,
+)
 from src.extensions import db
 from typing import TYPE_CHECKING
 
@@ -14,36 +40,151 @@ if TYPE_CHECKING:
     from src.models.categories import Category
     from src.models.users import User
 
+# Columns whose changes move an expense between (or out of) rollup rows.
+ROLLUP_COLUMNS = (
+    "user_id",
+    "category_id",
+    "amount_minor",
+    "currency",
+    "created_at",
+    "deleted_at",
+)
 
-class Expense(SoftDeleteModel, CreateUpdateModel):
+
+class Expense(UserDataModel, SoftDeleteModel, CreateUpdateModel):
+    # On Postgres the table can be range-partitioned by created_at month
+    # (see src.models.partitions); date-bounded queries then only scan the
+    # matching partitions.
     __tablename__ = "expenses"
-    __tableargs__ = db.Index("idx_expense_created_at_id", "created_at", "id")
-    amount: Mapped[float] = mapped_column(Float, nullable=False)
+    __table_args__ = (
+        db.Index("idx_expense_created_at_id", "created_at", "id"),
+        # One expense per occurrence of a recurring rule; created_at is
+        # part of the key so the index also works on the partitioned table.
+        db.Index(
+            "uq_expense_recurring_expense_id_created_at",
+            "recurring_expense_id",
+            "created_at",
+            unique=True,
+        ),
+    )
+    # Exact amounts: integer minor units (cents, yen, ...) of ``currency``.
+    amount_minor: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    currency: Mapped[str] = mapped_column(
+        String(3), nullable=False, default=default_currency
+    )
     note: Mapped[str] = mapped_column(String(255), nullable=True)
     category_id: Mapped[int] = mapped_column(
         db.ForeignKey("categories.id", name="fk_expense_category_id"),
         nullable=False,
     )
-    category: Mapped["Category"] = relationship(back_populates="expenses")
+    category: Mapped["Category"] = relationship(
+        back_populates="expenses", lazy=RELATIONSHIP_LAZY
+    )
     user_id: Mapped[int] = mapped_column(
         db.ForeignKey("users.id", name="fk_expense_user_id"),
         nullable=True,
     )
-    user: Mapped["User"] = relationship(back_populates="expenses")
+    user: Mapped["User"] = relationship(
+        back_populates="expenses", lazy=RELATIONSHIP_LAZY
+    )
+    # Set on the expenses created by a RecurringExpense rule.
+    recurring_expense_id: Mapped[Optional[int]] = mapped_column(
+        db.ForeignKey(
+            "recurring_expenses.id", name="fk_expense_recurring_expense_id"
+        ),
+        nullable=True,
+    )
+
+    def __init__(self, **kwargs):
+        super().__init__(**self.with_minor_units(kwargs))
+
+    @property
+    def amount(self) -> Optional[Decimal]:
+        if self.amount_minor is None:
+            return None
+        return from_minor(self.amount_minor, self.currency)
+
+    @amount.setter
+    def amount(self, value):
+        self.amount_minor = to_minor(value, self.currency)
+
+    @staticmethod
+    def with_minor_units(values: dict) -> dict:
+        """``values`` with ``currency`` defaulted and any ``amount`` (a
+        ``Decimal`` or number) converted to ``amount_minor``."""
+        values = {"currency": default_currency(), **values}
+        if "amount" in values:
+            values["amount_minor"] = to_minor(
+                values.pop("amount"), values["currency"]
+            )
+        return values
+
+    def update(self, data: dict, commit: bool = False):
+        """Like ``BaseModel.update``. A new ``currency`` without an
+        ``amount`` keeps the amount, which must fit the new currency."""
+        data = dict(data)
+        if "currency" in data:
+            amount = data.pop("amount", self.amount)
+            self.currency = data.pop("currency")
+            self.amount = amount
+        return super().update(data, commit)
 
     @classmethod
-    def filter(
+    def filter_criteria(
+        cls,
+        user_id: int,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        category_ids: Optional[list[int]] = None,
+    ) -> list:
+        """WHERE clauses selecting a user's live expenses."""
+        criteria = [cls.deleted_at.is_(None), cls.user_id == user_id]
+        if start_date:
+            criteria.append(cls.created_at >= start_date)
+        if end_date:
+            criteria.append(cls.created_at <= end_date)
+        if category_ids:
+            criteria.append(cls.category_id.in_(category_ids))
+        return criteria
+
+    @classmethod
+    def filter_stmt(
         cls,
         user_id: int,
         start_date: Optional[datetime] = None,
         end_date: Optional[datetime] = None,
         category_ids: Optional[list[int]] = None,
-        limit: int = 100,
         cursor_created_at: Optional[datetime] = None,
         cursor_id: Optional[int] = None,
+        q: Optional[str] = None,
+        cursor_rank: Optional[float] = None,
     ):
-        stmt = cls.select_active()
-        stmt = stmt.where(Expense.user_id == user_id)
+        """Build the ordered list query without executing it.
+
+        With ``q`` only expenses whose note matches are selected, best
+        match first, with a ``search_rank`` column and ``(cursor_rank,
+        cursor_id)`` as the keyset cursor.
+        """
+        stmt = select(cls).where(
+            *cls.filter_criteria(user_id, start_date, end_date, category_ids)
+        )
+        if q is not None:
+            dialect = db.session.get_bind().dialect.name
+            ranked = ranked_matches(q, dialect, user_id)
+            stmt = stmt.add_columns(ranked.c.rank.label("search_rank")).join(
+                ranked, ranked.c.id == cls.id
+            )
+            if cursor_rank is not None and cursor_id:
+                stmt = stmt.where(
+                    or_(
+                        ranked.c.rank < cursor_rank,
+                        and_(
+                            ranked.c.rank == cursor_rank,
+                            Expense.id < cursor_id,
+                        ),
+                    )
+                )
+            return stmt.order_by(ranked.c.rank.desc(), Expense.id.desc())
         if cursor_created_at and cursor_id:
             stmt = stmt.where(
                 or_(
@@ -56,22 +197,388 @@ class Expense(SoftDeleteModel, CreateUpdateModel):
             )
         elif cursor_created_at:
             stmt = stmt.where(Expense.created_at < cursor_created_at)
-        if start_date:
-            stmt = stmt.where(Expense.created_at >= start_date)
-        if end_date:
-            stmt = stmt.where(Expense.created_at <= end_date)
-        if category_ids:
-            stmt = stmt.where(Expense.category_id.in_(category_ids))
-        stmt = stmt.order_by(
-            Expense.created_at.desc(), Expense.id.desc()
+        return stmt.order_by(Expense.created_at.desc(), Expense.id.desc())
+
+    @classmethod
+    def filter(
+        cls,
+        user_id: int,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        category_ids: Optional[list[int]] = None,
+        limit: int = 100,
+        cursor_created_at: Optional[datetime] = None,
+        cursor_id: Optional[int] = None,
+        q: Optional[str] = None,
+        cursor_rank: Optional[float] = None,
+        with_category: bool = False,
+    ):
+        """A page of ``filter_stmt``; ``with_category`` loads the page's
+        categories too, in one more query."""
+        stmt = cls.filter_stmt(
+            user_id,
+            start_date=start_date,
+            end_date=end_date,
+            category_ids=category_ids,
+            cursor_created_at=cursor_created_at,
+            cursor_id=cursor_id,
+            q=q,
+            cursor_rank=cursor_rank,
         ).limit(limit)
-        return db.session.execute(stmt).scalars().all()
+        if with_category:
+            stmt = stmt.options(selectinload(cls.category))
+        if q is None:
+            return db.session.execute(stmt).scalars().all()
+        expenses = []
+        for expense, rank in db.session.execute(stmt):
+            expense.search_rank = rank
+            expenses.append(expense)
+        return expenses
 
     @classmethod
-    def get_by_user_id_and_id_or_404(cls, user_id: int, id: int):
+    def _projected_stmt(cls, columns: list[str], **filters):
+        stmt = cls.filter_stmt(**filters)
+        rank = stmt.selected_columns.get("search_rank")
+        return stmt.with_only_columns(
+            *(cls.__table__.c[column] for column in columns),
+            *([rank] if rank is not None else []),
+        )
+
+    @classmethod
+    def filter_rows(cls, columns: list[str], limit: int = 100, **filters):
+        """Like ``filter``, but return plain row tuples of ``columns``
+        instead of ORM instances."""
+        stmt = cls._projected_stmt(columns, **filters).limit(limit)
+        return db.session.execute(stmt).all()
+
+    @classmethod
+    def iter_rows(cls, columns: list[str], chunk_size: int, **filters):
+        """Stream live rows as tuples of ``columns``, ``chunk_size`` rows at
+        a time, through a server-side cursor where the driver has one."""
+        result = db.session.execute(
+            cls._projected_stmt(columns, **filters),
+            execution_options={"yield_per": chunk_size},
+        )
+        return result.partitions()
+
+    @classmethod
+    def summarize(
+        cls,
+        user_id: int,
+        by_category: bool = False,
+        period: Optional[str] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        category_ids: Optional[list[int]] = None,
+        convert_to: Optional[str] = None,
+    ) -> list[dict]:
+        """Total, count and average of the user's live expenses per
+        currency, grouped by category and/or ``period`` (day, week or
+        month) with GROUP BY.
+
+        Whole days in the range are read from ``DailyExpenseRollup``, so
+        the cost grows with days x categories; only the partial days at
+        the edges of the range are aggregated from the expenses. Sums are
+        of integer minor units, so they are exact. Returns dicts of
+        ``category_id``, ``period``, ``currency``, ``total_minor``,
+        ``count`` and ``average_minor`` (rounded to a whole minor unit);
+        an ungrouped key is ``None``.
+
+        With ``convert_to`` the sums are also split by day, and each is
+        converted into that currency at the day's rate in memory (see
+        ``src.services.fx``); a missing rate raises ``MissingRateError``.
+        """
+
+        def group_keys(category_column, time_column):
+            keys = [
+                (category_column if by_category else null()).label(
+                    "category_id"
+                ),
+                (
+                    period_start(period, time_column) if period else null()
+                ).label("period"),
+            ]
+            if convert_to:
+                keys.append(func.date(time_column, type_=Date).label("day"))
+            return keys
+
+        def grouped(stmt, category_column, time_column, currency_column):
+            groups = [currency_column]
+            if by_category:
+                groups.append(category_column)
+            if period:
+                groups.append(period_start(period, time_column))
+            if convert_to:
+                groups.append(func.date(time_column, type_=Date))
+            return stmt.group_by(*groups)
+
+        def from_expenses(*criteria):
+            stmt = select(
+                *group_keys(cls.category_id, cls.created_at),
+                cls.currency,
+                func.sum(cls.amount_minor).label("total_minor"),
+                func.count().label("count"),
+            ).where(
+                *cls.filter_criteria(
+                    user_id, start_date, end_date, category_ids
+                ),
+                *criteria,
+            )
+            return grouped(stmt, cls.category_id, cls.created_at, cls.currency)
+
+        first_day, end_day = full_days(start_date, end_date)
+        if first_day and end_day and first_day >= end_day:
+            stmts = [from_expenses()]
+        else:
+            stmt = DailyExpenseRollup.summary_stmt(
+                user_id, group_keys, first_day, end_day, category_ids
+            )
+            stmts = [
+                grouped(
+                    stmt,
+                    DailyExpenseRollup.category_id,
+                    DailyExpenseRollup.day,
+                    DailyExpenseRollup.currency,
+                )
+            ]
+            if first_day is not None and start_date.date() != first_day:
+                stmts.append(
+                    from_expenses(
+                        cls.created_at < datetime.combine(first_day, time())
+                    )
+                )
+            if end_day is not None:
+                stmts.append(
+                    from_expenses(
+                        cls.created_at >= datetime.combine(end_day, time())
+                    )
+                )
+
+        totals = {}
+        revision = FxRate.revision() if convert_to else None
+        for stmt in stmts:
+            for row in db.session.execute(stmt):
+                if not row.count:
+                    continue
+                currency, amount = row.currency, int(row.total_minor)
+                if convert_to:
+                    amount = fx_converter.convert(
+                        amount, currency, convert_to, row.day, revision
+                    )
+                    currency = convert_to
+                key = (row.category_id, row.period, currency)
+                total, count = totals.get(key, (0, 0))
+                totals[key] = (total + amount, count + row.count)
+        return [
+            {
+                "category_id": category_id,
+                "period": period_key,
+                "currency": currency,
+                "total_minor": total,
+                "count": count,
+                "average_minor": average_minor(total, count),
+            }
+            for (category_id, period_key, currency), (total, count) in sorted(
+                totals.items(),
+                key=lambda item: tuple((k is None, k) for k in item[0]),
+            )
+        ]
+
+    @classmethod
+    def bulk_create(cls, user_id: int, items: list[dict], chunk_size: int):
+        """Insert ``items`` for ``user_id``, one INSERT ... RETURNING
+        (executemany) per chunk of ``chunk_size`` rows.
+
+        Each chunk runs in a savepoint; when the database rejects one, its
+        items are retried one per savepoint so only the offending items
+        are rejected. Items carry ``amount_minor`` or an
+        ``amount`` (see ``with_minor_units``). Returns the created expenses
+        in input order and the indexes of the rejected items. The caller
+        commits.
+        """
+        stmt = insert(cls).returning(cls, sort_by_parameter_order=True)
+        created, rejected = [], []
+        for start in range(0, len(items), chunk_size):
+            end = start + chunk_size
+            chunk = items[start:end]
+            rows = [
+                {**cls.with_minor_units(item), "user_id": user_id}
+                for item in chunk
+            ]
+            try:
+                with db.session.begin_nested():
+                    created.extend(db.session.scalars(stmt, rows).all())
+                continue
+            except SQLAlchemyError:
+                pass
+            # Retry the rejected chunk one row at a time so only the
+            # offending items are dropped.
+            for index, row in enumerate(rows, start):
+                try:
+                    with db.session.begin_nested():
+                        created.extend(db.session.scalars(stmt, [row]).all())
+                except SQLAlchemyError:
+                    rejected.append(index)
+        if created:
+            deltas = RollupDeltas()
+            for expense in created:
+                deltas.add(
+                    user_id,
+                    expense.category_id,
+                    expense.created_at,
+                    expense.currency,
+                    expense.amount_minor,
+                )
+            DailyExpenseRollup.apply(deltas)
+            UserDataVersion.bump([user_id])
+        return created, rejected
+
+    @classmethod
+    def bulk_update(
+        cls,
+        user_id: int,
+        values: dict,
+        ids: Optional[list[int]] = None,
+        **filters,
+    ) -> int:
+        """Apply ``values`` to the user's live expenses in one UPDATE.
+
+        Rows are chosen by ``ids`` and/or the ``filter_criteria`` filters.
+        ``updated_at`` is stamped like an ORM update. An ``amount`` is
+        stored in each row's currency, or in ``currency`` when both are
+        given; a ``currency`` alone is not accepted. Returns the number of
+        rows changed; the caller commits.
+        """
+        criteria = cls.filter_criteria(user_id, **filters)
+        if ids is not None:
+            criteria.append(cls.id.in_(ids))
+        values = {"updated_at": datetime.now(timezone.utc), **values}
+        amount = values.pop("amount", None)
+        if "currency" in values and amount is None:
+            raise ValueError("A new currency needs an amount")
+        deltas = RollupDeltas()
+        if amount is not None or values.keys() & set(ROLLUP_COLUMNS):
+            connection = db.session.connection()
+            if connection.dialect.name != "sqlite":
+                # Lock the rows first: a concurrent write to them waits
+                # for this transaction, and the totals read next are the
+                # ones this UPDATE replaces. (GROUP BY cannot take the
+                # locks itself; SQLite serializes writers anyway.)
+                connection.execute(
+                    select(cls.id).where(*criteria).with_for_update()
+                )
+            day = func.date(cls.created_at, type_=Date)
+            groups = db.session.execute(
+                select(
+                    cls.category_id,
+                    day,
+                    cls.currency,
+                    func.sum(cls.amount_minor),
+                    func.count(),
+                )
+                .where(*criteria)
+                .group_by(cls.category_id, day, cls.currency)
+            ).all()
+            for category_id, day, currency, total, count in groups:
+                deltas.add_group(
+                    user_id, category_id, day, currency, -total, -count
+                )
+                if "deleted_at" in values:
+                    continue
+                currency = values.get("currency", currency)
+                if amount is not None:
+                    total = to_minor(amount, currency) * count
+                category_id = values.get("category_id", category_id)
+                deltas.add_group(
+                    user_id, category_id, day, currency, total, count
+                )
+        if amount is not None:
+            if "currency" in values:
+                values["amount_minor"] = to_minor(amount, values["currency"])
+            else:
+                currencies = sorted({group.currency for group in groups})
+                if not currencies:
+                    return 0
+                values["amount_minor"] = case(
+                    {
+                        currency: to_minor(amount, currency)
+                        for currency in currencies
+                    },
+                    value=cls.currency,
+                    else_=cls.amount_minor,
+                )
+        result = db.session.execute(
+            update(cls)
+            .where(*criteria)
+            .values(**values)
+            .execution_options(synchronize_session="fetch")
+        )
+        if result.rowcount:
+            DailyExpenseRollup.apply(deltas)
+            UserDataVersion.bump([user_id])
+        return result.rowcount
+
+    @classmethod
+    def bulk_soft_delete(
+        cls, user_id: int, ids: Optional[list[int]] = None, **filters
+    ) -> int:
+        """Set-based ``soft_delete`` of the selected expenses."""
+        return cls.bulk_update(
+            user_id, {"deleted_at": datetime.now(timezone.utc)}, ids, **filters
+        )
+
+    @classmethod
+    def reassign_category(
+        cls,
+        user_id: int,
+        category_id: int,
+        to_category_id: int,
+        batch_size: int = 5000,
+    ) -> int:
+        """Move the user's live expenses from ``category_id`` to
+        ``to_category_id`` with ``bulk_update``, one UPDATE of up to
+        ``batch_size`` rows at a time.
+
+        Every full batch is committed, so no transaction holds the row
+        locks of a huge category for long; the last one is left to the
+        caller. Returns the number of expenses moved.
+        """
+        moved = 0
+        while True:
+            ids = (
+                db.session.execute(
+                    select(cls.id)
+                    .where(
+                        *cls.filter_criteria(
+                            user_id, category_ids=[category_id]
+                        )
+                    )
+                    .order_by(cls.id)
+                    .limit(batch_size)
+                )
+                .scalars()
+                .all()
+            )
+            if ids:
+                moved += cls.bulk_update(
+                    user_id,
+                    {"category_id": to_category_id},
+                    ids,
+                    category_ids=[category_id],
+                )
+            if len(ids) < batch_size:
+                return moved
+            db.session.commit()
+
+    @classmethod
+    def get_by_user_id_and_id_or_404(
+        cls, user_id: int, id: int, with_category: bool = False
+    ):
         stmt = cls.select_active().where(
             and_(cls.id == id, cls.user_id == user_id)
         )
+        if with_category:
+            stmt = stmt.options(joinedload(cls.category))
         result = db.session.execute(stmt).scalars().first()
         if not result:
             abort(
@@ -79,3 +586,95 @@ class Expense(SoftDeleteModel, CreateUpdateModel):
                 message=f"Expense with id {id} not found for user {user_id}",
             )
         return result
+
+
+# Serves Expense.filter: equality on user_id, the soft-delete predicate and
+# the keyset ordering all come from the index, so pages need no sort.
+db.Index(
+    "idx_expense_user_created_at_id",
+    Expense.user_id,
+    Expense.created_at.desc(),
+    Expense.id.desc(),
+    postgresql_where=Expense.deleted_at.is_(None),
+    sqlite_where=Expense.deleted_at.is_(None),
+)
+
+attach_search_ddl(Expense.__table__)
+
+
+@event.listens_for(Session, "before_flush")
+def _collect_rollup_changes(session, _flush_context, _instances):
+    """Move changed or deleted expenses between rollup rows: subtract
+    their stored state and add the state this flush writes. New expenses
+    are added by ``_apply_rollup_changes`` once their defaults are set."""
+    changed = {
+        inspect(obj).identity[0]: obj
+        for obj in (*session.dirty, *session.deleted)
+        if isinstance(obj, Expense)
+        and (
+            obj in session.deleted
+            or any(
+                inspect(obj).attrs[key].history.has_changes()
+                for key in ROLLUP_COLUMNS
+            )
+        )
+    }
+    deltas = RollupDeltas()
+    if changed:
+        # Read what the rows hold, not what was loaded (another
+        # transaction may have changed them since), and lock them so a
+        # concurrent flush of the same rows waits and then reads what this
+        # one wrote instead of applying the same change twice.
+        stored = session.execute(
+            select(
+                Expense.id, *(getattr(Expense, key) for key in ROLLUP_COLUMNS)
+            )
+            .where(Expense.id.in_(changed))
+            .with_for_update()
+        )
+        for row in stored:
+            state = row._asdict()
+            obj = changed[state.pop("id")]
+            if state["deleted_at"] is None:
+                deltas.add(*_rollup_key(state), sign=-1)
+            if obj in session.deleted:
+                continue
+            state.update(
+                (key, getattr(obj, key))
+                for key in ROLLUP_COLUMNS
+                if inspect(obj).attrs[key].history.has_changes()
+            )
+            if state["deleted_at"] is None:
+                deltas.add(*_rollup_key(state))
+    session.info["rollup_deltas"] = deltas
+    session.info["rollup_pending"] = [
+        obj for obj in session.new if isinstance(obj, Expense)
+    ]
+
+
+def _rollup_key(state: dict) -> tuple:
+    return (
+        state["user_id"],
+        state["category_id"],
+        state["created_at"],
+        state["currency"],
+        state["amount_minor"],
+    )
+
+
+@event.listens_for(Session, "after_flush")
+def _apply_rollup_changes(session, _flush_context):
+    deltas = session.info.pop("rollup_deltas", None)
+    pending = session.info.pop("rollup_pending", ())
+    if deltas is None:
+        return
+    for obj in pending:
+        if obj.deleted_at is None:
+            deltas.add(
+                obj.user_id,
+                obj.category_id,
+                obj.created_at,
+                obj.currency,
+                obj.amount_minor,
+            )
+    DailyExpenseRollup.apply(deltas, connection=session.connection())
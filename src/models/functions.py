@@ -0,0 +1,65 @@
+from sqlalchemy import BigInteger, String
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+from sqlalchemy.sql.visitors import InternalTraversal
+
+PERIODS = ("day", "week", "month")
+
+
+class period_start(FunctionElement):
+    """First day of the day/week/month containing a timestamp, as a
+    ``YYYY-MM-DD`` string. Weeks start on Monday (ISO 8601).
+
+    Compiled to ``date_trunc`` on Postgres and to SQLite's date functions
+    elsewhere, so grouping by it happens in the database.
+    """
+
+    type = String()
+    inherit_cache = True
+    # The period is part of the SQL text, so it must be in the cache key.
+    _traverse_internals = FunctionElement._traverse_internals + [
+        ("period", InternalTraversal.dp_string)
+    ]
+
+    def __init__(self, period: str, column):
+        if period not in PERIODS:
+            raise ValueError(f"Unknown period {period!r}")
+        self.period = period
+        super().__init__(column)
+
+
+@compiles(period_start)
+def _period_start_sqlite(element, compiler, **kw):
+    column = compiler.process(element.clauses, **kw)
+    if element.period == "day":
+        return f"date({column})"
+    if element.period == "week":
+        # Forward to the week's Sunday (or stay on it), then back to Monday.
+        return f"date({column}, 'weekday 0', '-6 days')"
+    return f"strftime('%Y-%m-01', {column})"
+
+
+@compiles(period_start, "postgresql")
+def _period_start_postgresql(element, compiler, **kw):
+    column = compiler.process(element.clauses, **kw)
+    return f"to_char(date_trunc('{element.period}', {column}), 'YYYY-MM-DD')"
+
+
+class epoch_seconds(FunctionElement):
+    """Whole seconds since 1970-01-01 of a (naive, UTC) timestamp, so that
+    bulk reads can turn timestamps into integers in the database."""
+
+    type = BigInteger()
+    inherit_cache = True
+
+
+@compiles(epoch_seconds)
+def _epoch_seconds_sqlite(element, compiler, **kw):
+    column = compiler.process(element.clauses, **kw)
+    return f"CAST(strftime('%s', {column}) AS INTEGER)"
+
+
+@compiles(epoch_seconds, "postgresql")
+def _epoch_seconds_postgresql(element, compiler, **kw):
+    column = compiler.process(element.clauses, **kw)
+    return f"CAST(extract(epoch FROM {column}) AS BIGINT)"
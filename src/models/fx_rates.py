@@ -0,0 +1,118 @@
+from datetime import date, datetime, timezone
+from typing import Optional
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import Date, DateTime, Float, Integer, String, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from src.extensions import db
+
+
+class FxRate(db.Model):
+    """Exchange rates loaded from files: on ``day``, one unit of ``base``
+    was worth ``rate`` units of ``quote``.
+
+    The primary key doubles as the index that reads one pair's series in
+    day order.
+    """
+
+    __tablename__ = "fx_rates"
+    base: Mapped[str] = mapped_column(String(3), primary_key=True)
+    quote: Mapped[str] = mapped_column(String(3), primary_key=True)
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    rate: Mapped[float] = mapped_column(Float, nullable=False)
+
+    @classmethod
+    def upsert(cls, rows: list[dict]) -> int:
+        """Insert ``rows`` or replace the rates already stored for their
+        day and pair. The caller commits."""
+        # One row per key: Postgres rejects a statement that would update
+        # the same row twice.
+        rows = list(
+            {(r["base"], r["quote"], r["day"]): r for r in rows}.values()
+        )
+        if not rows:
+            return 0
+        connection = db.session.connection()
+        dialect_insert = (
+            postgresql.insert
+            if connection.dialect.name == "postgresql"
+            else sqlite.insert
+        )
+        stmt = dialect_insert(cls.__table__)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[cls.base, cls.quote, cls.day],
+            set_={"rate": stmt.excluded.rate},
+        )
+        connection.execute(stmt, rows)
+        FxRateRevision.bump(connection)
+        return len(rows)
+
+    @classmethod
+    def series(cls, base: str, quote: str) -> list[tuple[date, float]]:
+        """``(day, rate)`` of one pair, oldest first."""
+        return [
+            tuple(row)
+            for row in db.session.execute(
+                select(cls.day, cls.rate)
+                .where(cls.base == base, cls.quote == quote)
+                .order_by(cls.day)
+            )
+        ]
+
+    @classmethod
+    def common_base(cls, *quotes: str) -> Optional[str]:
+        """A base currency quoted against every one of ``quotes``."""
+        return db.session.execute(
+            select(cls.base)
+            .where(cls.quote.in_(quotes))
+            .group_by(cls.base)
+            .having(func.count(cls.quote.distinct()) == len(set(quotes)))
+            .order_by(cls.base)
+            .limit(1)
+        ).scalar()
+
+    @classmethod
+    def revision(cls) -> int:
+        """Changes whenever rates are added or replaced, for ETags."""
+        return FxRateRevision.get()
+
+
+class FxRateRevision(db.Model):
+    """A single row counting the writes to ``fx_rates``, bumped in the
+    same transaction by ``FxRate.upsert``, so conditional requests check
+    the rates with one primary key lookup."""
+
+    __tablename__ = "fx_rate_revisions"
+    ROW_ID = 1
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    version: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, server_default="0"
+    )
+    updated_at: Mapped[datetime] = mapped_column(DateTime, nullable=True)
+
+    @classmethod
+    def get(cls) -> int:
+        return (
+            db.session.execute(
+                select(cls.version).where(cls.id == cls.ROW_ID)
+            ).scalar()
+            or 0
+        )
+
+    @classmethod
+    def bump(cls, connection=None):
+        connection = connection or db.session.connection()
+        dialect_insert = (
+            postgresql.insert
+            if connection.dialect.name == "postgresql"
+            else sqlite.insert
+        )
+        now = datetime.now(timezone.utc)
+        stmt = dialect_insert(cls.__table__).values(
+            id=cls.ROW_ID, version=1, updated_at=now
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[cls.id],
+            set_={"version": cls.version + 1, "updated_at": now},
+        )
+        connection.execute(stmt)
@@ -0,0 +1,102 @@
+from datetime import date
+from typing import Optional
+from sqlalchemy import text
+
+# Monthly range partitions of ``expenses`` on ``created_at`` (Postgres
+# only, opt-in through the 2c8f6a1d9b35 migration). Rows outside every
+# monthly partition land in DEFAULT_PARTITION until their month exists.
+PARTITIONED_TABLE = "expenses"
+DEFAULT_PARTITION = "expenses_default"
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def months_between(first: date, last: date) -> list[date]:
+    """First days of the months from ``first`` through ``last``."""
+    months, month = [], month_start(first)
+    while month <= last:
+        months.append(month)
+        month = add_months(month, 1)
+    return months
+
+
+def partition_name(month: date) -> str:
+    return f"{PARTITIONED_TABLE}_p{month:%Y_%m}"
+
+
+def is_partitioned(connection) -> bool:
+    if connection.dialect.name != "postgresql":
+        return False
+    relkind = connection.execute(
+        text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:name)"),
+        {"name": PARTITIONED_TABLE},
+    ).scalar()
+    return relkind == "p"
+
+
+def existing_partitions(connection) -> list[str]:
+    if not is_partitioned(connection):
+        return []
+    return list(
+        connection.execute(
+            text(
+                "SELECT child.relname FROM pg_inherits "
+                "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+                "WHERE pg_inherits.inhparent = to_regclass(:name) "
+                "ORDER BY child.relname"
+            ),
+            {"name": PARTITIONED_TABLE},
+        ).scalars()
+    )
+
+
+def create_partition(connection, month: date):
+    """Create and attach the partition for ``month``, first moving its
+    rows out of the default partition (attaching would fail otherwise)."""
+    name = partition_name(month)
+    bounds = {"start": month, "end": add_months(month, 1)}
+    connection.execute(
+        text(
+            f"CREATE TABLE {name} "
+            f"(LIKE {PARTITIONED_TABLE} INCLUDING DEFAULTS "
+            "INCLUDING CONSTRAINTS)"
+        )
+    )
+    connection.execute(
+        text(
+            f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} "
+            "WHERE created_at >= :start AND created_at < :end "
+            f"RETURNING *) INSERT INTO {name} SELECT * FROM moved"
+        ),
+        bounds,
+    )
+    connection.execute(
+        text(
+            f"ALTER TABLE {PARTITIONED_TABLE} ATTACH PARTITION {name} "
+            f"FOR VALUES FROM ('{bounds['start']}') TO ('{bounds['end']}')"
+        )
+    )
+
+
+def ensure_partitions(
+    connection, through: date, since: Optional[date] = None
+) -> list[str]:
+    """Create the missing monthly partitions from ``since`` (default: the
+    current month) through the month of ``through``. Returns the names
+    created; a no-op unless ``expenses`` is partitioned."""
+    if not is_partitioned(connection):
+        return []
+    existing = set(existing_partitions(connection))
+    created = []
+    for month in months_between(since or date.today(), through):
+        if partition_name(month) not in existing:
+            create_partition(connection, month)
+            created.append(partition_name(month))
+    return created
@@ -0,0 +1,277 @@
+from calendar import monthrange
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from flask_smorest import abort
+from http import HTTPStatus
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import BigInteger, DateTime, Integer, String, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from src.models.base import CreateUpdateModel, SoftDeleteModel, UserDataModel
+from src.models.data_versions import UserDataVersion
+from src.models.expenses import Expense
+from src.models.rollups import DailyExpenseRollup, RollupDeltas
+from src.models.users import User
+from src.services.money import default_currency
+from src.extensions import db
+
+FREQUENCIES = ("daily", "weekly", "monthly", "yearly")
+
+
+def occurrence(
+    starts_at: datetime, frequency: str, interval: int, index: int
+) -> datetime:
+    """The ``index``-th occurrence (0 is ``starts_at``) of a schedule.
+
+    Counted from the start rather than the previous occurrence, so a rule
+    on the 31st runs on the last day of shorter months and is back on the
+    31st afterwards.
+    """
+    step = index * interval
+    if frequency == "daily":
+        return starts_at + timedelta(days=step)
+    if frequency == "weekly":
+        return starts_at + timedelta(weeks=step)
+    months = step * 12 if frequency == "yearly" else step
+    year, month = divmod(starts_at.month - 1 + months, 12)
+    year += starts_at.year
+    return starts_at.replace(
+        year=year,
+        month=month + 1,
+        day=min(starts_at.day, monthrange(year, month + 1)[1]),
+    )
+
+
+class RecurringExpense(UserDataModel, SoftDeleteModel, CreateUpdateModel):
+    """An expense entered every ``interval`` days, weeks, months or years
+    from ``starts_at`` until ``until`` (if set).
+
+    ``occurrences`` counts the expenses created so far and ``next_run_at``
+    is when the next one is due, ``None`` once the rule has ended. The
+    scheduler (``materialize_due``) only reads rules through the partial
+    index on ``next_run_at``.
+    """
+
+    __tablename__ = "recurring_expenses"
+    amount_minor: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    currency: Mapped[str] = mapped_column(
+        String(3), nullable=False, default=default_currency
+    )
+    note: Mapped[str] = mapped_column(String(255), nullable=True)
+    category_id: Mapped[int] = mapped_column(
+        db.ForeignKey(
+            "categories.id", name="fk_recurring_expense_category_id"
+        ),
+        nullable=False,
+    )
+    user_id: Mapped[int] = mapped_column(
+        db.ForeignKey("users.id", name="fk_recurring_expense_user_id"),
+        nullable=False,
+    )
+    frequency: Mapped[str] = mapped_column(String(10), nullable=False)
+    interval: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=1, server_default="1"
+    )
+    starts_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    until: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    occurrences: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, server_default="0"
+    )
+    next_run_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime, nullable=True
+    )
+
+    def __init__(self, **kwargs):
+        kwargs = Expense.with_minor_units(kwargs)
+        kwargs.setdefault("next_run_at", kwargs.get("starts_at"))
+        super().__init__(**kwargs)
+
+    def soft_delete(self, commit: bool = False):
+        self.next_run_at = None
+        return super().soft_delete(commit)
+
+    @classmethod
+    def due_stmt(cls, now: datetime, limit: int):
+        """The next ``limit`` due rules of active users as rows, locked on
+        Postgres so that concurrent schedulers take different batches.
+
+        Rules of deactivated or deleted users are left due; they are picked
+        up again if the user is reactivated.
+        """
+        return (
+            select(
+                cls.id,
+                cls.user_id,
+                cls.category_id,
+                cls.amount_minor,
+                cls.currency,
+                cls.note,
+                cls.frequency,
+                cls.interval,
+                cls.starts_at,
+                cls.until,
+                cls.occurrences,
+                cls.next_run_at,
+            )
+            .join(User, User.id == cls.user_id)
+            .where(
+                cls.next_run_at <= now,
+                cls.deleted_at.is_(None),
+                User.active.is_(True),
+                User.deleted_at.is_(None),
+            )
+            .order_by(cls.next_run_at, cls.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True, of=cls)
+        )
+
+    @classmethod
+    def materialize_due(
+        cls,
+        now: Optional[datetime] = None,
+        batch_size: int = 1000,
+        max_occurrences: int = 100,
+    ) -> tuple[int, int]:
+        """Create the expenses of every rule due by ``now`` (default: the
+        current UTC time), ``batch_size`` rules per transaction.
+
+        Each batch is one SELECT of due rules, one multi-row INSERT of
+        their missed occurrences and one executemany UPDATE moving the
+        rules on. A rule enters at most ``max_occurrences`` per batch, so
+        one long-dormant rule cannot make a transaction unbounded; its
+        ``next_run_at`` stays due and a later batch carries on from there.
+        The INSERT skips occurrences that already exist (unique on
+        ``recurring_expense_id, created_at``), so rerunning after a crash
+        or alongside another scheduler never duplicates an expense.
+        Returns the number of rule runs (a capped rule counts once per
+        batch) and of expenses created.
+        """
+        now = now or datetime.now(timezone.utc)
+        if now.tzinfo is not None:
+            now = now.astimezone(timezone.utc).replace(tzinfo=None)
+        rules_run = created = 0
+        while rules := db.session.execute(cls.due_stmt(now, batch_size)).all():
+            expenses, schedules = [], []
+            for rule in rules:
+                index, at = rule.occurrences, rule.next_run_at
+                while (
+                    at <= now
+                    and (rule.until is None or at <= rule.until)
+                    and index - rule.occurrences < max_occurrences
+                ):
+                    expenses.append(
+                        {
+                            "amount_minor": rule.amount_minor,
+                            "currency": rule.currency,
+                            "note": rule.note,
+                            "category_id": rule.category_id,
+                            "user_id": rule.user_id,
+                            "recurring_expense_id": rule.id,
+                            "created_at": at,
+                            "updated_at": now,
+                        }
+                    )
+                    index += 1
+                    at = occurrence(
+                        rule.starts_at, rule.frequency, rule.interval, index
+                    )
+                schedules.append(
+                    {
+                        "id": rule.id,
+                        "occurrences": index,
+                        "next_run_at": (
+                            at
+                            if rule.until is None or at <= rule.until
+                            else None
+                        ),
+                        "updated_at": now,
+                    }
+                )
+            created += cls._insert_occurrences(expenses)
+            db.session.execute(update(cls), schedules)
+            UserDataVersion.bump({rule.user_id for rule in rules})
+            db.session.commit()
+            rules_run += len(rules)
+        return rules_run, created
+
+    @classmethod
+    def reassign_category(
+        cls, user_id: int, category_id: int, to_category_id: int
+    ) -> int:
+        """Point the user's live rules on ``category_id`` at
+        ``to_category_id``, in one UPDATE; the caller commits."""
+        result = db.session.execute(
+            update(cls)
+            .where(
+                cls.user_id == user_id,
+                cls.category_id == category_id,
+                cls.deleted_at.is_(None),
+            )
+            .values(
+                category_id=to_category_id,
+                updated_at=datetime.now(timezone.utc),
+            )
+            .execution_options(synchronize_session="fetch")
+        )
+        if result.rowcount:
+            UserDataVersion.bump([user_id])
+        return result.rowcount
+
+    @staticmethod
+    def _insert_occurrences(rows: list[dict]) -> int:
+        """Insert the expenses not created yet and add them to the
+        rollups. Returns how many were inserted."""
+        if not rows:
+            return 0
+        connection = db.session.connection()
+        dialect_insert = (
+            postgresql.insert
+            if connection.dialect.name == "postgresql"
+            else sqlite.insert
+        )
+        table = Expense.__table__
+        stmt = (
+            dialect_insert(table)
+            .on_conflict_do_nothing(
+                index_elements=[
+                    table.c.recurring_expense_id,
+                    table.c.created_at,
+                ]
+            )
+            .returning(
+                table.c.user_id,
+                table.c.category_id,
+                table.c.created_at,
+                table.c.currency,
+                table.c.amount_minor,
+            )
+        )
+        inserted = connection.execute(stmt, rows).all()
+        deltas = RollupDeltas()
+        for row in inserted:
+            deltas.add(*row)
+        DailyExpenseRollup.apply(deltas, connection=connection)
+        return len(inserted)
+
+    @classmethod
+    def get_by_user_id_and_id_or_404(cls, user_id: int, id: int):
+        stmt = cls.select_active().where(cls.id == id, cls.user_id == user_id)
+        result = db.session.execute(stmt).scalars().first()
+        if not result:
+            abort(
+                HTTPStatus.NOT_FOUND,
+                message=f"Recurring expense with id {id} "
+                f"not found for user {user_id}",
+            )
+        return result
+
+
+# Serves due_stmt: the scheduler reads due rules in next_run_at order
+# straight from this index, however many rules are not due.
+db.Index(
+    "idx_recurring_expense_next_run_at",
+    RecurringExpense.next_run_at,
+    RecurringExpense.id,
+    postgresql_where=RecurringExpense.deleted_at.is_(None),
+    sqlite_where=RecurringExpense.deleted_at.is_(None),
+)
@@ -0,0 +1,244 @@
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from typing import Optional
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import BigInteger, Date, Integer, String, delete, func
+from sqlalchemy import insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from src.extensions import db
+
+
+class RollupDeltas:
+    """Changes to per-day totals collected before being applied in one
+    statement, keyed by ``(user_id, category_id, day, currency)``. Totals
+    are integer minor units, so adding and subtracting them is exact."""
+
+    def __init__(self):
+        self.deltas = defaultdict(lambda: [0, 0])
+
+    def add(
+        self,
+        user_id,
+        category_id,
+        created_at,
+        currency,
+        amount_minor,
+        sign: int = 1,
+    ):
+        if user_id is None or created_at is None or amount_minor is None:
+            return
+        key = (user_id, category_id, created_at.date(), currency)
+        delta = self.deltas[key]
+        delta[0] += sign * amount_minor
+        delta[1] += sign
+
+    def add_group(self, user_id, category_id, day, currency, total, count):
+        delta = self.deltas[(user_id, category_id, day, currency)]
+        delta[0] += total
+        delta[1] += count
+
+    def __bool__(self):
+        return any(count or total for total, count in self.deltas.values())
+
+    def rows(self) -> list[dict]:
+        return [
+            {
+                "user_id": user_id,
+                "category_id": category_id,
+                "day": day,
+                "currency": currency,
+                "total_minor": total,
+                "count": count,
+            }
+            for (user_id, category_id, day, currency), (
+                total,
+                count,
+            ) in sorted(self.deltas.items())
+            if count or total
+        ]
+
+
+class DailyExpenseRollup(db.Model):
+    """Per-user, per-category, per-day, per-currency total (in minor
+    units) and count of live expenses.
+
+    Kept in step with ``expenses`` in the same transaction as every write:
+    ORM flushes are tracked by a session hook (see ``src.models.expenses``)
+    and the set-based writes in ``Expense`` apply their own deltas. The
+    same deltas update the monthly ``BudgetSpending``.
+    Summaries over whole days read these rows instead of the expenses.
+    """
+
+    __tablename__ = "daily_expense_rollups"
+    user_id: Mapped[int] = mapped_column(
+        db.ForeignKey("users.id", name="fk_daily_expense_rollup_user_id"),
+        primary_key=True,
+    )
+    category_id: Mapped[int] = mapped_column(
+        db.ForeignKey(
+            "categories.id", name="fk_daily_expense_rollup_category_id"
+        ),
+        primary_key=True,
+    )
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    currency: Mapped[str] = mapped_column(String(3), primary_key=True)
+    total_minor: Mapped[int] = mapped_column(
+        BigInteger, nullable=False, default=0
+    )
+    count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    @classmethod
+    def apply(cls, deltas: RollupDeltas, connection=None):
+        """Add ``deltas`` to the stored totals, creating rows as needed and
+        dropping the ones left empty, and to the budgets they count
+        towards (see ``Budget.apply_spending``)."""
+        from src.models.budgets import Budget
+
+        rows = deltas.rows()
+        if not rows:
+            return
+        connection = connection or db.session.connection()
+        dialect_insert = (
+            postgresql.insert
+            if connection.dialect.name == "postgresql"
+            else sqlite.insert
+        )
+        stmt = dialect_insert(cls.__table__)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[
+                cls.user_id,
+                cls.category_id,
+                cls.day,
+                cls.currency,
+            ],
+            set_={
+                "total_minor": cls.total_minor + stmt.excluded.total_minor,
+                "count": cls.count + stmt.excluded.count,
+            },
+        )
+        connection.execute(stmt, rows)
+        connection.execute(
+            delete(cls.__table__).where(
+                cls.count <= 0,
+                cls.user_id.in_({row["user_id"] for row in rows}),
+            )
+        )
+        Budget.apply_spending(deltas, connection)
+
+    @staticmethod
+    def _source_stmt(user_id: Optional[int] = None):
+        """Daily totals computed from the expenses themselves."""
+        from src.models.expenses import Expense
+
+        day = func.date(Expense.created_at, type_=Date)
+        stmt = (
+            select(
+                Expense.user_id,
+                Expense.category_id,
+                day.label("day"),
+                Expense.currency,
+                func.sum(Expense.amount_minor).label("total_minor"),
+                func.count().label("count"),
+            )
+            .where(Expense.deleted_at.is_(None), Expense.user_id.isnot(None))
+            .group_by(
+                Expense.user_id, Expense.category_id, day, Expense.currency
+            )
+        )
+        if user_id is not None:
+            stmt = stmt.where(Expense.user_id == user_id)
+        return stmt
+
+    @classmethod
+    def rebuild(cls, user_id: Optional[int] = None) -> int:
+        """Recompute the rollups (of one user, or everyone) from the
+        expenses. Returns the number of rows written; the caller commits."""
+        clear = delete(cls)
+        if user_id is not None:
+            clear = clear.where(cls.user_id == user_id)
+        db.session.execute(clear)
+        result = db.session.execute(
+            insert(cls).from_select(
+                [
+                    "user_id",
+                    "category_id",
+                    "day",
+                    "currency",
+                    "total_minor",
+                    "count",
+                ],
+                cls._source_stmt(user_id),
+            )
+        )
+        return result.rowcount
+
+    @classmethod
+    def verify(cls, user_id: Optional[int] = None) -> list[tuple]:
+        """Compare the rollups with the expenses. Returns
+        ``(user_id, category_id, day, currency, stored, expected)`` for
+        each mismatch, where ``stored``/``expected`` are
+        ``(total_minor, count)``."""
+        stored_stmt = select(
+            cls.user_id,
+            cls.category_id,
+            cls.day,
+            cls.currency,
+            cls.total_minor,
+            cls.count,
+        )
+        if user_id is not None:
+            stored_stmt = stored_stmt.where(cls.user_id == user_id)
+        stored = {
+            tuple(row[:4]): (int(row.total_minor), row.count)
+            for row in db.session.execute(stored_stmt)
+        }
+        expected = {
+            tuple(row[:4]): (int(row.total_minor), row.count)
+            for row in db.session.execute(cls._source_stmt(user_id))
+        }
+        mismatches = []
+        for key in sorted(stored.keys() | expected.keys()):
+            have = stored.get(key, (0, 0))
+            want = expected.get(key, (0, 0))
+            if have != want:
+                mismatches.append((*key, have, want))
+        return mismatches
+
+    @classmethod
+    def summary_stmt(
+        cls,
+        user_id: int,
+        group_keys,
+        first_day: Optional[date] = None,
+        end_day: Optional[date] = None,
+        category_ids: Optional[list[int]] = None,
+    ):
+        """Aggregate the rollups of days in ``[first_day, end_day)``."""
+        stmt = select(
+            *group_keys(cls.category_id, cls.day),
+            cls.currency,
+            func.sum(cls.total_minor).label("total_minor"),
+            func.sum(cls.count).label("count"),
+        ).where(cls.user_id == user_id)
+        if first_day is not None:
+            stmt = stmt.where(cls.day >= first_day)
+        if end_day is not None:
+            stmt = stmt.where(cls.day < end_day)
+        if category_ids:
+            stmt = stmt.where(cls.category_id.in_(category_ids))
+        return stmt
+
+
+def full_days(
+    start: Optional[datetime], end: Optional[datetime]
+) -> tuple[Optional[date], Optional[date]]:
+    """The span ``[first_day, end_day)`` of whole days inside the inclusive
+    range ``[start, end]``; ``None`` means unbounded."""
+    first_day = None
+    if start is not None:
+        first_day = start.date()
+        if start.time() != time():
+            first_day += timedelta(days=1)
+    end_day = end.date() if end is not None else None
+    return first_day, end_day
@@ -0,0 +1,115 @@
+import re
+from sqlalchemy import DDL, Float, cast, column, event, false, func
+from sqlalchemy import literal_column, select, table
+from sqlalchemy.dialects.postgresql import TSQUERY
+
+# Full-text index over expense notes, maintained by the database itself:
+#
+# - SQLite: an external-content FTS5 table kept in sync by triggers.
+# - Postgres: a generated tsvector column with a GIN index.
+#
+# Both also index the owner of each note (the ``user_id`` column of the
+# FTS5 table, a ``__u<id>`` lexeme in the tsvector), so a search matches
+# within one user's notes instead of everyone's.
+#
+# Neither is part of the model; both are created with the expenses table
+# (see ``attach_search_ddl``) and by migrations 4f1a7c9e2b58 and
+# 3e9d5b1c7a20. SQLite triggers are lost if a batch migration recreates
+# ``expenses``, so such a migration must recreate them and rebuild the
+# index.
+FTS_TABLE = "expenses_fts"
+TSVECTOR_COLUMN = "note_tsv"
+TSVECTOR_INDEX = "idx_expense_note_tsv"
+
+SQLITE_DDL = (
+    f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+    "note, user_id, content='expenses', content_rowid='id')",
+    f"CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON expenses BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, note, user_id) "
+    "VALUES (new.id, new.note, new.user_id); END",
+    f"CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON expenses BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, note, user_id) "
+    "VALUES ('delete', old.id, old.note, old.user_id); END",
+    f"CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE OF note, user_id "
+    "ON expenses BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, note, user_id) "
+    "VALUES ('delete', old.id, old.note, old.user_id); "
+    f"INSERT INTO {FTS_TABLE}(rowid, note, user_id) "
+    "VALUES (new.id, new.note, new.user_id); END",
+)
+POSTGRES_DDL = (
+    f"ALTER TABLE expenses ADD COLUMN {TSVECTOR_COLUMN} tsvector "
+    "GENERATED ALWAYS AS (to_tsvector('simple', coalesce(note, '')) || "
+    "coalesce(('__u' || user_id::text)::tsvector, ''::tsvector)) STORED",
+    f"CREATE INDEX {TSVECTOR_INDEX} ON expenses "
+    f"USING gin ({TSVECTOR_COLUMN})",
+)
+
+_expenses = table("expenses", column("id"), column(TSVECTOR_COLUMN))
+_fts = table(FTS_TABLE, column("rowid"), column("note"))
+
+
+def attach_search_ddl(expenses_table):
+    for statement in SQLITE_DDL:
+        event.listen(
+            expenses_table,
+            "after_create",
+            DDL(statement).execute_if(dialect="sqlite"),
+        )
+    for statement in POSTGRES_DDL:
+        event.listen(
+            expenses_table,
+            "after_create",
+            DDL(statement).execute_if(dialect="postgresql"),
+        )
+    event.listen(
+        expenses_table,
+        "before_drop",
+        DDL(f"DROP TABLE IF EXISTS {FTS_TABLE}").execute_if(dialect="sqlite"),
+    )
+
+
+def search_terms(q: str) -> list[str]:
+    """Words of a search box query. Operators and quotes are dropped, so
+    user input can never be a syntax error in either query language."""
+    return re.findall(r"\w+", q.lower())
+
+
+def ranked_matches(q: str, dialect: str, user_id: int):
+    """Subquery of ``(id, rank)`` for the expenses of ``user_id`` whose
+    note matches every word of ``q`` as a prefix.
+
+    A higher rank is a better match. The rank depends only on the note
+    and ``q`` (never on other notes), so it is a stable keyset cursor.
+    """
+    terms = search_terms(q)
+    if dialect == "postgresql":
+        query = func.to_tsquery(
+            "simple", " & ".join(f"{term}:*" for term in terms)
+        )
+        owner = cast(f"__u{int(user_id)}", TSQUERY)
+        vector = _expenses.c[TSVECTOR_COLUMN]
+        stmt = select(
+            _expenses.c.id, func.ts_rank(vector, query).label("rank")
+        ).where(vector.op("@@")(owner.op("&&")(query)))
+    else:
+        # Matched words per character of the note. highlight() marks the
+        # tokens the MATCH itself matched (same tokenizer, case folding
+        # and prefixes); bm25 would weigh each term by how common it is
+        # across every user's notes.
+        fts = literal_column(FTS_TABLE)
+        marked = func.highlight(fts, 0, func.char(1), "")
+        matched = func.length(marked) - func.length(_fts.c.note)
+        stmt = select(
+            _fts.c.rowid.label("id"),
+            (cast(matched, Float) / func.length(_fts.c.note)).label("rank"),
+        ).where(
+            fts.match(
+                f'user_id : "{int(user_id)}" AND note : ('
+                + " ".join(f'"{term}"*' for term in terms)
+                + ")"
+            )
+        )
+    if not terms:
+        stmt = stmt.where(false())
+    return stmt.subquery("ranked")
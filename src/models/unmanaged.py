@@ -0,0 +1,19 @@
+from src.models.partitions import DEFAULT_PARTITION, PARTITIONED_TABLE
+from src.models.search import FTS_TABLE, TSVECTOR_COLUMN, TSVECTOR_INDEX
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    """Alembic autogenerate filter for the database objects that are
+    managed outside the models: expense partitions and the full-text
+    index. Without it ``flask db migrate`` would propose dropping them."""
+    if type_ == "table" and reflected and compare_to is None:
+        return not (
+            name.startswith(FTS_TABLE)
+            or name.startswith(f"{PARTITIONED_TABLE}_p")
+            or name == DEFAULT_PARTITION
+        )
+    if type_ == "column" and reflected and compare_to is None:
+        return name != TSVECTOR_COLUMN
+    if type_ == "index" and reflected and compare_to is None:
+        return name != TSVECTOR_INDEX
+    return True
@@ -1,12 +1,16 @@
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import String, or_, DateTime
+from sqlalchemy import String, DateTime, func, select, union_all
 from datetime import datetime
 
-from src.models.base import SoftDeleteModel, CreateUpdateModel
-from src.extensions import db, bcrypt
+from src.models.base import (
+    RELATIONSHIP_LAZY,
+    CreateUpdateModel,
+    SoftDeleteModel,
+)
+from src.extensions import db
+from src.services.passwords import password_hasher
 from typing import TYPE_CHECKING
 
-
 if TYPE_CHECKING:
     from src.models.expenses import Expense
     from src.models.categories import Category
@@ -14,32 +18,114 @@ if TYPE_CHECKING:
 
 class User(SoftDeleteModel, CreateUpdateModel):
     __tablename__ = "users"
-    __tableargs__ = db.Index("idx_user_username", "username")
     active: Mapped[bool] = mapped_column(
         nullable=False, default=True, server_default="1"
     )
-    username: Mapped[str] = mapped_column(
-        String(50), nullable=False, unique=True
-    )
+    # Stored lowercased; unique among live users (see the indexes below).
+    username: Mapped[str] = mapped_column(String(50), nullable=False)
     first_name: Mapped[str] = mapped_column(String(50), nullable=False)
     last_name: Mapped[str] = mapped_column(String(50), nullable=False)
-    email: Mapped[str] = mapped_column(
-        String(100), nullable=False, unique=True
-    )
+    email: Mapped[str] = mapped_column(String(100), nullable=False)
     password_hash: Mapped[str] = mapped_column(String(255), nullable=False)
-    expenses: Mapped[list["Expense"]] = relationship(back_populates="user")
-    categories: Mapped[list["Category"]] = relationship(back_populates="user")
+    expenses: Mapped[list["Expense"]] = relationship(
+        back_populates="user", lazy=RELATIONSHIP_LAZY
+    )
+    categories: Mapped[list["Category"]] = relationship(
+        back_populates="user", lazy=RELATIONSHIP_LAZY
+    )
     last_logout_at: Mapped[datetime] = mapped_column(DateTime, nullable=True)
+    token_version: Mapped[int] = mapped_column(
+        nullable=False, default=0, server_default="0"
+    )
+
+    @classmethod
+    def select_by_login(cls, login: str):
+        """Select the live user whose username or email is ``login``
+        (case-insensitive).
+
+        Each branch matches one of the ``lower()`` indexes exactly, so the
+        lookup is index seeks rather than an ``OR`` the planner may turn
+        into a scan. Emails always contain "@", so a login without one
+        only needs the username branch.
+        """
+        login = login.lower()
+        branches = [
+            select(cls.id).where(
+                func.lower(cls.username) == login, cls.deleted_at.is_(None)
+            )
+        ]
+        if "@" in login:
+            branches.append(
+                select(cls.id).where(
+                    func.lower(cls.email) == login, cls.deleted_at.is_(None)
+                )
+            )
+        return select(cls).where(cls.id.in_(union_all(*branches)))
+
+    @classmethod
+    def select_taken(cls, username: str, email: str):
+        """Select whether a live user already has ``username`` or
+        ``email`` (case-insensitive): one seek on each ``lower()`` index."""
+        taken = union_all(
+            select(cls.id).where(
+                func.lower(cls.username) == username.lower(),
+                cls.deleted_at.is_(None),
+            ),
+            select(cls.id).where(
+                func.lower(cls.email) == email.lower(),
+                cls.deleted_at.is_(None),
+            ),
+        )
+        return select(taken.exists())
+
+    @classmethod
+    def is_taken(cls, username: str, email: str) -> bool:
+        return db.session.execute(cls.select_taken(username, email)).scalar()
 
     @classmethod
     def get_by_username_or_email(cls, login: str):
         """Find user by username or email (case-insensitive)"""
-        stmt = cls.select_active().where(
-            or_(cls.username == login.lower(), cls.email == login.lower())
-        )
-        return db.session.execute(stmt).scalars().first()
+        return db.session.execute(cls.select_by_login(login)).scalars().first()
+
+    def revoke_tokens(self):
+        """Invalidate every token issued so far.
+
+        Tokens carry the ``token_version`` they were minted with, so bumping
+        it (atomically, in SQL) makes all of them fail validation.
+        """
+        self.token_version = User.token_version + 1
+        return self
+
+    def deactivate(self, commit: bool = False):
+        self.active = False
+        self.revoke_tokens()
+        if commit:
+            db.session.commit()
+        return self
+
+    def soft_delete(self, commit: bool = False):
+        self.revoke_tokens()
+        return super().soft_delete(commit=commit)
 
     def set_password(self, password: str):
-        hashed = bcrypt.generate_password_hash(password).decode("utf-8")
-        self.password_hash = hashed
+        self.password_hash = password_hasher.hash(password)
         self.save()
+
+
+# Usernames and emails are unique among live users, case-insensitively;
+# the accounts of deleted users do not hold on to them. These indexes also
+# serve the login lookup.
+db.Index(
+    "uq_user_username_lower",
+    func.lower(User.username),
+    unique=True,
+    postgresql_where=User.deleted_at.is_(None),
+    sqlite_where=User.deleted_at.is_(None),
+)
+db.Index(
+    "uq_user_email_lower",
+    func.lower(User.email),
+    unique=True,
+    postgresql_where=User.deleted_at.is_(None),
+    sqlite_where=User.deleted_at.is_(None),
+)
@@ -0,0 +1,79 @@
+from marshmallow import Schema, fields, validate
+
+from src.schemas.expenses import CURRENCIES
+from src.schemas.fields import Money
+from src.services.analytics import OUTLIER_METHODS
+
+
+class AnalyticsRequestSchema(Schema):
+    currency = fields.Str(
+        validate=validate.OneOf(CURRENCIES),
+        metadata={
+            "description": "Only expenses in it; defaults to the server "
+            "default currency"
+        },
+    )
+    window = fields.Int(
+        load_default=7,
+        validate=validate.Range(min=1, max=366),
+        metadata={"description": "Days in the moving average"},
+    )
+    outliers = fields.Str(
+        load_default="zscore",
+        validate=validate.OneOf(list(OUTLIER_METHODS)),
+        metadata={"description": "zscore or iqr"},
+    )
+    threshold = fields.Float(
+        validate=validate.Range(min=0, min_inclusive=False),
+        metadata={"description": "Defaults to 3 (zscore) or 1.5 (iqr)"},
+    )
+
+
+class AnalyticsDaySchema(Schema):
+    day = fields.Date()
+    total = Money(minor_attribute="total_minor")
+    moving_average = Money(minor_attribute="moving_average_minor")
+
+
+class AnalyticsMonthSchema(Schema):
+    month = fields.Str(metadata={"description": "YYYY-MM"})
+    total = Money(minor_attribute="total_minor")
+    change = Money(minor_attribute="change_minor", allow_none=True)
+    change_pct = fields.Float(allow_none=True)
+
+
+class AnalyticsCategorySchema(Schema):
+    category_id = fields.Int()
+    total = Money(minor_attribute="total_minor")
+    count = fields.Int()
+    share = fields.Float(metadata={"description": "Of the overall total"})
+
+
+class AnalyticsOutlierSchema(Schema):
+    id = fields.Int()
+    amount = Money()
+    category_id = fields.Int()
+    created_at = fields.DateTime()
+    score = fields.Float(metadata={"description": "z-score of the amount"})
+
+
+class AnalyticsOutliersSchema(Schema):
+    method = fields.Str()
+    threshold = fields.Float()
+    count = fields.Int()
+    items = fields.List(
+        fields.Nested(AnalyticsOutlierSchema),
+        metadata={"description": "Most unusual first, at most 50"},
+    )
+
+
+class AnalyticsResponseSchema(Schema):
+    currency = fields.Str()
+    count = fields.Int()
+    total = Money(minor_attribute="total_minor")
+    average = Money(minor_attribute="average_minor", allow_none=True)
+    window = fields.Int()
+    daily = fields.List(fields.Nested(AnalyticsDaySchema))
+    monthly = fields.List(fields.Nested(AnalyticsMonthSchema))
+    categories = fields.List(fields.Nested(AnalyticsCategorySchema))
+    outliers = fields.Nested(AnalyticsOutliersSchema)
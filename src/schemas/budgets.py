@@ -0,0 +1,54 @@
+from marshmallow import Schema, fields, validate, validates_schema
+
+from src.schemas.expenses import CURRENCIES
+from src.schemas.fields import Money
+from src.services.money import default_currency, to_minor
+
+
+class BudgetSchema(Schema):
+    id = fields.Int(dump_only=True)
+    category_id = fields.Int(required=True)
+    amount = Money(required=True, metadata={"description": "Per month"})
+    currency = fields.Str(
+        validate=validate.OneOf(CURRENCIES),
+        metadata={"description": "Only expenses in it count"},
+    )
+    alert_at = fields.Int(
+        load_default=100,
+        validate=validate.Range(min=1, max=1000),
+        metadata={"description": "Percentage of the amount to alert at"},
+    )
+    created_at = fields.DateTime(dump_only=True)
+    updated_at = fields.DateTime(dump_only=True)
+    user_id = fields.Int(dump_only=True)
+
+    @validates_schema
+    def validate_amount(self, data, **kwargs):
+        if "amount" in data:
+            to_minor(data["amount"], data.get("currency", default_currency()))
+
+
+class BudgetRequestSchema(Schema):
+    month = fields.Date(
+        format="%Y-%m",
+        metadata={"description": "YYYY-MM; defaults to the current month"},
+    )
+
+
+class BudgetStatusSchema(Schema):
+    id = fields.Int()
+    category_id = fields.Int()
+    month = fields.Date(format="%Y-%m")
+    currency = fields.Str()
+    amount = Money()
+    alert_at = fields.Int()
+    spent = Money(minor_attribute="spent_minor")
+    remaining = Money(
+        minor_attribute="remaining_minor",
+        metadata={"description": "Negative once over budget"},
+    )
+    over_budget = fields.Bool()
+    alerted_at = fields.DateTime(
+        allow_none=True,
+        metadata={"description": "When spending reached alert_at"},
+    )
@@ -1,4 +1,23 @@
-from marshmallow import Schema, fields
+from marshmallow import Schema, fields, validate
+from webargs.fields import DelimitedList
+
+from src.schemas.base import PaginationResponseSchema
+from src.schemas.fields import Money
+
+
+class CategoryCurrencyTotalSchema(Schema):
+    currency = fields.Str()
+    total = Money(minor_attribute="total_minor")
+    count = fields.Int()
+
+
+class CategoryStatsSchema(Schema):
+    count = fields.Int()
+    last_used_on = fields.Date(allow_none=True)
+    totals = fields.List(
+        fields.Nested(CategoryCurrencyTotalSchema),
+        metadata={"description": "One entry per currency"},
+    )
 
 
 class CategorySchema(Schema):
@@ -10,3 +29,41 @@ class CategorySchema(Schema):
     updated_at = fields.DateTime(dump_only=True)
     deleted_at = fields.DateTime(dump_only=True)
     user_id = fields.Int(dump_only=True)
+    stats = fields.Nested(
+        CategoryStatsSchema,
+        dump_only=True,
+        metadata={"description": "Only with include=stats"},
+    )
+
+
+class CategoryRequestSchema(Schema):
+    include = DelimitedList(
+        fields.Str(validate=validate.OneOf(["stats"])),
+        load_default=list,
+        metadata={
+            "description": "Comma-separated; stats adds expense counts, "
+            "totals and the last day used"
+        },
+    )
+    limit = fields.Int(
+        load_default=100, validate=validate.Range(min=1, max=1000)
+    )
+    cursor_id = fields.Int()
+
+
+class CategoryResponseSchema(PaginationResponseSchema):
+    data = fields.List(fields.Nested(CategorySchema))
+
+
+class CategoryDeleteRequestSchema(Schema):
+    reassign_to = fields.Int(
+        metadata={
+            "description": "Category that takes over the expenses and "
+            "recurring rules; required if there are any"
+        }
+    )
+
+
+class CategoryDeleteResponseSchema(Schema):
+    moved_expenses = fields.Int()
+    moved_rules = fields.Int()
@@ -0,0 +1,132 @@
+from collections.abc import Mapping
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Callable, Iterable, Optional
+from flask import current_app
+from marshmallow import Schema, fields, missing
+
+# Fields whose marshmallow serialization is a plain conversion of a
+# non-None value. Subclasses are deliberately excluded: they may override
+# ``_serialize`` and must go through it.
+_CONVERTERS = {
+    fields.Integer: "int",
+    fields.Float: "float",
+    fields.String: "str",
+    fields.Email: "str",
+}
+_ISO_FORMATS = (None, "iso", "iso8601")
+
+
+class CompiledSchema:
+    """Dump functions generated once for a marshmallow schema.
+
+    ``Schema.dump`` re-resolves each field's accessor, default and format
+    for every value it serializes. Here that work is done once: each
+    schema becomes a generated function that reads the attributes and
+    formats them inline. Field types without an inline form fall back to
+    the field's own ``_serialize``, so the output is always identical to
+    ``Schema.dump``; the schema classes themselves are untouched and keep
+    driving validation and the OpenAPI documentation.
+    """
+
+    def __init__(self, schema: Schema):
+        self.schema = schema
+        self._dump_object = self._compile(schema, mapping=False)
+        self._dump_mapping = self._compile(schema, mapping=True)
+
+    def dump(self, obj: Any) -> dict:
+        if isinstance(obj, Mapping):
+            return self._dump_mapping(obj)
+        return self._dump_object(obj)
+
+    def dump_many(self, objs: Iterable[Any]) -> list[dict]:
+        objs = list(objs)
+        if not objs:
+            return []
+        dump = (
+            self._dump_mapping
+            if isinstance(objs[0], Mapping)
+            else self._dump_object
+        )
+        return [dump(obj) for obj in objs]
+
+    @staticmethod
+    def _compile(schema: Schema, mapping: bool) -> Callable[[Any], dict]:
+        namespace: dict[str, Any] = {"MISSING": missing}
+        lines = ["def dump(obj):", "    out = {}"]
+        for index, (name, field) in enumerate(schema.dump_fields.items()):
+            key = field.data_key if field.data_key is not None else name
+            attr = field.attribute or name
+            ref = f"_field{index}"
+            namespace[ref] = field
+            if (
+                field.dump_default is not missing
+                or "." in attr
+                or type(field).get_value is not fields.Field.get_value
+            ):
+                # Let marshmallow handle defaults, dotted paths and fields
+                # that read their value themselves.
+                lines += [
+                    f"    v = {ref}.serialize({name!r}, obj, {ref}_get)",
+                    "    if v is not MISSING:",
+                    f"        out[{key!r}] = v",
+                ]
+                namespace[f"{ref}_get"] = schema.get_attribute
+                continue
+            if mapping:
+                lines.append(f"    v = obj.get({attr!r}, MISSING)")
+            else:
+                lines.append(f"    v = getattr(obj, {attr!r}, MISSING)")
+            lines.append("    if v is not MISSING:")
+            lines.append(
+                f"        out[{key!r}] = "
+                + CompiledSchema._value_source(field, ref, attr, namespace)
+            )
+        lines.append("    return out")
+        exec(
+            compile("\n".join(lines), f"<compiled {schema!r}>", "exec"),
+            namespace,
+        )
+        return namespace["dump"]
+
+    @staticmethod
+    def _value_source(field, ref: str, attr: str, namespace: dict) -> str:
+        field_type = type(field)
+        if field_type in _CONVERTERS and not getattr(
+            field, "as_string", False
+        ):
+            return f"None if v is None else {_CONVERTERS[field_type]}(v)"
+        if field_type is fields.DateTime and field.format in _ISO_FORMATS:
+            namespace["isoformat"] = datetime.isoformat
+            return "None if v is None else isoformat(v)"
+        if field_type is fields.Nested:
+            nested = compile_schema(field.schema)
+            many = field.many or field.schema.many
+            namespace[f"{ref}_nested"] = (
+                nested.dump_many if many else nested.dump
+            )
+            return f"None if v is None else {ref}_nested(v)"
+        return f"{ref}._serialize(v, {attr!r}, obj)"
+
+
+@lru_cache(maxsize=None)
+def _compile_cached(schema_cls: type, only: Optional[tuple]) -> CompiledSchema:
+    return CompiledSchema(schema_cls(only=only))
+
+
+def compile_schema(
+    schema: Schema | type, only: Optional[Iterable[str]] = None
+) -> CompiledSchema:
+    """Return the compiled form of ``schema``.
+
+    Schema classes (optionally narrowed with ``only``) are compiled once
+    and cached; schema instances are compiled as configured.
+    """
+    if isinstance(schema, Schema):
+        return CompiledSchema(schema)
+    return _compile_cached(schema, tuple(sorted(only)) if only else None)
+
+
+def json_response(payload: Any):
+    """Encode ``payload`` exactly like ``jsonify`` would."""
+    return current_app.json.response(payload)
@@ -1,29 +1,249 @@
-from marshmallow import Schema, fields
+from marshmallow import (
+    Schema,
+    ValidationError,
+    fields,
+    validate,
+    validates_schema,
+)
+from flask_smorest.fields import Upload
+from webargs.fields import DelimitedList
+from src.models.functions import PERIODS
 from src.schemas.base import PaginationRequestSchema, PaginationResponseSchema
+from src.schemas.fields import Money
+from src.services.money import CURRENCY_EXPONENTS, default_currency, to_minor
+
+CURRENCIES = sorted(CURRENCY_EXPONENTS)
 
 
 class ExpenseSchema(Schema):
     id = fields.Int(dump_only=True)
-    amount = fields.Float(required=True)
+    amount = Money(required=True)
+    currency = fields.Str(
+        validate=validate.OneOf(CURRENCIES),
+        metadata={
+            "description": "ISO 4217 code; defaults to the server default"
+        },
+    )
     note = fields.Str()
     category_id = fields.Int(required=True)
     created_at = fields.DateTime(dump_only=True)
     updated_at = fields.DateTime(dump_only=True)
     deleted_at = fields.DateTime(dump_only=True)
     user_id = fields.Int(dump_only=True)
+    recurring_expense_id = fields.Int(
+        dump_only=True,
+        metadata={"description": "Rule that entered it, if any"},
+    )
+
+    @validates_schema
+    def validate_amount(self, data, **kwargs):
+        if "amount" in data:
+            to_minor(data["amount"], data.get("currency", default_currency()))
+
+
+class ExpenseCategorySchema(Schema):
+    id = fields.Int()
+    name = fields.Str()
+    description = fields.Str()
+    color = fields.Str()
+
+
+class ExpenseWithCategorySchema(ExpenseSchema):
+    category = fields.Nested(
+        ExpenseCategorySchema,
+        dump_only=True,
+        metadata={"description": "Only with include=category"},
+    )
+
+
+class ExpenseIncludeSchema(Schema):
+    include = DelimitedList(
+        fields.Str(validate=validate.OneOf(["category"])),
+        load_default=list,
+        metadata={
+            "description": "Comma-separated related data to embed: category"
+        },
+    )
 
 
 class UpdateExpenseSchema(Schema):
-    amount = fields.Float()
+    amount = Money()
+    currency = fields.Str(validate=validate.OneOf(CURRENCIES))
     note = fields.Str()
     category_id = fields.Int()
 
 
-class ExpenseRequestSchema(PaginationRequestSchema):
+class ExpenseFilterSchema(Schema):
     start_date = fields.DateTime()
     end_date = fields.DateTime()
     category_ids = fields.List(fields.Int())
 
 
+class ExpenseRequestSchema(
+    PaginationRequestSchema, ExpenseFilterSchema, ExpenseIncludeSchema
+):
+    field_names = DelimitedList(
+        fields.Str(validate=validate.OneOf(list(ExpenseSchema().fields))),
+        data_key="fields",
+        metadata={"description": "Comma-separated subset of fields"},
+    )
+    q = fields.Str(
+        validate=validate.Length(min=1, max=200),
+        metadata={"description": "Search notes; results are best first"},
+    )
+    cursor_rank = fields.Float(
+        metadata={"description": "Keyset cursor of a q= search"}
+    )
+
+
+class ExpenseExportRequestSchema(ExpenseFilterSchema):
+    format = fields.Str(
+        load_default="ndjson", validate=validate.OneOf(["ndjson", "csv"])
+    )
+    convert_to = fields.Str(
+        validate=validate.OneOf(CURRENCIES),
+        metadata={
+            "description": "Add converted_amount in this currency, at the "
+            "rate of each expense's day (null without a rate)"
+        },
+    )
+
+
 class ExpenseResponseSchema(PaginationResponseSchema):
-    data = fields.List(fields.Nested(ExpenseSchema))
+    data = fields.List(fields.Nested(ExpenseWithCategorySchema))
+
+
+class BulkExpenseRequestSchema(Schema):
+    items = fields.List(
+        fields.Dict(),
+        required=True,
+        validate=validate.Length(min=1, max=10000),
+        metadata={"description": "Expenses, each shaped like ExpenseSchema"},
+    )
+
+
+class BulkItemErrorSchema(Schema):
+    index = fields.Int()
+    messages = fields.Dict()
+
+
+class BulkExpenseResponseSchema(Schema):
+    created = fields.List(fields.Nested(ExpenseSchema))
+    errors = fields.List(fields.Nested(BulkItemErrorSchema))
+
+
+class ExpenseSelectionSchema(ExpenseFilterSchema):
+    ids = fields.List(fields.Int(), validate=validate.Length(min=1))
+
+    @validates_schema
+    def validate_selection(self, data, **kwargs):
+        if not any(
+            data.get(key) for key in ("ids", *ExpenseFilterSchema().fields)
+        ):
+            raise ValidationError(
+                "Select expenses with ids or at least one filter"
+            )
+
+
+class BulkUpdateExpenseSchema(ExpenseSelectionSchema):
+    changes = fields.Nested(
+        UpdateExpenseSchema,
+        required=True,
+        validate=validate.Length(min=1),
+    )
+
+    @validates_schema
+    def validate_changes(self, data, **kwargs):
+        changes = data.get("changes", {})
+        if "currency" in changes and "amount" not in changes:
+            raise ValidationError(
+                "Change the currency together with the amount",
+                field_name="changes",
+            )
+
+
+class BulkAffectedSchema(Schema):
+    affected = fields.Int()
+
+
+class ExpenseImportRequestSchema(Schema):
+    format = fields.Str(
+        validate=validate.OneOf(["csv", "ofx"]),
+        metadata={"description": "Defaults to the file extension"},
+    )
+    default_category_id = fields.Int(
+        metadata={"description": "For rows without a known category"}
+    )
+
+
+class ExpenseImportFileSchema(Schema):
+    file = Upload(required=True)
+
+
+class ImportLineErrorSchema(Schema):
+    line = fields.Int()
+    messages = fields.Dict()
+
+
+class ExpenseImportResponseSchema(Schema):
+    processed = fields.Int()
+    imported = fields.Int()
+    duplicates = fields.Int()
+    skipped = fields.Int()
+    error_count = fields.Int()
+    errors = fields.List(fields.Nested(ImportLineErrorSchema))
+
+
+class ExpenseSummaryRequestSchema(ExpenseFilterSchema):
+    group_by = DelimitedList(
+        fields.Str(validate=validate.OneOf(["category", *PERIODS])),
+        load_default=list,
+        metadata={
+            "description": "Comma-separated: category and/or one of "
+            "day, week, month"
+        },
+    )
+
+    convert_to = fields.Str(
+        validate=validate.OneOf(CURRENCIES),
+        metadata={
+            "description": "Report every amount in this currency, at the "
+            "rate of its day"
+        },
+    )
+
+    @validates_schema
+    def validate_group_by(self, data, **kwargs):
+        if len(set(data["group_by"]) & set(PERIODS)) > 1:
+            raise ValidationError(
+                "Group by at most one period", field_name="group_by"
+            )
+
+
+class ExpenseCurrencyTotalSchema(Schema):
+    currency = fields.Str()
+    total = Money(minor_attribute="total_minor")
+    count = fields.Int()
+    average = Money(minor_attribute="average_minor")
+
+
+class ExpenseSummaryGroupSchema(ExpenseCurrencyTotalSchema):
+    category_id = fields.Int(allow_none=True)
+    period = fields.Str(
+        allow_none=True, metadata={"description": "Period start, YYYY-MM-DD"}
+    )
+
+
+class ExpenseSummaryResponseSchema(Schema):
+    currency = fields.Str(
+        allow_none=True,
+        metadata={"description": "Null when expenses mix currencies"},
+    )
+    total = Money(minor_attribute="total_minor", allow_none=True)
+    count = fields.Int()
+    average = Money(minor_attribute="average_minor", allow_none=True)
+    totals = fields.List(
+        fields.Nested(ExpenseCurrencyTotalSchema),
+        metadata={"description": "One entry per currency"},
+    )
+    groups = fields.List(fields.Nested(ExpenseSummaryGroupSchema))
@@ -0,0 +1,57 @@
+from decimal import Decimal, InvalidOperation
+from marshmallow import fields, missing, utils
+
+from src.services.money import format_amount
+
+
+class Money(fields.Field):
+    """An amount stored as integer minor units next to its currency.
+
+    Dumps ``minor_attribute`` of the object in the currency named by its
+    ``currency_attribute``, as a float or an exact decimal string (see
+    ``src.services.money.money_format``). Loads a number or a numeric
+    string as a ``Decimal``; the caller converts it to minor units.
+    """
+
+    default_error_messages = {"invalid": "Not a valid amount."}
+
+    def __init__(
+        self,
+        minor_attribute: str = "amount_minor",
+        currency_attribute: str = "currency",
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self.minor_attribute = minor_attribute
+        self.currency_attribute = currency_attribute
+
+    @property
+    def columns(self) -> tuple[str, str]:
+        """The attributes a dump reads, for callers selecting columns."""
+        return self.minor_attribute, self.currency_attribute
+
+    def get_value(self, obj, attr, accessor=None, default=missing):
+        accessor = accessor or utils.get_value
+        minor = accessor(obj, self.minor_attribute, default)
+        if minor is missing or minor is None:
+            return minor
+        return minor, accessor(obj, self.currency_attribute, default)
+
+    def _serialize(self, value, attr, obj, **kwargs):
+        if value is None:
+            return None
+        minor, currency = value
+        return format_amount(minor, currency)
+
+    def _deserialize(self, value, attr, data, **kwargs):
+        if isinstance(value, bool) or not isinstance(
+            value, (int, float, str, Decimal)
+        ):
+            raise self.make_error("invalid")
+        try:
+            amount = Decimal(str(value))
+        except InvalidOperation as error:
+            raise self.make_error("invalid") from error
+        if not amount.is_finite():
+            raise self.make_error("invalid")
+        return amount
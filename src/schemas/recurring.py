@@ -0,0 +1,54 @@
+from datetime import timezone
+from marshmallow import (
+    Schema,
+    ValidationError,
+    fields,
+    validate,
+    validates_schema,
+)
+
+from src.models.recurring import FREQUENCIES
+from src.schemas.expenses import CURRENCIES
+from src.schemas.fields import Money
+from src.services.money import default_currency, to_minor
+
+
+class RecurringExpenseSchema(Schema):
+    id = fields.Int(dump_only=True)
+    amount = Money(required=True)
+    currency = fields.Str(validate=validate.OneOf(CURRENCIES))
+    note = fields.Str()
+    category_id = fields.Int(required=True)
+    frequency = fields.Str(required=True, validate=validate.OneOf(FREQUENCIES))
+    interval = fields.Int(
+        load_default=1,
+        validate=validate.Range(min=1, max=1000),
+        metadata={"description": "Every this many days/weeks/months/years"},
+    )
+    starts_at = fields.NaiveDateTime(
+        required=True,
+        timezone=timezone.utc,
+        metadata={"description": "First occurrence; later ones keep its time"},
+    )
+    until = fields.NaiveDateTime(
+        timezone=timezone.utc,
+        metadata={"description": "No occurrences after this time"},
+    )
+    occurrences = fields.Int(dump_only=True)
+    next_run_at = fields.DateTime(
+        dump_only=True,
+        metadata={"description": "Next occurrence; null once ended"},
+    )
+    created_at = fields.DateTime(dump_only=True)
+    updated_at = fields.DateTime(dump_only=True)
+    user_id = fields.Int(dump_only=True)
+
+    @validates_schema
+    def validate_rule(self, data, **kwargs):
+        if "amount" in data:
+            to_minor(data["amount"], data.get("currency", default_currency()))
+        if "until" in data and "starts_at" in data:
+            if data["until"] < data["starts_at"]:
+                raise ValidationError(
+                    "Must not be before starts_at", field_name="until"
+                )
@@ -0,0 +1,334 @@
+from datetime import datetime, timezone
+from typing import Optional
+import numpy as np
+from sqlalchemy import select
+
+from src.extensions import db
+from src.models.data_versions import UserDataVersion
+from src.models.expenses import Expense
+from src.models.functions import epoch_seconds
+from src.services.cache import TTLCache
+from src.services.money import average_minor
+
+# Rows fetched per round trip when loading a snapshot.
+ANALYTICS_LOAD_CHUNK_SIZE = 50000
+# How unusual amounts are flagged, with the default threshold of each:
+# |z-score| above it, or beyond that many interquartile ranges outside
+# the middle half of the amounts.
+OUTLIER_METHODS = {"zscore": 3.0, "iqr": 1.5}
+SECONDS_PER_DAY = 86400
+
+
+class ExpenseSnapshot:
+    """A user's live expenses as parallel NumPy columns.
+
+    ``amounts`` are minor units, ``timestamps`` epoch seconds (int64) and
+    ``currency_codes`` index ``currencies``. Loaded by one projected
+    query, without ORM objects; every metric is computed from these
+    arrays.
+    """
+
+    def __init__(
+        self,
+        ids: np.ndarray,
+        amounts: np.ndarray,
+        category_ids: np.ndarray,
+        timestamps: np.ndarray,
+        currency_codes: np.ndarray,
+        currencies: list[str],
+    ):
+        self.ids = ids
+        self.amounts = amounts
+        self.category_ids = category_ids
+        self.timestamps = timestamps
+        self.currency_codes = currency_codes
+        self.currencies = currencies
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(
+            column.nbytes
+            for column in (
+                self.ids,
+                self.amounts,
+                self.category_ids,
+                self.timestamps,
+                self.currency_codes,
+            )
+        )
+
+    @classmethod
+    def load(
+        cls, user_id: int, chunk_size: int = ANALYTICS_LOAD_CHUNK_SIZE
+    ) -> "ExpenseSnapshot":
+        stmt = select(
+            Expense.id,
+            Expense.amount_minor,
+            Expense.category_id,
+            epoch_seconds(Expense.created_at),
+            Expense.currency,
+        ).where(*Expense.filter_criteria(user_id))
+        # A Core execute skips the ORM's per-row processing, which cost
+        # more than the fetch itself.
+        result = db.session.connection().execute(
+            stmt.execution_options(yield_per=chunk_size)
+        )
+        columns = [[] for _ in range(5)]
+        codes = {}
+        for rows in result.partitions():
+            ids, amounts, category_ids, timestamps, currencies = zip(*rows)
+            columns[0].append(np.array(ids, dtype=np.int64))
+            columns[1].append(np.array(amounts, dtype=np.int64))
+            columns[2].append(np.array(category_ids, dtype=np.int64))
+            columns[3].append(np.array(timestamps, dtype=np.int64))
+            names, inverse = np.unique(currencies, return_inverse=True)
+            columns[4].append(
+                np.array(
+                    [
+                        codes.setdefault(str(name), len(codes))
+                        for name in names
+                    ],
+                    dtype=np.int16,
+                )[inverse]
+            )
+        ids, amounts, category_ids, timestamps, currency_codes = (
+            np.concatenate(chunks) if chunks else np.zeros(0, dtype=dtype)
+            for chunks, dtype in zip(
+                columns, (np.int64,) * 4 + (np.int16,), strict=True
+            )
+        )
+        return cls(
+            ids, amounts, category_ids, timestamps, currency_codes, list(codes)
+        )
+
+    def in_currency(self, currency: str) -> "ExpenseSnapshot":
+        """The expenses in ``currency`` only."""
+        if currency not in self.currencies:
+            return ExpenseSnapshot(*(self.ids[:0],) * 5, [])
+        if len(self.currencies) == 1:
+            return self
+        mask = self.currency_codes == self.currencies.index(currency)
+        return ExpenseSnapshot(
+            self.ids[mask],
+            self.amounts[mask],
+            self.category_ids[mask],
+            self.timestamps[mask],
+            self.currency_codes[mask],
+            self.currencies,
+        )
+
+
+def _days(offsets: np.ndarray, first_day: int) -> list:
+    return (offsets + first_day).astype("datetime64[D]").tolist()
+
+
+def daily_series(snapshot: ExpenseSnapshot, window: int) -> list[dict]:
+    """Total of every calendar day from the first expense to the last
+    (days without expenses included) and its trailing ``window``-day
+    moving average, rounded to whole minor units."""
+    if not len(snapshot):
+        return []
+    days = snapshot.timestamps // SECONDS_PER_DAY
+    first_day = int(days.min())
+    totals = np.bincount(days - first_day, weights=snapshot.amounts)
+    running = np.concatenate(([0.0], np.cumsum(totals)))
+    ends = np.arange(1, len(totals) + 1)
+    starts = np.maximum(ends - window, 0)
+    moving = (running[ends] - running[starts]) / (ends - starts)
+    return [
+        {"day": day, "total_minor": int(total), "moving_average_minor": avg}
+        for day, total, avg in zip(
+            _days(np.arange(len(totals)), first_day),
+            totals.tolist(),
+            np.rint(moving).astype(np.int64).tolist(),
+        )
+    ]
+
+
+def monthly_series(snapshot: ExpenseSnapshot) -> list[dict]:
+    """Total per calendar month with the change from the month before."""
+    if not len(snapshot):
+        return []
+    months = (
+        (snapshot.timestamps // SECONDS_PER_DAY)
+        .astype("datetime64[D]")
+        .astype("datetime64[M]")
+        .astype(np.int64)
+    )
+    first_month = int(months.min())
+    totals = np.bincount(
+        months - first_month, weights=snapshot.amounts
+    ).astype(np.int64)
+    changes = np.diff(totals, prepend=totals[0])
+    previous = np.concatenate(([0], totals[:-1]))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        percents = np.round(changes / previous * 100, 2)
+    labels = (np.arange(len(totals)) + first_month).astype("datetime64[M]")
+    return [
+        {
+            "month": str(label),
+            "total_minor": total,
+            "change_minor": change if index else None,
+            "change_pct": pct if index and prev else None,
+        }
+        for index, (label, total, change, prev, pct) in enumerate(
+            zip(
+                labels,
+                totals.tolist(),
+                changes.tolist(),
+                previous.tolist(),
+                percents.tolist(),
+            )
+        )
+    ]
+
+
+def category_shares(snapshot: ExpenseSnapshot) -> list[dict]:
+    """Total, count and share of the overall total per category, largest
+    first."""
+    if not len(snapshot):
+        return []
+    category_ids, inverse = np.unique(
+        snapshot.category_ids, return_inverse=True
+    )
+    totals = np.bincount(inverse, weights=snapshot.amounts).astype(np.int64)
+    counts = np.bincount(inverse)
+    overall = totals.sum()
+    shares = np.round(totals / overall, 4) if overall else totals * 0.0
+    order = np.argsort(-totals, kind="stable")
+    return [
+        {
+            "category_id": category_id,
+            "total_minor": total,
+            "count": count,
+            "share": share,
+        }
+        for category_id, total, count, share in zip(
+            category_ids[order].tolist(),
+            totals[order].tolist(),
+            counts[order].tolist(),
+            shares[order].tolist(),
+        )
+    ]
+
+
+def outliers(
+    snapshot: ExpenseSnapshot,
+    method: str,
+    threshold: Optional[float] = None,
+    limit: int = 50,
+) -> dict:
+    """Expenses with unusual amounts (see ``OUTLIER_METHODS``), most
+    unusual first, each with its z-score."""
+    threshold = OUTLIER_METHODS[method] if threshold is None else threshold
+    amounts = snapshot.amounts.astype(np.float64)
+    if len(amounts):
+        std = amounts.std()
+        scores = (amounts - amounts.mean()) / std if std else amounts * 0
+    else:
+        scores = amounts
+    if method == "zscore":
+        flagged = np.abs(scores) > threshold
+    elif len(amounts):
+        low, high = np.percentile(amounts, [25, 75])
+        spread = threshold * (high - low)
+        flagged = (amounts < low - spread) | (amounts > high + spread)
+    else:
+        flagged = scores > 0
+    found = np.flatnonzero(flagged)
+    found = found[np.argsort(-np.abs(scores[found]), kind="stable")][:limit]
+    return {
+        "method": method,
+        "threshold": threshold,
+        "count": int(flagged.sum()),
+        "items": [
+            {
+                "id": expense_id,
+                "amount_minor": amount,
+                "category_id": category_id,
+                "created_at": datetime.fromtimestamp(
+                    timestamp, timezone.utc
+                ).replace(tzinfo=None),
+                "score": round(score, 2),
+            }
+            for expense_id, amount, category_id, timestamp, score in zip(
+                snapshot.ids[found].tolist(),
+                snapshot.amounts[found].tolist(),
+                snapshot.category_ids[found].tolist(),
+                snapshot.timestamps[found].tolist(),
+                scores[found].tolist(),
+            )
+        ],
+    }
+
+
+class AnalyticsEngine:
+    """Trend metrics over a user's whole expense history.
+
+    The history is loaded into an ``ExpenseSnapshot`` once and cached per
+    user together with the user's data version, so any write to the
+    user's expenses invalidates it and the next request reloads. Up to
+    ``ANALYTICS_CACHE_SIZE`` users are kept for ``ANALYTICS_CACHE_TTL``
+    seconds (0 disables the cache).
+    """
+
+    def __init__(self, app=None):
+        self.cache = TTLCache()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("ANALYTICS_CACHE_TTL", 600)
+        app.config.setdefault("ANALYTICS_CACHE_SIZE", 16)
+        self.cache = TTLCache(
+            maxsize=app.config["ANALYTICS_CACHE_SIZE"],
+            ttl=app.config["ANALYTICS_CACHE_TTL"],
+        )
+        app.extensions["analytics_engine"] = self
+
+    def snapshot(self, user_id: int) -> ExpenseSnapshot:
+        version, _ = UserDataVersion.get_marker(user_id)
+        cached = self.cache.get(user_id)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        snapshot = ExpenseSnapshot.load(user_id)
+        self.cache.set(user_id, (version, snapshot))
+        return snapshot
+
+    def report(
+        self,
+        user_id: int,
+        currency: str,
+        window: int = 7,
+        outlier_method: str = "zscore",
+        outlier_threshold: Optional[float] = None,
+    ) -> dict:
+        """All metrics for the user's expenses in ``currency``."""
+        snapshot = self.snapshot(user_id).in_currency(currency)
+        total = int(snapshot.amounts.sum())
+        report = {
+            "currency": currency,
+            "count": len(snapshot),
+            "total_minor": total,
+            "average_minor": (
+                average_minor(total, len(snapshot)) if len(snapshot) else None
+            ),
+            "window": window,
+            "daily": daily_series(snapshot, window),
+            "monthly": monthly_series(snapshot),
+            "categories": category_shares(snapshot),
+            "outliers": outliers(snapshot, outlier_method, outlier_threshold),
+        }
+        # Amounts are rendered with the currency of the row they are in.
+        for key in ("daily", "monthly", "categories"):
+            for row in report[key]:
+                row["currency"] = currency
+        for row in report["outliers"]["items"]:
+            row["currency"] = currency
+        return report
+
+
+analytics_engine = AnalyticsEngine()
@@ -0,0 +1,104 @@
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Hashable, Optional
+import math
+import pickle
+import time
+
+
+class TTLCache:
+    """Thread-safe, size-bounded LRU cache with per-entry expiry.
+
+    A ``ttl`` of 0 disables the cache: every ``get`` is a miss and ``set``
+    is a no-op, so callers don't need to special-case the disabled state.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict = OrderedDict()
+        self._lock = Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.maxsize > 0
+
+    def get(self, key: Hashable, default: Optional[Any] = None):
+        if not self.enabled:
+            return default
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            expires_at, value = item
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: Hashable):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SharedCache:
+    """``TTLCache`` interface over a cache shared between processes.
+
+    ``client`` is anything with ``get(key)``, ``set(key, value, ex=...)``,
+    ``delete(key)`` and ``scan_iter(match=...)``, such as a
+    ``redis.Redis`` connection. Values are pickled and keys namespaced
+    with ``prefix``; entries expire after ``ttl`` seconds (0 disables the
+    cache, as with ``TTLCache``). The prefix is required: ``clear`` deletes
+    every key that starts with it.
+    """
+
+    def __init__(self, client, ttl: float = 0, *, prefix: str):
+        if not prefix:
+            raise ValueError("SharedCache needs a non-empty key prefix")
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def _key(self, key: Hashable) -> str:
+        return f"{self.prefix}{key}"
+
+    def get(self, key: Hashable, default: Optional[Any] = None):
+        if not self.enabled:
+            return default
+        raw = self.client.get(self._key(key))
+        return default if raw is None else pickle.loads(raw)
+
+    def set(self, key: Hashable, value: Any):
+        if not self.enabled:
+            return
+        self.client.set(
+            self._key(key), pickle.dumps(value), ex=math.ceil(self.ttl)
+        )
+
+    def delete(self, key: Hashable):
+        self.client.delete(self._key(key))
+
+    def clear(self):
+        for key in self.client.scan_iter(match=f"{self.prefix}*"):
+            self.client.delete(key)
@@ -0,0 +1,142 @@
+from itertools import islice
+from typing import Iterable, Optional
+from flask_smorest import abort
+from http import HTTPStatus
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+
+from src.extensions import db
+from src.models.categories import Category
+from src.models.data_versions import UserDataVersion
+from src.services.cache import TTLCache
+
+# Session.info key of the users whose categories changed in the current
+# transaction.
+_STALE_USERS = "stale_category_user_ids"
+
+
+class CategoryCache:
+    """A user's live categories, read from the database once and cached.
+
+    Categories change rarely but are read on every expense write (to
+    validate ``category_id``) and by the category endpoints, so each
+    user's categories are kept as plain column dicts, keyed by id, for
+    ``CATEGORY_CACHE_TTL`` seconds (0 disables the cache).
+
+    By default the cache is an in-process LRU of ``CATEGORY_CACHE_SIZE``
+    users. Set ``CATEGORY_CACHE_BACKEND`` to an object with the
+    ``TTLCache`` interface, e.g. a ``SharedCache`` over Redis, to share
+    it between processes. Each entry is stored with the user's
+    ``UserDataVersion.categories_version``, which only category writes
+    bump, and reloaded once that moves on, so a change committed by
+    another process is seen on the next read. Any insert, update or
+    delete of a category also drops its user's entry when flushed and
+    again when the transaction ends.
+    """
+
+    def __init__(self, app=None):
+        self.cache = TTLCache()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("CATEGORY_CACHE_TTL", 300)
+        app.config.setdefault("CATEGORY_CACHE_SIZE", 1024)
+        app.config.setdefault("CATEGORY_CACHE_BACKEND", None)
+        self.cache = app.config["CATEGORY_CACHE_BACKEND"] or TTLCache(
+            maxsize=app.config["CATEGORY_CACHE_SIZE"],
+            ttl=app.config["CATEGORY_CACHE_TTL"],
+        )
+        app.extensions["category_cache"] = self
+
+    def by_id(self, user_id: int) -> dict[int, dict]:
+        """The user's live categories by id, in id order."""
+        version = UserDataVersion.get_categories_version(user_id)
+        cached = self.cache.get(user_id)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        categories = self._load(user_id)
+        self.cache.set(user_id, (version, categories))
+        return categories
+
+    @staticmethod
+    def _load(user_id: int) -> dict[int, dict]:
+        columns = [attr.key for attr in inspect(Category).column_attrs]
+        stmt = (
+            Category.select_active()
+            .where(Category.user_id == user_id)
+            .order_by(Category.id)
+        )
+        return {
+            category.id: {key: getattr(category, key) for key in columns}
+            for category in db.session.execute(stmt).scalars()
+        }
+
+    def categories(self, user_id: int) -> list[dict]:
+        return list(self.by_id(user_id).values())
+
+    def page(
+        self, user_id: int, limit: int = 100, cursor_id: Optional[int] = None
+    ) -> list[dict]:
+        """Up to ``limit`` categories after ``cursor_id``, by id."""
+        return list(
+            islice(
+                (
+                    category
+                    for category_id, category in self.by_id(user_id).items()
+                    if not cursor_id or category_id > cursor_id
+                ),
+                limit,
+            )
+        )
+
+    def get(self, user_id: int, category_id: int) -> Optional[dict]:
+        return self.by_id(user_id).get(category_id)
+
+    def get_or_404(self, user_id: int, category_id: int) -> dict:
+        category = self.get(user_id, category_id)
+        if category is None:
+            abort(
+                HTTPStatus.NOT_FOUND,
+                message=(
+                    f"Category with id {category_id} not found for user "
+                    f"{user_id}"
+                ),
+            )
+        return category
+
+    def active_ids(self, user_id: int, ids: Iterable[int]) -> set[int]:
+        """Which of ``ids`` are live categories of ``user_id``."""
+        return set(ids) & self.by_id(user_id).keys()
+
+    def invalidate(self, user_id: int):
+        self.cache.delete(user_id)
+
+
+category_cache = CategoryCache()
+
+
+@event.listens_for(Category, "after_insert")
+@event.listens_for(Category, "after_update")
+@event.listens_for(Category, "after_delete")
+def _invalidate_changed_category(_mapper, connection, target: Category):
+    history = inspect(target).attrs.user_id.history
+    user_ids = {*(history.added or ()), *(history.deleted or ())}
+    user_ids.add(target.user_id)
+    UserDataVersion.bump(
+        user_ids, connection=connection, counter="categories_version"
+    )
+    for user_id in user_ids:
+        category_cache.invalidate(user_id)
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(_STALE_USERS, set()).update(user_ids)
+
+
+# Entries filled between the flush and the end of the transaction may
+# hold uncommitted (or rolled back) rows, so they are dropped again.
+@event.listens_for(Session, "after_commit")
+@event.listens_for(Session, "after_rollback")
+def _invalidate_stale_categories(session):
+    for user_id in session.info.pop(_STALE_USERS, ()):
+        category_cache.invalidate(user_id)
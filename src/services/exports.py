@@ -0,0 +1,32 @@
+from typing import Iterable, Iterator
+import csv
+import io
+import json
+
+# Rows fetched per round trip and written per response chunk. Rows arrive
+# already serialized (see ``views.expenses.export_expenses``).
+EXPORT_CHUNK_SIZE = 1000
+
+
+def ndjson_chunks(partitions: Iterable[list[dict]]) -> Iterator[str]:
+    """One JSON object per line, one response chunk per partition."""
+    for rows in partitions:
+        yield "".join(json.dumps(row) + "\n" for row in rows)
+
+
+def csv_chunks(
+    columns: list[str], partitions: Iterable[list[dict]]
+) -> Iterator[str]:
+    """A header line, then one response chunk per partition."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for rows in partitions:
+        writer.writerows(
+            [row.get(column) for column in columns] for row in rows
+        )
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
@@ -0,0 +1,181 @@
+from bisect import bisect_right
+from datetime import date, datetime
+from itertools import islice
+from typing import Iterable, Iterator, Optional, TextIO
+import csv
+
+from src.extensions import db
+from src.models.fx_rates import FxRate
+from src.services.cache import TTLCache
+from src.services.money import convert_minor
+
+# Rates upserted and committed per transaction when loading a file.
+FX_LOAD_CHUNK_SIZE = 5000
+
+
+class MissingRateError(ValueError):
+    pass
+
+
+class RateSeries:
+    """The rates of one currency pair, oldest first, looked up as of a
+    day: the latest rate on or before it, since rate files skip weekends
+    and holidays."""
+
+    def __init__(self, points: Iterable[tuple[date, float]]):
+        points = list(points)
+        self.days = [day for day, _ in points]
+        self.rates = [rate for _, rate in points]
+
+    def __len__(self):
+        return len(self.days)
+
+    def rate_on(self, day: date) -> Optional[float]:
+        index = bisect_right(self.days, day) - 1
+        return self.rates[index] if index >= 0 else None
+
+    def inverted(self) -> "RateSeries":
+        return RateSeries(
+            (day, 1 / rate) for day, rate in zip(self.days, self.rates)
+        )
+
+    @classmethod
+    def cross(cls, source: "RateSeries", target: "RateSeries"):
+        """Source -> target rates from two series sharing a base."""
+        points = []
+        for day in sorted(set(source.days) | set(target.days)):
+            source_rate, target_rate = source.rate_on(day), target.rate_on(day)
+            if source_rate and target_rate is not None:
+                points.append((day, target_rate / source_rate))
+        return cls(points)
+
+
+class FxConverter:
+    """Converts amounts between currencies with the rates in ``fx_rates``.
+
+    Each currency pair's series is read with one query (directly, inverted,
+    or crossed through a common base) and kept in an LRU cache of
+    ``FX_CACHE_SIZE`` pairs for ``FX_CACHE_TTL`` seconds, so converting a
+    report or an export is in-memory lookups. Each series is stored with
+    the ``FxRate.revision()`` it was read at and reloaded once that moves
+    on, so rates loaded by any process are used from the next lookup.
+    Callers converting many amounts read the revision once and pass it.
+    """
+
+    def __init__(self, app=None):
+        self.cache = TTLCache()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("FX_CACHE_TTL", 3600)
+        app.config.setdefault("FX_CACHE_SIZE", 256)
+        self.cache = TTLCache(
+            maxsize=app.config["FX_CACHE_SIZE"],
+            ttl=app.config["FX_CACHE_TTL"],
+        )
+        app.extensions["fx_converter"] = self
+
+    def series(
+        self, source: str, target: str, revision: Optional[int] = None
+    ) -> RateSeries:
+        if revision is None:
+            revision = FxRate.revision()
+        cached = self.cache.get((source, target))
+        if cached is not None and cached[0] == revision:
+            return cached[1]
+        series = self._load(source, target)
+        self.cache.set((source, target), (revision, series))
+        return series
+
+    @staticmethod
+    def _load(source: str, target: str) -> RateSeries:
+        points = FxRate.series(source, target)
+        if points:
+            return RateSeries(points)
+        points = FxRate.series(target, source)
+        if points:
+            return RateSeries(points).inverted()
+        base = FxRate.common_base(source, target)
+        if base is None:
+            return RateSeries([])
+        return RateSeries.cross(
+            RateSeries(FxRate.series(base, source)),
+            RateSeries(FxRate.series(base, target)),
+        )
+
+    def convert(
+        self,
+        amount_minor: int,
+        source: str,
+        target: str,
+        day: date,
+        revision: Optional[int] = None,
+    ) -> int:
+        """``amount_minor`` of ``source`` in minor units of ``target`` at
+        the rate of ``day``, with the rates as of ``revision`` (default:
+        read now)."""
+        if source == target:
+            return amount_minor
+        rate = self.series(source, target, revision).rate_on(day)
+        if rate is None:
+            raise MissingRateError(
+                f"No {source} to {target} rate on or before {day}"
+            )
+        return convert_minor(amount_minor, source, target, rate)
+
+
+def parse_rates(stream: TextIO, base: Optional[str] = None) -> Iterator[dict]:
+    """Yield ``fx_rates`` rows from a CSV file, either one rate per line
+    (``date,base,quote,rate``) or one day per line with a column per quote
+    currency (``Date,USD,JPY,...`` as published by the ECB) for ``base``.
+    Empty and ``N/A`` cells are skipped."""
+    reader = csv.reader(stream)
+    header = [name.strip() for name in next(reader, [])]
+    long_format = {"base", "quote", "rate"} <= {h.lower() for h in header}
+    if not long_format and base is None:
+        raise ValueError("Rates with a column per currency need a base")
+    for values in reader:
+        if not any(values):
+            continue
+        try:
+            row = dict(zip(header, (value.strip() for value in values)))
+            if long_format:
+                row = {key.lower(): value for key, value in row.items()}
+                yield _rate_row(
+                    row["date"], row["base"], row["quote"], row["rate"]
+                )
+                continue
+            day = values[0]
+            for quote, rate in list(row.items())[1:]:
+                if len(quote) == 3 and rate not in ("", "N/A"):
+                    yield _rate_row(day, base, quote, rate)
+        except (KeyError, ValueError) as error:
+            raise ValueError(f"line {reader.line_num}: {error}") from error
+
+
+def _rate_row(day: str, base: str, quote: str, rate: str) -> dict:
+    return {
+        "day": datetime.strptime(day.strip()[:10], "%Y-%m-%d").date(),
+        "base": base.upper(),
+        "quote": quote.upper(),
+        "rate": float(rate),
+    }
+
+
+def load_rates(
+    stream: TextIO,
+    base: Optional[str] = None,
+    chunk_size: int = FX_LOAD_CHUNK_SIZE,
+) -> int:
+    """Upsert the rates of a file, committing every ``chunk_size`` rows.
+    Returns the number of rates loaded."""
+    loaded, rows = 0, parse_rates(stream, base)
+    while batch := list(islice(rows, chunk_size)):
+        loaded += FxRate.upsert(batch)
+        db.session.commit()
+    fx_converter.cache.clear()
+    return loaded
+
+
+fx_converter = FxConverter()
@@ -0,0 +1,159 @@
+from datetime import datetime, timezone
+from typing import Optional
+from flask import current_app, g
+import random
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached, object_session
+
+from src.extensions import db
+from src.models.users import User
+from src.services.cache import TTLCache
+
+# Columns kept out of the cached snapshot. They are expired on the rebuilt
+# instance and loaded from the database only if something reads them.
+UNCACHED_COLUMNS = ("password_hash",)
+# Session.info key of the users updated in the current transaction.
+_UPDATED_USERS = "updated_identity_user_ids"
+
+
+def is_active_user(user: Optional[User]) -> bool:
+    return user is not None and user.active and user.deleted_at is None
+
+
+class IdentityResolver:
+    """Loads the user behind a JWT once per request.
+
+    The blocklist check, ``current_user`` and ``user_access_required`` all
+    go through the same request-scoped user, so an authenticated request
+    costs a single user query. With ``IDENTITY_CACHE_TTL`` > 0 the loaded
+    columns are also kept in an in-process cache for that many seconds;
+    entries are dropped whenever the user row is updated (logout,
+    deactivation, soft delete) once the update commits.
+
+    With ``JWT_STATELESS_ACCESS_TOKENS`` enabled, access tokens are trusted
+    on their signature and expiry alone: no user query is made and
+    ``current_user`` is an identity-only ``User`` whose other columns load
+    lazily on first access. Revocation (the ``ver`` claim against
+    ``User.token_version``) is then enforced when refreshing, plus on a
+    ``JWT_ACCESS_RECHECK_RATE`` fraction of access-token requests.
+    """
+
+    def __init__(self, app=None):
+        self.cache = TTLCache()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("IDENTITY_CACHE_TTL", 0)
+        app.config.setdefault("IDENTITY_CACHE_SIZE", 1024)
+        app.config.setdefault("JWT_STATELESS_ACCESS_TOKENS", False)
+        app.config.setdefault("JWT_ACCESS_RECHECK_RATE", 0.0)
+        self.cache = TTLCache(
+            maxsize=app.config["IDENTITY_CACHE_SIZE"],
+            ttl=app.config["IDENTITY_CACHE_TTL"],
+        )
+        app.extensions["identity_resolver"] = self
+
+    def load_user(self, user_id: int) -> Optional[User]:
+        """Return the user row (soft-deleted included), loading it at most
+        once per request."""
+        loaded = g.setdefault("_identity_users", {})
+        if user_id not in loaded:
+            loaded[user_id] = self._load_user(user_id)
+        return loaded[user_id]
+
+    def _load_user(self, user_id: int) -> Optional[User]:
+        snapshot = self.cache.get(user_id)
+        if snapshot is not None:
+            return self._from_snapshot(snapshot)
+        user = db.session.execute(
+            User.select_with_deleted().where(User.id == user_id)
+        ).scalar_one_or_none()
+        # A row this transaction updated is not committed yet.
+        pending = db.session.info.get(_UPDATED_USERS, ())
+        if user is not None and user_id not in pending:
+            self.cache.set(user_id, self._to_snapshot(user))
+        return user
+
+    @staticmethod
+    def _to_snapshot(user: User) -> dict:
+        return {
+            attr.key: getattr(user, attr.key)
+            for attr in inspect(User).column_attrs
+            if attr.key not in UNCACHED_COLUMNS
+        }
+
+    @staticmethod
+    def _from_snapshot(snapshot: dict) -> User:
+        user = User(**snapshot)
+        make_transient_to_detached(user)
+        return db.session.merge(user, load=False)
+
+    def invalidate(self, user_id: int):
+        self.cache.delete(user_id)
+
+    def _is_trusted_token(self, jwt_payload: dict) -> bool:
+        config = current_app.config
+        if jwt_payload.get("type") != "access":
+            return False
+        if not config["JWT_STATELESS_ACCESS_TOKENS"]:
+            return False
+        return random.random() >= config["JWT_ACCESS_RECHECK_RATE"]
+
+    def _identity_only_user(self, user_id: int) -> User:
+        user = User(id=user_id)
+        make_transient_to_detached(user)
+        return db.session.merge(user, load=False)
+
+    def is_token_revoked(self, jwt_payload: dict) -> bool:
+        if self._is_trusted_token(jwt_payload):
+            g._identity_trusted = True
+            return False
+        user = self.load_user(int(jwt_payload["sub"]))
+        if not is_active_user(user):
+            return True
+        if "ver" in jwt_payload:
+            return jwt_payload["ver"] != user.token_version
+        # Tokens minted before the version claim existed.
+        last_logout = user.last_logout_at
+        if last_logout is None:
+            return False
+        token_iat = datetime.fromtimestamp(jwt_payload["iat"], tz=timezone.utc)
+        return token_iat <= last_logout.replace(tzinfo=timezone.utc)
+
+    def lookup_user(self, jwt_payload: dict) -> Optional[User]:
+        user_id = int(jwt_payload["sub"])
+        if g.get("_identity_trusted"):
+            return self._identity_only_user(user_id)
+        user = self.load_user(user_id)
+        return user if is_active_user(user) else None
+
+    def is_active(self, user: Optional[User]) -> bool:
+        """Like ``is_active_user``, but trusts users behind a stateless
+        access token instead of loading their status columns."""
+        if user is not None and g.get("_identity_trusted"):
+            return True
+        return is_active_user(user)
+
+
+identity_resolver = IdentityResolver()
+
+
+@event.listens_for(User, "after_update")
+def _record_updated_user(_mapper, _connection, target: User):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(_UPDATED_USERS, set()).add(target.id)
+
+
+# Evicting at flush would let another request cache the old row again
+# before the commit, so entries are dropped once the update is visible.
+@event.listens_for(Session, "after_commit")
+def _invalidate_updated_users(session):
+    for user_id in session.info.pop(_UPDATED_USERS, ()):
+        identity_resolver.invalidate(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_updated_users(session):
+    session.info.pop(_UPDATED_USERS, None)
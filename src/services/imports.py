@@ -0,0 +1,315 @@
+from datetime import datetime, timezone
+from itertools import islice
+from typing import BinaryIO, Callable, Iterable, Iterator, Optional
+import codecs
+import csv
+import re
+
+from flask import current_app
+from marshmallow import Schema, ValidationError, fields, validate
+from sqlalchemy import select
+
+from src.extensions import db
+from src.models.expenses import Expense
+from src.schemas.expenses import CURRENCIES
+from src.schemas.fields import Money
+from src.services.categories import category_cache
+from src.services.money import default_currency
+
+# Per-line errors kept in the report; the rest are only counted.
+MAX_REPORTED_ERRORS = 1000
+
+# Header spellings accepted for each CSV column.
+CSV_ALIASES = {
+    "created_at": "created_at",
+    "date": "created_at",
+    "amount": "amount",
+    "currency": "currency",
+    "note": "note",
+    "description": "note",
+    "memo": "note",
+    "category": "category",
+    "category_id": "category_id",
+}
+
+_OFX_TAG = re.compile(r"<(/?)([A-Za-z0-9.]+)>([^<\r\n]*)")
+
+
+class ImportRowSchema(Schema):
+    created_at = fields.DateTime(required=True)
+    amount = Money(
+        required=True, validate=validate.Range(min=0, min_inclusive=False)
+    )
+    currency = fields.Str(
+        allow_none=True, validate=validate.OneOf(CURRENCIES), load_default=None
+    )
+    note = fields.Str(
+        allow_none=True, validate=validate.Length(max=255), load_default=None
+    )
+    category = fields.Str(allow_none=True, load_default=None)
+    category_id = fields.Int(allow_none=True, load_default=None)
+
+
+class ImportReport:
+    """Running totals of an import, updated as each chunk commits."""
+
+    def __init__(self, max_errors: int = MAX_REPORTED_ERRORS):
+        self.max_errors = max_errors
+        self.processed = 0
+        self.imported = 0
+        self.duplicates = 0
+        self.skipped = 0
+        self.error_count = 0
+        self.errors = []
+
+    def unreadable(self, line: int, error: Exception):
+        """Record that reading stopped at ``line`` (bad encoding or CSV
+        quoting); the rows before it are still imported."""
+        self.error(line, {"_schema": [f"Cannot read the file: {error}"]})
+
+    def error(self, line: int, messages: dict):
+        self.error_count += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"line": line, "messages": messages})
+
+    def as_dict(self) -> dict:
+        return {
+            "processed": self.processed,
+            "imported": self.imported,
+            "duplicates": self.duplicates,
+            "skipped": self.skipped,
+            "error_count": self.error_count,
+            "errors": self.errors,
+        }
+
+
+def decode_lines(stream: BinaryIO, encoding: str = "utf-8-sig"):
+    """The lines of a binary file as text, decoded one line at a time so
+    that an undecodable byte is reported on its own line."""
+    return codecs.iterdecode(stream, encoding)
+
+
+def parse_csv(stream: Iterable[str], report: ImportReport) -> Iterator[tuple]:
+    """Yield ``(line, row)`` for each CSV record, with the headers mapped
+    through ``CSV_ALIASES``. Unknown columns are ignored, so the output of
+    the CSV export can be imported back. Reading stops at a line that
+    cannot be decoded or parsed."""
+    reader = csv.reader(stream)
+    try:
+        header = next(reader, None)
+        if header is None:
+            return
+        columns = [CSV_ALIASES.get(name.strip().lower()) for name in header]
+        for values in reader:
+            if not any(values):
+                continue
+            row = {
+                column: value.strip() or None
+                for column, value in zip(columns, values)
+                if column is not None
+            }
+            yield reader.line_num, row
+    except csv.Error as error:
+        # line_num already counts the lines of the failed record.
+        report.unreadable(reader.line_num, error)
+    except UnicodeDecodeError as error:
+        report.unreadable(reader.line_num + 1, error)
+
+
+def parse_ofx(stream: Iterable[str], report: ImportReport) -> Iterator[tuple]:
+    """Yield ``(line, row)`` for each ``<STMTTRN>`` of an OFX statement.
+
+    Handles both SGML (OFX 1.x, unclosed leaf tags) and XML (OFX 2.x)
+    files. Debits become positive expense amounts in the statement's
+    ``CURDEF`` currency; credits are not expenses and are counted as
+    skipped. Reading stops at a line that cannot be decoded.
+    """
+    transaction, start, currency = None, 0, None
+    line_no = 0
+    try:
+        for line_no, line in enumerate(stream, start=1):
+            for match in _OFX_TAG.finditer(line):
+                closing, tag, value = match.groups()
+                tag = tag.upper()
+                if tag == "CURDEF" and not closing:
+                    currency = value.strip().upper() or None
+                elif tag == "STMTTRN":
+                    if not closing:
+                        transaction, start = {}, line_no
+                    elif transaction is not None:
+                        row = _ofx_row(transaction, currency)
+                        if row is None:
+                            report.skipped += 1
+                        else:
+                            yield start, row
+                        transaction = None
+                elif transaction is not None and not closing:
+                    transaction[tag] = value.strip()
+    except UnicodeDecodeError as error:
+        report.unreadable(line_no + 1, error)
+
+
+def _ofx_row(transaction: dict, currency: Optional[str]) -> Optional[dict]:
+    amount = transaction.get("TRNAMT", "")
+    if amount and not amount.startswith("-"):
+        return None
+    posted = transaction.get("DTPOSTED", "")
+    # YYYYMMDD[HHMMSS[.XXX]][[offset:TZ]]; the offset is dropped.
+    digits = re.match(r"\d*", posted).group()
+    try:
+        if len(digits) >= 14:
+            posted = datetime.strptime(digits[:14], "%Y%m%d%H%M%S")
+        else:
+            posted = datetime.strptime(digits[:8], "%Y%m%d")
+        posted = posted.isoformat()
+    except ValueError:
+        pass  # left as is for normalize() to report
+    return {
+        "created_at": posted or None,
+        "amount": amount.lstrip("-") or None,
+        "currency": currency,
+        "note": transaction.get("NAME") or transaction.get("MEMO"),
+    }
+
+
+def normalize(
+    records: Iterable[tuple], report: ImportReport
+) -> Iterator[tuple]:
+    """Validate and convert raw rows, amounts to minor units of the row's
+    currency (default: ``DEFAULT_CURRENCY``); invalid lines go to the
+    report."""
+    schema = ImportRowSchema()
+    for line, row in records:
+        report.processed += 1
+        try:
+            data = schema.load(row)
+            data["currency"] = data["currency"] or default_currency()
+            data = Expense.with_minor_units(data)
+        except ValidationError as err:
+            report.error(line, err.normalized_messages())
+            continue
+        created_at = data["created_at"]
+        if created_at.tzinfo is not None:
+            created_at = created_at.astimezone(timezone.utc)
+            data["created_at"] = created_at.replace(tzinfo=None)
+        yield line, data
+
+
+def map_categories(
+    records: Iterable[tuple],
+    user_id: int,
+    report: ImportReport,
+    default_category_id: Optional[int] = None,
+) -> Iterator[tuple]:
+    """Resolve ``category`` names and ``category_id``s against the user's
+    categories, read once up front."""
+    categories = category_cache.by_id(user_id)
+    ids = categories.keys()
+    by_name = {
+        category["name"].lower(): category_id
+        for category_id, category in categories.items()
+    }
+    for line, data in records:
+        name = data.pop("category")
+        category_id = data.pop("category_id")
+        if category_id is None and name is not None:
+            category_id = by_name.get(name.lower(), default_category_id)
+        elif category_id is None:
+            category_id = default_category_id
+        if category_id is None or category_id not in ids:
+            report.error(
+                line,
+                {"category": [f"Unknown category {name or category_id!r}"]},
+            )
+            continue
+        data["category_id"] = category_id
+        yield line, data
+
+
+def batched(records: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(records)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def _dedupe_key(data) -> tuple:
+    return (
+        data["created_at"],
+        data["amount_minor"],
+        data["currency"],
+        data["note"],
+    )
+
+
+def drop_duplicates(
+    batch: list[tuple], user_id: int, report: ImportReport
+) -> list[tuple]:
+    """Remove rows matching an existing live expense (same timestamp,
+    amount, currency and note) or an earlier row of the batch. Earlier
+    chunks are already committed, so re-running an import adds nothing."""
+    stmt = select(
+        Expense.created_at,
+        Expense.amount_minor,
+        Expense.currency,
+        Expense.note,
+    ).where(
+        Expense.user_id == user_id,
+        Expense.deleted_at.is_(None),
+        Expense.created_at.in_(
+            list({data["created_at"] for _, data in batch})
+        ),
+    )
+    seen = {
+        _dedupe_key(row._mapping) for row in db.session.execute(stmt).all()
+    }
+    unique = []
+    for line, data in batch:
+        key = _dedupe_key(data)
+        if key in seen:
+            report.duplicates += 1
+            continue
+        seen.add(key)
+        unique.append((line, data))
+    return unique
+
+
+def import_expenses(
+    stream: Iterable[str],
+    format: str,
+    user_id: int,
+    default_category_id: Optional[int] = None,
+    chunk_size: Optional[int] = None,
+    on_progress: Optional[Callable[[ImportReport], None]] = None,
+) -> ImportReport:
+    """Import a CSV or OFX statement for ``user_id``.
+
+    The file is read as a stream through parse -> normalize -> category
+    mapping -> dedupe -> insert, and every ``chunk_size`` rows (by
+    default the ``IMPORT_CHUNK_SIZE`` setting) are committed in their own
+    transaction, so memory and transaction size stay bounded whatever
+    the file size. ``on_progress`` is called with the report after each
+    commit.
+    """
+    chunk_size = chunk_size or current_app.config["IMPORT_CHUNK_SIZE"]
+    report = ImportReport()
+    records = PARSERS[format](stream, report)
+    records = normalize(records, report)
+    records = map_categories(records, user_id, report, default_category_id)
+    for batch in batched(records, chunk_size):
+        batch = drop_duplicates(batch, user_id, report)
+        if batch:
+            _, rejected = Expense.bulk_create(
+                user_id, [data for _, data in batch], chunk_size
+            )
+            db.session.commit()
+            for index in rejected:
+                report.error(
+                    batch[index][0], {"_schema": ["Rejected by the database"]}
+                )
+            report.imported += len(batch) - len(rejected)
+        if on_progress is not None:
+            on_progress(report)
+    return report
+
+
+PARSERS = {"csv": parse_csv, "ofx": parse_ofx}
@@ -0,0 +1,116 @@
+from decimal import ROUND_HALF_EVEN, Decimal, InvalidOperation
+from typing import Optional
+from flask import current_app, has_app_context, has_request_context, request
+from marshmallow import ValidationError
+
+# Digits after the decimal point of each accepted ISO 4217 currency.
+# Amounts are stored as integers in these minor units (cents for USD).
+CURRENCY_EXPONENTS = {
+    "AUD": 2,
+    "BHD": 3,
+    "BRL": 2,
+    "CAD": 2,
+    "CHF": 2,
+    "CLP": 0,
+    "CNY": 2,
+    "CZK": 2,
+    "DKK": 2,
+    "EUR": 2,
+    "GBP": 2,
+    "HKD": 2,
+    "HUF": 2,
+    "IDR": 2,
+    "ILS": 2,
+    "INR": 2,
+    "ISK": 0,
+    "JOD": 3,
+    "JPY": 0,
+    "KRW": 0,
+    "KWD": 3,
+    "MXN": 2,
+    "NOK": 2,
+    "NZD": 2,
+    "OMR": 3,
+    "PLN": 2,
+    "SEK": 2,
+    "SGD": 2,
+    "THB": 2,
+    "TND": 3,
+    "TRY": 2,
+    "USD": 2,
+    "VND": 0,
+    "ZAR": 2,
+}
+DEFAULT_CURRENCY = "USD"
+
+# How amounts are written in JSON: "float" is the original number shape
+# kept for existing clients, "decimal" an exact string such as "12.50".
+MONEY_FORMATS = ("float", "decimal")
+MONEY_FORMAT_HEADER = "X-Money-Format"
+
+
+def default_currency() -> str:
+    if has_app_context():
+        return current_app.config["DEFAULT_CURRENCY"]
+    return DEFAULT_CURRENCY
+
+
+def money_format() -> str:
+    """The format asked for by the request header, else the configured
+    ``MONEY_FORMAT``."""
+    if has_request_context():
+        requested = request.headers.get(MONEY_FORMAT_HEADER, "").lower()
+        if requested in MONEY_FORMATS:
+            return requested
+    if has_app_context():
+        return current_app.config["MONEY_FORMAT"]
+    return MONEY_FORMATS[0]
+
+
+def to_minor(amount, currency: str) -> int:
+    """``amount`` (a number or numeric string) in minor units of
+    ``currency``. Amounts with more decimals than the currency has are
+    rejected rather than rounded."""
+    try:
+        value = Decimal(str(amount))
+    except InvalidOperation:
+        raise ValidationError("Not a valid amount.", "amount")
+    if not value.is_finite():
+        raise ValidationError("Not a valid amount.", "amount")
+    minor = value.scaleb(CURRENCY_EXPONENTS[currency])
+    if minor != minor.to_integral_value():
+        raise ValidationError(
+            f"{currency} amounts have at most "
+            f"{CURRENCY_EXPONENTS[currency]} decimals.",
+            "amount",
+        )
+    return int(minor)
+
+
+def from_minor(minor, currency: str) -> Decimal:
+    """The exact amount of ``minor`` units, e.g. ``Decimal("12.50")``."""
+    return Decimal(minor).scaleb(-CURRENCY_EXPONENTS[currency])
+
+
+def convert_minor(amount_minor, source: str, target: str, rate) -> int:
+    """``amount_minor`` of ``source`` times ``rate``, in minor units of
+    ``target`` rounded half to even."""
+    amount = from_minor(amount_minor, source) * Decimal(str(rate))
+    return int(
+        amount.scaleb(CURRENCY_EXPONENTS[target]).quantize(
+            Decimal(1), rounding=ROUND_HALF_EVEN
+        )
+    )
+
+
+def average_minor(total_minor: int, count: int) -> Decimal:
+    """Mean of ``count`` amounts, rounded to a whole minor unit."""
+    return (Decimal(total_minor) / count).quantize(1)
+
+
+def format_amount(minor, currency: str, fmt: Optional[str] = None):
+    """Render minor units for JSON in ``fmt`` (default: ``money_format``)."""
+    amount = from_minor(minor, currency)
+    if (fmt or money_format()) == "decimal":
+        return str(amount)
+    return float(amount)
@@ -0,0 +1,90 @@
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from flask_smorest import abort
+from http import HTTPStatus
+from threading import BoundedSemaphore
+
+from src.extensions import bcrypt
+
+
+class PasswordHasher:
+    """Runs bcrypt on a bounded worker pool.
+
+    bcrypt releases the GIL while hashing, so a thread pool gives real
+    parallelism while capping how many cores a login burst can take.
+    At most ``PASSWORD_HASH_WORKERS`` hashes run at once and up to
+    ``PASSWORD_HASH_MAX_PENDING`` more may wait for a worker; beyond that
+    requests fail fast with a 503 and a ``Retry-After`` header instead of
+    queueing behind each other. The cost factor is flask-bcrypt's
+    ``BCRYPT_LOG_ROUNDS``.
+    """
+
+    def __init__(self, app=None):
+        self.executor = None
+        self._slots = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("BCRYPT_LOG_ROUNDS", 12)
+        app.config.setdefault("PASSWORD_HASH_WORKERS", 4)
+        app.config.setdefault("PASSWORD_HASH_MAX_PENDING", 16)
+        app.config.setdefault("PASSWORD_HASH_RETRY_AFTER", 1)
+        workers = app.config["PASSWORD_HASH_WORKERS"]
+        # Each app factory call replaces the pool; queued hashes finish
+        # on the old one.
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="password-hasher"
+        )
+        self._slots = BoundedSemaphore(
+            workers + app.config["PASSWORD_HASH_MAX_PENDING"]
+        )
+        app.extensions["password_hasher"] = self
+
+    @property
+    def rounds(self) -> int:
+        return current_app.config["BCRYPT_LOG_ROUNDS"]
+
+    def _run(self, func, *args):
+        # init_app may swap both while the hash runs; the slot goes back
+        # to the semaphore it was taken from.
+        executor, slots = self.executor, self._slots
+        if not slots.acquire(blocking=False):
+            abort(
+                HTTPStatus.SERVICE_UNAVAILABLE,
+                message="Too many concurrent authentication requests",
+                headers={
+                    "Retry-After": str(
+                        current_app.config["PASSWORD_HASH_RETRY_AFTER"]
+                    )
+                },
+            )
+        try:
+            future = executor.submit(func, *args)
+        except BaseException:
+            slots.release()
+            raise
+        future.add_done_callback(lambda _: slots.release())
+        return future.result()
+
+    def hash(self, password: str) -> str:
+        hashed = self._run(
+            bcrypt.generate_password_hash, password, self.rounds
+        )
+        return hashed.decode("utf-8")
+
+    def check(self, password_hash: str, password: str) -> bool:
+        return self._run(bcrypt.check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        """True when the hash was made with a different cost factor."""
+        # bcrypt hashes look like $2b$<rounds>$<salt+digest>
+        try:
+            return int(password_hash.split("$")[2]) != self.rounds
+        except (IndexError, ValueError):
+            return True
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,38 @@
+from flask_smorest import Blueprint
+from http import HTTPStatus
+from flask_jwt_extended import jwt_required
+
+from src.schemas.analytics import (
+    AnalyticsRequestSchema,
+    AnalyticsResponseSchema,
+)
+from src.schemas.compiled import compile_schema, json_response
+from src.services.analytics import analytics_engine
+from src.services.money import default_currency
+from src.views.utils import check_not_modified, user_access_required
+
+blueprint = Blueprint(
+    "analytics",
+    __name__,
+    url_prefix="/users/<int:user_id>/analytics",
+    description="Trends over the whole expense history",
+)
+
+
+@blueprint.route("/", methods=["GET"])
+@blueprint.arguments(AnalyticsRequestSchema, location="query")
+@blueprint.response(HTTPStatus.OK, schema=AnalyticsResponseSchema)
+@jwt_required()
+@user_access_required
+def get_analytics(args, user_id):
+    """Daily totals with a moving average, month-over-month changes,
+    category shares and outlying amounts, in one currency."""
+    check_not_modified(user_id)
+    report = analytics_engine.report(
+        user_id,
+        args.get("currency") or default_currency(),
+        window=args["window"],
+        outlier_method=args["outliers"],
+        outlier_threshold=args.get("threshold"),
+    )
+    return json_response(compile_schema(AnalyticsResponseSchema).dump(report))
@@ -2,7 +2,7 @@ from flask_smorest import Blueprint, abort
 from flask import jsonify
 from http import HTTPStatus
 from datetime import datetime, timezone
-from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
 from flask_jwt_extended import (
     create_access_token,
     create_refresh_token,
@@ -17,7 +17,8 @@ from src.schemas.auth import (
     LoginRequestSchema,
 )
 from src.models.users import User
-from src.extensions import db, bcrypt
+from src.extensions import db
+from src.services.passwords import password_hasher
 
 blueprint = Blueprint(
     "auth",
@@ -31,19 +32,17 @@ blueprint = Blueprint(
 @blueprint.arguments(RegisterRequestSchema, location="json")
 @blueprint.response(201, schema=UserSchema)
 def register_user(req_json):
-    stmt = User.select_active().where(
-        or_(
-            User.username == req_json["username"].lower(),
-            User.email == req_json["email"].lower(),
-        )
-    )
-    existing_user = db.session.execute(stmt).scalar_one_or_none()
-    if existing_user:
+    # Cheap probe so a taken name does not cost a bcrypt hash; the unique
+    # indexes still decide, so two concurrent registrations of the same
+    # name cannot both succeed.
+    if User.is_taken(req_json["username"], req_json["email"]):
+        abort(HTTPStatus.CONFLICT, message="Username or email already exists")
+    hashed = password_hasher.hash(req_json.pop("password"))
+    try:
+        user = User.create({**req_json, "password_hash": hashed})
+    except IntegrityError:
+        db.session.rollback()
         abort(HTTPStatus.CONFLICT, message="Username or email already exists")
-    hashed = bcrypt.generate_password_hash(req_json.pop("password")).decode(
-        "utf-8"
-    )
-    user = User.create({**req_json, "password_hash": hashed})
     return user
 
 
@@ -54,12 +53,12 @@ def login_user(req_json):
 
     if not user:
         abort(HTTPStatus.UNAUTHORIZED, message="Invalid credentials")
-    if not bcrypt.check_password_hash(
-        user.password_hash, req_json["password"]
-    ):
+    if not password_hasher.check(user.password_hash, req_json["password"]):
         abort(HTTPStatus.UNAUTHORIZED, message="Invalid credentials")
     if not user.active:
         abort(HTTPStatus.UNAUTHORIZED, message="Account is deactivated")
+    if password_hasher.needs_rehash(user.password_hash):
+        user.set_password(req_json["password"])
     access_token = create_access_token(identity=user)
     refresh_token = create_refresh_token(identity=user)
     response = jsonify(
@@ -89,6 +88,7 @@ def refresh_token():
 @jwt_required()
 def logout():
     current_user.last_logout_at = datetime.now(timezone.utc)
+    current_user.revoke_tokens()
     current_user.save()
     response = jsonify({"message": "Logout successful"})
     unset_jwt_cookies(response)
@@ -0,0 +1,70 @@
+from datetime import date
+from flask_smorest import Blueprint, abort
+from http import HTTPStatus
+from flask_jwt_extended import jwt_required
+from sqlalchemy.exc import IntegrityError
+
+from src.extensions import db
+from src.models.budgets import Budget
+from src.schemas.budgets import (
+    BudgetRequestSchema,
+    BudgetSchema,
+    BudgetStatusSchema,
+)
+from src.schemas.compiled import compile_schema, json_response
+from src.services.categories import category_cache
+from src.views.utils import check_not_modified, user_access_required
+
+blueprint = Blueprint(
+    "budgets",
+    __name__,
+    url_prefix="/users/<int:user_id>/budgets",
+    description="Monthly budgets per category",
+)
+
+
+@blueprint.route("/", methods=["GET"])
+@blueprint.arguments(BudgetRequestSchema, location="query")
+@blueprint.response(HTTPStatus.OK, schema=BudgetStatusSchema(many=True))
+@jwt_required()
+@user_access_required
+def get_budgets(args, user_id):
+    """Spending against each budget in a month."""
+    month = args.get("month") or date.today()
+    check_not_modified(user_id, {"month": month.isoformat()[:7]})
+    statuses = Budget.statuses(user_id, month.replace(day=1))
+    return json_response(
+        compile_schema(BudgetStatusSchema).dump_many(statuses)
+    )
+
+
+@blueprint.route("/", methods=["POST"])
+@blueprint.arguments(BudgetSchema, location="json")
+@blueprint.response(HTTPStatus.CREATED, schema=BudgetSchema)
+@jwt_required()
+@user_access_required
+def create_budget(budget_data, user_id):
+    category_cache.get_or_404(user_id, budget_data["category_id"])
+    # uq_budget_user_category decides, so two concurrent requests for the
+    # same category cannot both succeed.
+    try:
+        budget = Budget.create(
+            {**budget_data, "user_id": user_id}, commit=False
+        )
+        db.session.flush()
+    except IntegrityError:
+        db.session.rollback()
+        abort(HTTPStatus.CONFLICT, message="Category already has a budget")
+    budget.backfill_spending()
+    db.session.commit()
+    return budget
+
+
+@blueprint.route("/<int:budget_id>", methods=["DELETE"])
+@blueprint.response(HTTPStatus.NO_CONTENT)
+@jwt_required()
+@user_access_required
+def delete_budget(user_id, budget_id):
+    budget = Budget.get_by_user_id_and_id_or_404(user_id, budget_id)
+    budget.soft_delete(commit=True)
+    return "", HTTPStatus.NO_CONTENT
@@ -1,10 +1,23 @@
-from flask_smorest import Blueprint
+from flask_smorest import Blueprint, abort
 from http import HTTPStatus
+from flask import current_app, request, url_for
 from flask_jwt_extended import jwt_required
 
+from src.extensions import db
+from src.models.budgets import Budget
 from src.models.categories import Category
-from src.schemas.categories import CategorySchema
-from src.views.utils import user_access_required
+from src.models.expenses import Expense
+from src.models.recurring import RecurringExpense
+from src.schemas.categories import (
+    CategoryDeleteRequestSchema,
+    CategoryDeleteResponseSchema,
+    CategoryRequestSchema,
+    CategoryResponseSchema,
+    CategorySchema,
+)
+from src.schemas.compiled import compile_schema, json_response
+from src.services.categories import category_cache
+from src.views.utils import check_not_modified, user_access_required
 
 blueprint = Blueprint(
     "categories",
@@ -15,14 +28,33 @@ blueprint = Blueprint(
 
 
 @blueprint.route("/", methods=["GET"])
-@blueprint.response(HTTPStatus.OK, schema=CategorySchema(many=True))
+@blueprint.arguments(CategoryRequestSchema, location="query")
+@blueprint.response(HTTPStatus.OK, schema=CategoryResponseSchema)
 @jwt_required()
 @user_access_required
-def get_categories(user_id):
-    categories = Category.query.filter_by(
-        user_id=user_id, deleted_at=None
-    ).all()
-    return categories
+def get_categories(args, user_id):
+    check_not_modified(user_id)
+    include = args.pop("include")
+    if "stats" in include:
+        categories = Category.page_with_stats(user_id, **args)
+    else:
+        categories = category_cache.page(user_id, **args)
+    url = None
+    if categories and request.endpoint:
+        url = url_for(
+            request.endpoint,
+            user_id=user_id,
+            limit=args["limit"],
+            cursor_id=categories[-1]["id"],
+            **({"include": ",".join(include)} if include else {}),
+            _external=True,
+        )
+    return json_response(
+        {
+            "data": compile_schema(CategorySchema).dump_many(categories),
+            "next_url": url,
+        }
+    )
 
 
 @blueprint.route("/<int:category_id>", methods=["GET"])
@@ -30,10 +62,8 @@ def get_categories(user_id):
 @jwt_required()
 @user_access_required
 def get_category(user_id, category_id):
-    category = Category.query.filter_by(
-        id=category_id, user_id=user_id, deleted_at=None
-    ).first_or_404()
-    return category
+    check_not_modified(user_id)
+    return category_cache.get_or_404(user_id, category_id)
 
 
 @blueprint.route("/", methods=["POST"])
@@ -45,3 +75,48 @@ def create_category(new_category_data, user_id):
     new_category = Category.create({**new_category_data, "user_id": user_id})
     new_category.save()
     return new_category, HTTPStatus.CREATED
+
+
+@blueprint.route("/<int:category_id>", methods=["DELETE"])
+@blueprint.arguments(CategoryDeleteRequestSchema, location="query")
+@blueprint.response(HTTPStatus.OK, schema=CategoryDeleteResponseSchema)
+@jwt_required()
+@user_access_required
+def delete_category(args, user_id, category_id):
+    """Soft-delete the category. Its live expenses and recurring rules
+    move to ``reassign_to``; without it, a category still in use is not
+    deleted. Its budget is deleted with it."""
+    category = Category.get_by_user_id_and_id_or_404(user_id, category_id)
+    reassign_to = args.get("reassign_to")
+    moved_expenses = moved_rules = 0
+    if reassign_to is None:
+        if category.in_use():
+            abort(
+                HTTPStatus.CONFLICT,
+                message="Category has expenses or recurring rules; "
+                "pass reassign_to to move them",
+            )
+    else:
+        if reassign_to == category_id:
+            abort(
+                HTTPStatus.BAD_REQUEST,
+                message="reassign_to must be another category",
+            )
+        category_cache.get_or_404(user_id, reassign_to)
+        # Full batches are committed as they go; a retry after a failure
+        # moves what is left.
+        moved_expenses = Expense.reassign_category(
+            user_id,
+            category_id,
+            reassign_to,
+            current_app.config["CATEGORY_REASSIGN_BATCH_SIZE"],
+        )
+        moved_rules = RecurringExpense.reassign_category(
+            user_id, category_id, reassign_to
+        )
+    budget = Budget.get_active(user_id, category_id)
+    if budget is not None:
+        budget.soft_delete()
+    category.soft_delete()
+    db.session.commit()
+    return {"moved_expenses": moved_expenses, "moved_rules": moved_rules}
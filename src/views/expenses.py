@@ -1,17 +1,82 @@
-from flask_smorest import Blueprint
+from flask_smorest import Blueprint, abort
 from http import HTTPStatus
-from flask import url_for, request
+from flask import (
+    Response,
+    current_app,
+    url_for,
+    request,
+    stream_with_context,
+)
+from marshmallow import ValidationError
 from flask_jwt_extended import jwt_required
 
-from src.models.expenses import Expense
 from src.models.categories import Category
+from src.models.expenses import Expense
+from src.models.fx_rates import FxRate
+from src.extensions import db
+from src.models.functions import PERIODS
 from src.schemas.expenses import (
     ExpenseSchema,
+    ExpenseWithCategorySchema,
+    ExpenseIncludeSchema,
     UpdateExpenseSchema,
     ExpenseRequestSchema,
     ExpenseResponseSchema,
+    ExpenseExportRequestSchema,
+    BulkExpenseRequestSchema,
+    BulkExpenseResponseSchema,
+    ExpenseSelectionSchema,
+    BulkUpdateExpenseSchema,
+    BulkAffectedSchema,
+    ExpenseImportRequestSchema,
+    ExpenseImportFileSchema,
+    ExpenseImportResponseSchema,
+    ExpenseSummaryRequestSchema,
+    ExpenseSummaryResponseSchema,
 )
-from src.views.utils import user_access_required
+from src.schemas.compiled import compile_schema, json_response
+from src.services.categories import category_cache
+from src.services.exports import EXPORT_CHUNK_SIZE, csv_chunks, ndjson_chunks
+from src.services.imports import PARSERS, decode_lines, import_expenses
+from src.services.fx import MissingRateError, fx_converter
+from src.services.money import average_minor, default_currency, format_amount
+from src.views.utils import check_not_modified, user_access_required
+
+_EXPENSE_FIELDS = ExpenseSchema().fields
+
+
+def _source_columns(field_names) -> list[str]:
+    """Table columns read to dump the given ``ExpenseSchema`` fields."""
+    return [
+        column
+        for name in field_names
+        for column in getattr(_EXPENSE_FIELDS[name], "columns", (name,))
+    ]
+
+
+def _with_categories(rows) -> list[dict]:
+    """Plain ``rows`` as mappings with their ``category``, loaded in one
+    query."""
+    categories = Category.get_by_ids({row.category_id for row in rows})
+    return [
+        {**row._mapping, "category": categories.get(row.category_id)}
+        for row in rows
+    ]
+
+
+def _converted_amount(row, currency: str, revision: int):
+    try:
+        amount_minor = fx_converter.convert(
+            row.amount_minor,
+            row.currency,
+            currency,
+            row.created_at.date(),
+            revision,
+        )
+    except MissingRateError:
+        return None
+    return format_amount(amount_minor, currency)
+
 
 blueprint = Blueprint(
     "expenses",
@@ -28,35 +93,192 @@ blueprint = Blueprint(
 @jwt_required()
 @user_access_required
 def get_expenses(args, user_id):
-    expenses = Expense.filter(user_id=user_id, **args)
+    check_not_modified(user_id)
+    field_names = args.pop("field_names", None)
+    with_category = "category" in args.pop("include")
+    if field_names:
+        # Sparse fieldset: select only the requested columns (plus the
+        # keyset columns) as plain rows and skip ORM objects and marshmallow.
+        columns = list(
+            dict.fromkeys(
+                [
+                    *_source_columns(field_names),
+                    "id",
+                    "created_at",
+                    *(["category_id"] if with_category else []),
+                ]
+            )
+        )
+        expenses = Expense.filter_rows(columns, user_id=user_id, **args)
+    else:
+        expenses = Expense.filter(
+            user_id=user_id, with_category=with_category, **args
+        )
     args.pop("cursor_created_at", None)
     args.pop("cursor_id", None)
-    next_cursor_id = expenses[-1].id if expenses else None
-    next_cursor_created_at = expenses[-1].created_at if expenses else None
+    args.pop("cursor_rank", None)
+    if field_names:
+        args["fields"] = ",".join(field_names)
+    if with_category:
+        args["include"] = "category"
     url = None
-    if (next_cursor_id or next_cursor_created_at) and request.endpoint:
-        url = (
-            url_for(
-                request.endpoint,
-                user_id=user_id,
-                cursor_created_at=next_cursor_created_at,
-                cursor_id=next_cursor_id,
-                **args,
-                _external=True,
-            )
-            if expenses
-            else None
+    if expenses and request.endpoint:
+        last = expenses[-1]
+        if "q" in args:
+            cursor = {"cursor_rank": last.search_rank, "cursor_id": last.id}
+        else:
+            cursor = {
+                "cursor_created_at": last.created_at,
+                "cursor_id": last.id,
+            }
+        url = url_for(
+            request.endpoint,
+            user_id=user_id,
+            **cursor,
+            **args,
+            _external=True,
+        )
+    # The response schemas above document the payload; the compiled
+    # serializer produces the same JSON without per-field marshmallow work.
+    if with_category:
+        if field_names:
+            expenses = _with_categories(expenses)
+            field_names = [*field_names, "category"]
+        serializer = compile_schema(
+            ExpenseWithCategorySchema, only=field_names
+        )
+    else:
+        serializer = compile_schema(ExpenseSchema, only=field_names)
+    return json_response(
+        {"data": serializer.dump_many(expenses), "next_url": url}
+    )
+
+
+@blueprint.route("/summary", methods=["GET"])
+@blueprint.arguments(ExpenseSummaryRequestSchema, location="query")
+@blueprint.response(HTTPStatus.OK, schema=ExpenseSummaryResponseSchema)
+@jwt_required()
+@user_access_required
+def get_expense_summary(args, user_id):
+    check_not_modified(
+        user_id,
+        {"fx_rates": FxRate.revision()} if "convert_to" in args else None,
+    )
+    group_by = args.pop("group_by")
+    period = next((p for p in group_by if p in PERIODS), None)
+    try:
+        groups = Expense.summarize(
+            user_id, "category" in group_by, period, **args
+        )
+    except MissingRateError as error:
+        abort(HTTPStatus.BAD_REQUEST, message=str(error))
+    sums = {}
+    for group in groups:
+        total, count = sums.get(group["currency"], (0, 0))
+        sums[group["currency"]] = (
+            total + group["total_minor"],
+            count + group["count"],
+        )
+    totals = [
+        {
+            "currency": currency,
+            "total_minor": total,
+            "count": count,
+            "average_minor": average_minor(total, count),
+        }
+        for currency, (total, count) in sorted(sums.items())
+    ]
+    # Amounts in different currencies are not added up; the per-currency
+    # figures are in "totals".
+    if len(totals) == 1:
+        overall = {
+            key: totals[0][key]
+            for key in ("currency", "total_minor", "average_minor")
+        }
+    elif totals:
+        overall = {
+            "currency": None,
+            "total_minor": None,
+            "average_minor": None,
+        }
+    else:
+        overall = {
+            "currency": default_currency(),
+            "total_minor": 0,
+            "average_minor": None,
+        }
+    return {
+        **overall,
+        "count": sum(group["count"] for group in groups),
+        "totals": totals,
+        "groups": groups if group_by else [],
+    }
+
+
+@blueprint.route("/export", methods=["GET"])
+@blueprint.arguments(ExpenseExportRequestSchema, location="query")
+@blueprint.response(
+    HTTPStatus.OK, description="Expense history as NDJSON or CSV"
+)
+@jwt_required()
+@user_access_required
+def export_expenses(args, user_id):
+    export_format = args.pop("format")
+    convert_to = args.pop("convert_to", None)
+    columns = list(_EXPENSE_FIELDS)
+    serializer = compile_schema(ExpenseSchema)
+    # One set of rates for the whole export.
+    revision = FxRate.revision() if convert_to else None
+
+    def dump(rows):
+        dumped = serializer.dump_many(rows)
+        if convert_to:
+            for row, data in zip(rows, dumped):
+                data["converted_amount"] = _converted_amount(
+                    row, convert_to, revision
+                )
+                data["converted_currency"] = convert_to
+        return dumped
+
+    partitions = (
+        dump(rows)
+        for rows in Expense.iter_rows(
+            _source_columns(columns),
+            EXPORT_CHUNK_SIZE,
+            user_id=user_id,
+            **args,
         )
-    return {"data": expenses, "next_url": url}
+    )
+    if convert_to:
+        columns += ["converted_amount", "converted_currency"]
+    if export_format == "csv":
+        body, mimetype = csv_chunks(columns, partitions), "text/csv"
+    else:
+        body = ndjson_chunks(partitions)
+        mimetype = "application/x-ndjson"
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={
+            "Content-Disposition": "attachment; "
+            f"filename=expenses.{export_format}"
+        },
+    )
 
 
 @blueprint.route("/<int:expense_id>", methods=["GET"])
-@blueprint.response(HTTPStatus.OK, schema=ExpenseSchema)
+@blueprint.arguments(ExpenseIncludeSchema, location="query")
+@blueprint.response(HTTPStatus.OK, schema=ExpenseWithCategorySchema)
 @jwt_required()
 @user_access_required
-def get_expense(user_id, expense_id):
-    expense = Expense.get_by_user_id_and_id_or_404(user_id, expense_id)
-    return expense
+def get_expense(args, user_id, expense_id):
+    check_not_modified(user_id)
+    with_category = "category" in args["include"]
+    expense = Expense.get_by_user_id_and_id_or_404(
+        user_id, expense_id, with_category=with_category
+    )
+    schema = ExpenseWithCategorySchema if with_category else ExpenseSchema
+    return json_response(compile_schema(schema).dump(expense))
 
 
 @blueprint.route("/", methods=["POST"])
@@ -65,13 +287,122 @@ def get_expense(user_id, expense_id):
 @jwt_required()
 @user_access_required
 def create_expense(expense_data, user_id):
-    Category.get_by_user_id_and_id_or_404(user_id, expense_data["category_id"])
+    category_cache.get_or_404(user_id, expense_data["category_id"])
     expense = Expense(**expense_data)
     expense.user_id = user_id
     expense.save(commit=True)
     return expense
 
 
+@blueprint.route("/bulk", methods=["POST"])
+@blueprint.arguments(BulkExpenseRequestSchema, location="json")
+@blueprint.response(HTTPStatus.CREATED, schema=BulkExpenseResponseSchema)
+@jwt_required()
+@user_access_required
+def create_expenses_bulk(bulk_data, user_id):
+    errors, loaded = [], []
+    item_schema = ExpenseSchema()
+    for index, item in enumerate(bulk_data["items"]):
+        try:
+            loaded.append((index, item_schema.load(item)))
+        except ValidationError as err:
+            errors.append({"index": index, "messages": err.messages})
+
+    known_ids = category_cache.active_ids(
+        user_id, [item["category_id"] for _, item in loaded]
+    )
+    valid = []
+    for index, item in loaded:
+        if item["category_id"] in known_ids:
+            valid.append((index, item))
+            continue
+        message = (
+            f"Category with id {item['category_id']} "
+            f"not found for user {user_id}"
+        )
+        errors.append({"index": index, "messages": {"category_id": [message]}})
+
+    created, rejected = Expense.bulk_create(
+        user_id,
+        [item for _, item in valid],
+        current_app.config["BULK_INSERT_CHUNK_SIZE"],
+    )
+    db.session.commit()
+    for position in rejected:
+        errors.append(
+            {
+                "index": valid[position][0],
+                "messages": {"_schema": ["Rejected by the database"]},
+            }
+        )
+    errors.sort(key=lambda error: error["index"])
+    payload = compile_schema(BulkExpenseResponseSchema).dump(
+        {"created": created, "errors": errors}
+    )
+    return json_response(payload), HTTPStatus.CREATED
+
+
+@blueprint.route("/import", methods=["POST"])
+@blueprint.arguments(ExpenseImportRequestSchema, location="query")
+@blueprint.arguments(ExpenseImportFileSchema, location="files")
+@blueprint.response(HTTPStatus.OK, schema=ExpenseImportResponseSchema)
+@jwt_required()
+@user_access_required
+def import_expense_statement(args, files, user_id):
+    upload = files["file"]
+    file_format = args.get("format") or (
+        upload.filename.rsplit(".", 1)[-1].lower()
+    )
+    if file_format not in PARSERS:
+        abort(
+            HTTPStatus.BAD_REQUEST,
+            message="Cannot tell the file format, pass format=csv|ofx",
+        )
+    default_category_id = args.get("default_category_id")
+    if default_category_id is not None:
+        category_cache.get_or_404(user_id, default_category_id)
+    # Werkzeug spools large uploads to a temporary file, so the statement
+    # is read from disk as the import goes.
+    report = import_expenses(
+        decode_lines(upload.stream),
+        file_format,
+        user_id,
+        default_category_id,
+        on_progress=lambda report: current_app.logger.info(
+            "Import for user %s: %s lines, %s imported",
+            user_id,
+            report.processed,
+            report.imported,
+        ),
+    )
+    return report.as_dict()
+
+
+@blueprint.route("/", methods=["PATCH"])
+@blueprint.arguments(BulkUpdateExpenseSchema, location="json")
+@blueprint.response(HTTPStatus.OK, schema=BulkAffectedSchema)
+@jwt_required()
+@user_access_required
+def update_expenses_bulk(selection, user_id):
+    changes = selection.pop("changes")
+    if "category_id" in changes:
+        category_cache.get_or_404(user_id, changes["category_id"])
+    affected = Expense.bulk_update(user_id, changes, **selection)
+    db.session.commit()
+    return {"affected": affected}
+
+
+@blueprint.route("/", methods=["DELETE"])
+@blueprint.arguments(ExpenseSelectionSchema, location="json")
+@blueprint.response(HTTPStatus.OK, schema=BulkAffectedSchema)
+@jwt_required()
+@user_access_required
+def delete_expenses_bulk(selection, user_id):
+    affected = Expense.bulk_soft_delete(user_id, **selection)
+    db.session.commit()
+    return {"affected": affected}
+
+
 @blueprint.route("/<int:expense_id>", methods=["PUT"])
 @blueprint.arguments(UpdateExpenseSchema, location="json")
 @blueprint.response(HTTPStatus.OK, schema=ExpenseSchema)
@@ -79,9 +410,7 @@ def create_expense(expense_data, user_id):
 @user_access_required
 def update_expense(expense_data, user_id, expense_id):
     if "category_id" in expense_data:
-        Category.get_by_user_id_and_id_or_404(
-            user_id, expense_data["category_id"]
-        )
+        category_cache.get_or_404(user_id, expense_data["category_id"])
     expense = Expense.get_by_user_id_and_id_or_404(user_id, expense_id)
     expense.update(expense_data, commit=True)
     return expense
@@ -0,0 +1,60 @@
+from flask_smorest import Blueprint
+from http import HTTPStatus
+from flask_jwt_extended import jwt_required
+
+from src.models.recurring import RecurringExpense
+from src.schemas.compiled import compile_schema, json_response
+from src.schemas.recurring import RecurringExpenseSchema
+from src.services.categories import category_cache
+from src.views.utils import check_not_modified, user_access_required
+
+blueprint = Blueprint(
+    "recurring_expenses",
+    __name__,
+    url_prefix="/users/<int:user_id>/recurring-expenses",
+    description="Rules that enter an expense on a schedule",
+)
+
+
+@blueprint.route("/", methods=["GET"])
+@blueprint.response(HTTPStatus.OK, schema=RecurringExpenseSchema(many=True))
+@jwt_required()
+@user_access_required
+def get_recurring_expenses(user_id):
+    check_not_modified(user_id)
+    rules = RecurringExpense.query.filter_by(
+        user_id=user_id, deleted_at=None
+    ).order_by(RecurringExpense.id)
+    return json_response(
+        compile_schema(RecurringExpenseSchema).dump_many(rules.all())
+    )
+
+
+@blueprint.route("/<int:rule_id>", methods=["GET"])
+@blueprint.response(HTTPStatus.OK, schema=RecurringExpenseSchema)
+@jwt_required()
+@user_access_required
+def get_recurring_expense(user_id, rule_id):
+    check_not_modified(user_id)
+    return RecurringExpense.get_by_user_id_and_id_or_404(user_id, rule_id)
+
+
+@blueprint.route("/", methods=["POST"])
+@blueprint.arguments(RecurringExpenseSchema, location="json")
+@blueprint.response(HTTPStatus.CREATED, schema=RecurringExpenseSchema)
+@jwt_required()
+@user_access_required
+def create_recurring_expense(rule_data, user_id):
+    category_cache.get_or_404(user_id, rule_data["category_id"])
+    return RecurringExpense.create({**rule_data, "user_id": user_id})
+
+
+@blueprint.route("/<int:rule_id>", methods=["DELETE"])
+@blueprint.response(HTTPStatus.NO_CONTENT)
+@jwt_required()
+@user_access_required
+def delete_recurring_expense(user_id, rule_id):
+    """Stop the rule; the expenses it already entered are kept."""
+    rule = RecurringExpense.get_by_user_id_and_id_or_404(user_id, rule_id)
+    rule.soft_delete(commit=True)
+    return "", HTTPStatus.NO_CONTENT
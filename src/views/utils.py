@@ -1,13 +1,24 @@
 from flask_jwt_extended import current_user
-from flask import jsonify
+from flask import after_this_request, jsonify, request
+from flask_smorest.exceptions import NotModified
+from datetime import timezone
+from functools import wraps
+import hashlib
+import json
+from typing import Optional
 from http import HTTPStatus
 
+from src.models.data_versions import UserDataVersion
+from src.services.identity import identity_resolver
+from src.services.money import MONEY_FORMAT_HEADER, money_format
+
 
 def user_access_required(func):
+    @wraps(func)
     def wrapper(*args, **kwargs):
-        if not current_user or (
-            not current_user.active or current_user.deleted_at is not None
-        ):
+        # current_user is the request-scoped user already resolved by the
+        # identity resolver, so these checks never touch the database.
+        if not identity_resolver.is_active(current_user):
             return (
                 jsonify({"message": "User account is inactive or not found"}),
                 HTTPStatus.UNAUTHORIZED,
@@ -29,3 +40,61 @@ def user_access_required(func):
         return func(*args, **kwargs)
 
     return wrapper
+
+
+def make_etag(etag_data: dict) -> str:
+    """A strong ETag for ``etag_data`` (JSON-serializable)."""
+    data = json.dumps(etag_data, sort_keys=True, default=str)
+    return hashlib.sha1(data.encode("utf-8")).hexdigest()
+
+
+def check_not_modified(user_id: int, extra: Optional[dict] = None):
+    """Validate a conditional GET against the user's change marker.
+
+    Raises 304 before any rows are loaded or serialized when the client's
+    copy is current, and tags the response (200 or 304) with the ETag and
+    Last-Modified. The ETag depends only on the marker, the request URL
+    and the money format, so it changes exactly when the rendered payload
+    can; views whose output also depends on other data pass a marker of
+    it as ``extra``. Last-Modified cannot reflect that data, so such
+    views only answer If-None-Match.
+    """
+    version, updated_at = UserDataVersion.get_marker(user_id)
+    etag = make_etag(
+        {
+            "user_id": user_id,
+            "version": version,
+            "url": request.full_path,
+            "money_format": money_format(),
+            **(extra or {}),
+        }
+    )
+    last_modified = (
+        updated_at.replace(tzinfo=timezone.utc, microsecond=0)
+        if updated_at is not None
+        else None
+    )
+
+    @after_this_request
+    def set_validators(response):
+        if response.status_code in (HTTPStatus.OK, HTTPStatus.NOT_MODIFIED):
+            response.set_etag(etag)
+            response.last_modified = last_modified
+            response.vary.add(MONEY_FORMAT_HEADER)
+        return response
+
+    if request.if_none_match:
+        if etag in request.if_none_match:
+            raise NotModified
+        return
+    # Last-Modified has whole seconds, so a second write within the same
+    # second would go unnoticed: the date is only trusted when the
+    # marker has no sub-second part.
+    if (
+        last_modified is not None
+        and extra is None
+        and updated_at.microsecond == 0
+        and request.if_modified_since is not None
+        and last_modified <= request.if_modified_since
+    ):
+        raise NotModified
@@ -0,0 +1,6 @@
+import os
+
+# Set before the models are imported (by conftest): lazy loads raise in
+# tests, so an accidental N+1 fails instead of issuing a query per row
+# (see src.models.base.RELATIONSHIP_LAZY).
+os.environ.setdefault("RELATIONSHIP_LAZY", "raise")
@@ -1,8 +1,14 @@
 import pytest
 import os
+from datetime import datetime
+from sqlalchemy import event
 from src import create_app
 from src.extensions import db
 from src.models.users import User
+from src.services.analytics import analytics_engine
+from src.services.categories import category_cache
+from src.services.fx import fx_converter
+from src.services.identity import identity_resolver
 
 TEST_DB_PATH = "test_expenses_db.sqlite"
 
@@ -47,6 +53,7 @@ class AuthenticatedClient:
 def app():
     config = {
         "TESTING": True,
+        "BCRYPT_LOG_ROUNDS": 4,
         "SQLALCHEMY_DATABASE_URI": os.getenv(
             "TEST_DATABASE_URI", f"sqlite:///{TEST_DB_PATH}"
         ),
@@ -61,6 +68,10 @@ def app():
 @pytest.fixture(scope="function", autouse=True)
 def clean_db(app):
     yield
+    identity_resolver.cache.clear()
+    fx_converter.cache.clear()
+    analytics_engine.cache.clear()
+    category_cache.cache.clear()
     with app.app_context():
         db.session.remove()
         db.drop_all()
@@ -73,6 +84,53 @@ def test_db(app):
         yield db
 
 
+@pytest.fixture
+def sql_statements(test_db):
+    """Record every SQL statement sent to the database during a test."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    engine = test_db.engine
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    yield statements
+    event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+@pytest.fixture
+def query_plan(test_db):
+    """Return a function giving the database's plan for a statement, as
+    text. Postgres is told to avoid sequential scans, so the plan shows
+    whether an index can serve the query at all."""
+
+    def plan(stmt) -> str:
+        dialect = test_db.engine.dialect
+        compiled = stmt.compile(
+            dialect=dialect, compile_kwargs={"render_postcompile": True}
+        )
+        with test_db.engine.connect() as conn:
+            if dialect.name == "sqlite":
+                params = tuple(
+                    compiled.params[key] for key in compiled.positiontup
+                )
+                rows = conn.exec_driver_sql(
+                    "EXPLAIN QUERY PLAN " + compiled.string,
+                    tuple(
+                        p.isoformat(sep=" ") if isinstance(p, datetime) else p
+                        for p in params
+                    ),
+                )
+                return "\n".join(row[-1] for row in rows)
+            conn.exec_driver_sql("SET enable_seqscan = off")
+            rows = conn.exec_driver_sql(
+                "EXPLAIN " + compiled.string, compiled.params
+            )
+            return "\n".join(row[0] for row in rows)
+
+    return plan
+
+
 @pytest.fixture
 def client(app):
     """Return a test client for making requests."""
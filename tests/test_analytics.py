@@ -0,0 +1,173 @@
+import pytest
+from datetime import datetime
+from http import HTTPStatus
+
+from src.models.categories import Category
+from src.models.expenses import Expense
+
+
+class TestAnalytics:
+    @pytest.fixture
+    def url(self, test_user):
+        return f"/users/{test_user.id}/analytics/"
+
+    @pytest.fixture
+    def categories(self, test_db, test_user):
+        return [
+            Category.create({"name": name, "user_id": test_user.id}).id
+            for name in ("Food", "Rent")
+        ]
+
+    @pytest.fixture
+    def expenses(self, test_user, categories):
+        food, rent = categories
+        rows = [
+            (10, food, datetime(2024, 1, 30, 12)),
+            (20, food, datetime(2024, 1, 31, 8)),
+            (30, food, datetime(2024, 2, 2, 23, 59)),
+            (500, rent, datetime(2024, 2, 1)),
+            (15, food, datetime(2024, 4, 1)),
+        ]
+        rows += [(12, food, datetime(2024, 3, day)) for day in range(1, 21)]
+        for amount, category_id, created_at in rows:
+            Expense.create(
+                {
+                    "amount": amount,
+                    "category_id": category_id,
+                    "created_at": created_at,
+                    "user_id": test_user.id,
+                }
+            )
+        Expense.create(
+            {
+                "amount": 99,
+                "currency": "EUR",
+                "category_id": food,
+                "created_at": datetime(2024, 1, 1),
+                "user_id": test_user.id,
+            }
+        )
+
+    def test_report(self, authenticated_client, url, categories, expenses):
+        food, rent = categories
+        response = authenticated_client.get(url, query_string={"window": 3})
+        assert response.status_code == HTTPStatus.OK
+        data = response.get_json()
+        assert (data["currency"], data["count"], data["total"]) == (
+            "USD",
+            25,
+            815.0,
+        )
+        daily = data["daily"]
+        assert daily[0] == {
+            "day": "2024-01-30",
+            "total": 10.0,
+            "moving_average": 10.0,
+        }
+        # Days without expenses count in the moving average.
+        assert [
+            (d["day"], d["total"], d["moving_average"]) for d in daily[1:4]
+        ] == [
+            ("2024-01-31", 20.0, 15.0),
+            ("2024-02-01", 500.0, 176.67),
+            ("2024-02-02", 30.0, 183.33),
+        ]
+        assert daily[-1]["day"] == "2024-04-01"
+        assert len(daily) == 63
+        assert data["monthly"] == [
+            {
+                "month": "2024-01",
+                "total": 30.0,
+                "change": None,
+                "change_pct": None,
+            },
+            {
+                "month": "2024-02",
+                "total": 530.0,
+                "change": 500.0,
+                "change_pct": 1666.67,
+            },
+            {
+                "month": "2024-03",
+                "total": 240.0,
+                "change": -290.0,
+                "change_pct": -54.72,
+            },
+            {
+                "month": "2024-04",
+                "total": 15.0,
+                "change": -225.0,
+                "change_pct": -93.75,
+            },
+        ]
+        assert data["categories"] == [
+            {"category_id": rent, "total": 500.0, "count": 1, "share": 0.6135},
+            {
+                "category_id": food,
+                "total": 315.0,
+                "count": 24,
+                "share": 0.3865,
+            },
+        ]
+        outliers = data["outliers"]
+        assert (outliers["method"], outliers["threshold"]) == ("zscore", 3.0)
+        assert [
+            (o["amount"], o["category_id"]) for o in outliers["items"]
+        ] == [(500.0, rent)]
+        assert outliers["items"][0]["score"] > 4
+
+    def test_iqr_outliers_and_currency(
+        self, authenticated_client, url, expenses
+    ):
+        data = authenticated_client.get(
+            url, query_string={"outliers": "iqr"}
+        ).get_json()
+        assert data["outliers"]["threshold"] == 1.5
+        # The middle half is all 12s, so any other amount stands out.
+        assert sorted(o["amount"] for o in data["outliers"]["items"]) == [
+            10.0,
+            15.0,
+            20.0,
+            30.0,
+            500.0,
+        ]
+        data = authenticated_client.get(
+            url, query_string={"currency": "EUR"}
+        ).get_json()
+        assert (data["count"], data["total"]) == (1, 99.0)
+        data = authenticated_client.get(
+            url, query_string={"currency": "JPY"}
+        ).get_json()
+        assert (data["count"], data["daily"], data["average"]) == (0, [], None)
+
+    def test_snapshot_cached_until_a_write(
+        self,
+        authenticated_client,
+        url,
+        test_user,
+        categories,
+        expenses,
+        sql_statements,
+    ):
+        authenticated_client.get(url)
+        sql_statements.clear()
+        authenticated_client.get(url, query_string={"window": 30})
+        assert not [s for s in sql_statements if "FROM expenses" in s]
+
+        Expense.create(
+            {
+                "amount": 1,
+                "category_id": categories[0],
+                "created_at": datetime(2024, 4, 2),
+                "user_id": test_user.id,
+            }
+        )
+        sql_statements.clear()
+        data = authenticated_client.get(url).get_json()
+        assert data["count"] == 26
+        assert len([s for s in sql_statements if "FROM expenses" in s]) == 1
+
+    def test_rejects_bad_arguments(self, authenticated_client, url):
+        for query in ({"window": 0}, {"outliers": "mad"}, {"currency": "X"}):
+            response = authenticated_client.get(url, query_string=query)
+            assert response.status_code == HTTPStatus.BAD_REQUEST
@@ -1,8 +1,14 @@
+import pytest
+from concurrent.futures import ThreadPoolExecutor
 from sqlalchemy import select
 from datetime import datetime
+from flask_jwt_extended import decode_token
 
 from http import HTTPStatus
+from threading import Event
 from src.models.users import User
+from src.services.identity import identity_resolver
+from src.services.passwords import PasswordHasher, password_hasher
 
 
 class TestAuth:
@@ -156,6 +162,69 @@ class TestAuth:
         data = response.get_json()
         assert data["message"] == "Invalid credentials"
 
+    def test_login_rehashes_password_on_cost_change(
+        self, app, client, test_user, test_db, monkeypatch
+    ):
+        assert test_user.password_hash.startswith("$2b$04$")
+        monkeypatch.setitem(app.config, "BCRYPT_LOG_ROUNDS", 5)
+        response = client.post(
+            "/auth/login",
+            json={"login": test_user.email, "password": "password123@AAA"},
+        )
+        assert response.status_code == HTTPStatus.OK
+        test_db.session.refresh(test_user)
+        assert test_user.password_hash.startswith("$2b$05$")
+
+    def test_login_saturated_hasher(self, client, test_user, monkeypatch):
+        slots = password_hasher._slots
+        monkeypatch.setattr(slots, "acquire", lambda blocking=True: False)
+        response = client.post(
+            "/auth/login",
+            json={"login": test_user.email, "password": "password123@AAA"},
+        )
+        assert response.status_code == HTTPStatus.SERVICE_UNAVAILABLE
+        assert response.headers["Retry-After"] == "1"
+
+    def test_init_app_shuts_down_previous_pool(self, app, monkeypatch):
+        # Restored on teardown.
+        monkeypatch.setitem(app.extensions, "password_hasher", password_hasher)
+        hasher = PasswordHasher(app)
+        previous = hasher.executor
+        hasher.init_app(app)
+        with pytest.raises(RuntimeError):
+            previous.submit(int)
+        assert hasher.executor.submit(int).result() == 0
+        hasher.executor.shutdown()
+
+    def test_slot_returns_to_its_own_pool(self, app, monkeypatch):
+        monkeypatch.setitem(app.extensions, "password_hasher", password_hasher)
+        hasher = PasswordHasher(app)
+        started, finish = Event(), Event()
+
+        def slow_hash():
+            started.set()
+            finish.wait(5)
+            return "hashed"
+
+        previous = hasher._slots
+        pool = ThreadPoolExecutor(max_workers=1)
+        with app.app_context():
+            result = pool.submit(hasher._run, slow_hash)
+            assert started.wait(5)
+            hasher.init_app(app)
+            finish.set()
+            assert result.result(5) == "hashed"
+        pool.shutdown()
+        # Every slot of both semaphores is free again.
+        slots = (
+            app.config["PASSWORD_HASH_WORKERS"]
+            + app.config["PASSWORD_HASH_MAX_PENDING"]
+        )
+        for semaphore in (previous, hasher._slots):
+            assert all(semaphore.acquire(blocking=False) for _ in range(slots))
+            assert not semaphore.acquire(blocking=False)
+        hasher.executor.shutdown()
+
     def test_logout(self, authenticated_client):
         response = authenticated_client.post("/auth/logout")
         assert response.status_code == HTTPStatus.OK
@@ -180,3 +249,204 @@ class TestAuth:
         assert response.status_code == HTTPStatus.UNAUTHORIZED
         data = response.get_json()
         assert data["message"] == "Token is not valid"
+
+
+class TestIdentityResolver:
+    @staticmethod
+    def user_queries(statements):
+        return [s for s in statements if "FROM users" in s]
+
+    def test_single_user_query_per_request(
+        self, authenticated_client, sql_statements
+    ):
+        response = authenticated_client.get("/auth/who_am_i")
+        assert response.status_code == HTTPStatus.OK
+        assert len(self.user_queries(sql_statements)) == 1
+
+    def test_cached_identity_skips_user_query(
+        self, authenticated_client, sql_statements, monkeypatch
+    ):
+        monkeypatch.setattr(identity_resolver.cache, "ttl", 60)
+        authenticated_client.get("/auth/who_am_i")
+        sql_statements.clear()
+        response = authenticated_client.get("/auth/who_am_i")
+        assert response.status_code == HTTPStatus.OK
+        assert self.user_queries(sql_statements) == []
+
+    def test_logout_invalidates_cached_identity(
+        self, authenticated_client, monkeypatch
+    ):
+        monkeypatch.setattr(identity_resolver.cache, "ttl", 60)
+        authenticated_client.get("/auth/who_am_i")
+        authenticated_client.post("/auth/logout")
+        response = authenticated_client.get("/auth/who_am_i")
+        assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+    def test_deactivation_invalidates_cached_identity(
+        self, authenticated_client, test_user, test_db, monkeypatch
+    ):
+        monkeypatch.setattr(identity_resolver.cache, "ttl", 60)
+        authenticated_client.get("/auth/who_am_i")
+        test_user.active = False
+        test_db.session.commit()
+        response = authenticated_client.get("/auth/who_am_i")
+        assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+    def test_cached_identity_dropped_on_commit(
+        self, app, authenticated_client, test_user, test_db, monkeypatch
+    ):
+        monkeypatch.setattr(identity_resolver.cache, "ttl", 60)
+        user_id = test_user.id
+        authenticated_client.get("/auth/who_am_i")
+        test_user.active = False
+        test_db.session.flush()
+        assert identity_resolver.cache.get(user_id) is not None
+        test_db.session.rollback()
+        assert identity_resolver.cache.get(user_id) is not None
+
+        test_user.first_name = "Renamed"
+        test_db.session.commit()
+        assert identity_resolver.cache.get(user_id) is None
+
+        test_user.active = False
+        test_db.session.flush()
+        with app.test_request_context():
+            assert identity_resolver.load_user(user_id).active is False
+        # The uncommitted row is not cached.
+        assert identity_resolver.cache.get(user_id) is None
+        test_db.session.commit()
+        response = authenticated_client.get("/auth/who_am_i")
+        assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+class TestTokenVersion:
+    def test_tokens_carry_token_version(self, app, authenticated_client):
+        claims = decode_token(authenticated_client.token)
+        assert claims["ver"] == 0
+
+    def test_logout_bumps_token_version(
+        self, authenticated_client, test_user, test_db
+    ):
+        authenticated_client.post("/auth/logout")
+        test_db.session.refresh(test_user)
+        assert test_user.token_version == 1
+
+    def test_soft_delete_revokes_tokens(
+        self, authenticated_client, test_user, test_db
+    ):
+        test_user.soft_delete(commit=True)
+        response = authenticated_client.get("/auth/who_am_i")
+        assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+    def test_stateless_access_token_skips_user_queries(
+        self, app, authenticated_client, test_user, sql_statements, monkeypatch
+    ):
+        monkeypatch.setitem(app.config, "JWT_STATELESS_ACCESS_TOKENS", True)
+        response = authenticated_client.get(f"/users/{test_user.id}/expenses/")
+        assert response.status_code == HTTPStatus.OK
+        assert not [s for s in sql_statements if "FROM users" in s]
+
+    def test_stateless_refresh_rejected_after_logout(
+        self, app, client, authenticated_client, monkeypatch
+    ):
+        monkeypatch.setitem(app.config, "JWT_STATELESS_ACCESS_TOKENS", True)
+        csrf_token = client.get_cookie("csrf_refresh_token").value
+        refresh_token = client.get_cookie(
+            "refresh_token_cookie", path="/auth/refresh"
+        ).value
+        authenticated_client.post("/auth/logout")
+        # The stateless access token stays usable until it expires ...
+        response = authenticated_client.get("/auth/who_am_i")
+        assert response.status_code == HTTPStatus.OK
+        # ... but the refresh token minted with it is revoked.
+        client.set_cookie(
+            "refresh_token_cookie",
+            refresh_token,
+            path="/auth/refresh",
+        )
+        response = client.post(
+            "/auth/refresh", headers={"X-CSRF-TOKEN": csrf_token}
+        )
+        assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+class TestLoginLookup:
+    REGISTRATION = {
+        "first_name": "Another",
+        "last_name": "User",
+        "password": "password123@AAA",
+    }
+
+    @pytest.mark.parametrize(
+        "login, indexes",
+        [
+            ("TestUser", ["uq_user_username_lower"]),
+            (
+                "Test@Example.com",
+                ["uq_user_username_lower", "uq_user_email_lower"],
+            ),
+        ],
+    )
+    def test_lookup_seeks_the_lower_indexes(
+        self, query_plan, test_user, login, indexes
+    ):
+        assert User.get_by_username_or_email(login).id == test_user.id
+        plan = query_plan(User.select_by_login(login))
+        for index in indexes:
+            assert index in plan
+        assert "SCAN users" not in plan
+        assert "Seq Scan" not in plan
+
+    def test_register_conflict_skips_the_hash(
+        self, client, test_user, sql_statements, monkeypatch, query_plan
+    ):
+        def hash(password):
+            raise AssertionError("hashed a taken registration")
+
+        monkeypatch.setattr(password_hasher, "hash", hash)
+        sql_statements.clear()
+        response = client.post(
+            "/auth/register",
+            json={
+                **self.REGISTRATION,
+                "username": "someone",
+                "email": "TEST@example.com",
+            },
+        )
+        assert response.status_code == HTTPStatus.CONFLICT
+        assert len([s for s in sql_statements if s.startswith("SELECT")]) == 1
+        plan = query_plan(User.select_taken("someone", "TEST@example.com"))
+        assert "uq_user_username_lower" in plan
+        assert "uq_user_email_lower" in plan
+        assert "SCAN users" not in plan
+        assert "Seq Scan" not in plan
+
+    def test_register_race_is_a_conflict(self, client, test_user, monkeypatch):
+        # Both requests pass the probe; the unique index rejects the second.
+        monkeypatch.setattr(User, "is_taken", lambda *args: False)
+        response = client.post(
+            "/auth/register",
+            json={
+                **self.REGISTRATION,
+                "username": "TestUser",
+                "email": "new@example.com",
+            },
+        )
+        assert response.status_code == HTTPStatus.CONFLICT
+
+    def test_deleted_users_free_their_names(self, client, test_db, test_user):
+        test_user.soft_delete(commit=True)
+        response = client.post(
+            "/auth/register",
+            json={
+                **self.REGISTRATION,
+                "username": "TestUser",
+                "email": "test@example.com",
+            },
+        )
+        assert response.status_code == HTTPStatus.CREATED
+        response = client.post(
+            "/auth/login",
+            json={"login": "testuser", "password": "password123@AAA"},
+        )
+        assert response.status_code == HTTPStatus.OK
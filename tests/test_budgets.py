@@ -0,0 +1,146 @@
+import pytest
+from datetime import date, datetime
+from http import HTTPStatus
+from sqlalchemy import select
+
+from src.extensions import db
+from src.models.budgets import Budget, BudgetAlert, BudgetSpending
+from src.models.categories import Category
+from src.models.expenses import Expense
+
+
+class TestBudgets:
+    @pytest.fixture
+    def url(self, test_user):
+        return f"/users/{test_user.id}/budgets/"
+
+    @pytest.fixture
+    def category_id(self, test_db, test_user):
+        return Category.create({"name": "Food", "user_id": test_user.id}).id
+
+    @pytest.fixture
+    def budget_id(self, authenticated_client, url, category_id):
+        response = authenticated_client.post(
+            url,
+            json={"category_id": category_id, "amount": 100, "alert_at": 80},
+        )
+        assert response.status_code == HTTPStatus.CREATED
+        return response.get_json()["id"]
+
+    def add(self, test_user, category_id, amount, created_at=None):
+        return Expense.create(
+            {
+                "amount": amount,
+                "category_id": category_id,
+                "user_id": test_user.id,
+                "created_at": created_at or datetime(2024, 5, 10),
+            }
+        )
+
+    def status(self, client, url, month="2024-05"):
+        response = client.get(url, query_string={"month": month})
+        assert response.status_code == HTTPStatus.OK
+        return response.get_json()
+
+    def test_new_budget_counts_existing_expenses(
+        self, authenticated_client, url, test_user, category_id
+    ):
+        self.add(test_user, category_id, "30.00")
+        self.add(test_user, category_id, "45.50", datetime(2024, 4, 30, 23))
+        Expense.create(
+            {
+                "amount": 10,
+                "currency": "EUR",
+                "category_id": category_id,
+                "user_id": test_user.id,
+                "created_at": datetime(2024, 5, 1),
+            }
+        )
+        response = authenticated_client.post(
+            url, json={"category_id": category_id, "amount": 100}
+        )
+        assert response.status_code == HTTPStatus.CREATED
+        (status,) = self.status(authenticated_client, url)
+        assert (status["month"], status["spent"], status["remaining"]) == (
+            "2024-05",
+            30.0,
+            70.0,
+        )
+        assert status["over_budget"] is False
+        (april,) = self.status(authenticated_client, url, "2024-04")
+        assert april["spent"] == 45.5
+
+    def test_writes_update_spending_incrementally(
+        self,
+        authenticated_client,
+        url,
+        test_user,
+        category_id,
+        budget_id,
+        sql_statements,
+    ):
+        other_id = Category.create(
+            {"name": "Travel", "user_id": test_user.id}
+        ).id
+        expense_url = f"/users/{test_user.id}/expenses/"
+        expense = self.add(test_user, category_id, 40)
+        authenticated_client.put(
+            f"{expense_url}{expense.id}", json={"amount": 60}
+        )
+        moved = self.add(test_user, category_id, 5)
+        authenticated_client.put(
+            f"{expense_url}{moved.id}", json={"category_id": other_id}
+        )
+        authenticated_client.delete(f"{expense_url}{expense.id}")
+        self.add(test_user, category_id, "12.34")
+        stored = db.session.scalar(
+            select(BudgetSpending.spent_minor).where(
+                BudgetSpending.budget_id == budget_id,
+                BudgetSpending.month == date(2024, 5, 1),
+            )
+        )
+        assert stored == 1234
+
+        # Reading the status does not sum the expenses.
+        sql_statements.clear()
+        (status,) = self.status(authenticated_client, url)
+        assert status["spent"] == 12.34
+        assert not [s for s in sql_statements if "FROM expenses" in s]
+        assert Budget.rebuild_spending() >= 1
+        assert self.status(authenticated_client, url)[0]["spent"] == 12.34
+
+    def test_alert_recorded_once(
+        self, authenticated_client, url, test_user, category_id, budget_id
+    ):
+        expense = self.add(test_user, category_id, 79)
+        assert self.status(authenticated_client, url)[0]["alerted_at"] is None
+        crossing = self.add(test_user, category_id, 30)
+        (status,) = self.status(authenticated_client, url)
+        assert status["over_budget"] is True
+        assert status["remaining"] == -9.0
+        alerted_at = status["alerted_at"]
+        assert alerted_at is not None
+
+        crossing.soft_delete(commit=True)
+        expense.update({"amount": 99}, commit=True)
+        alerts = db.session.execute(select(BudgetAlert)).scalars().all()
+        assert [(a.budget_id, a.month, a.spent_minor) for a in alerts] == [
+            (budget_id, date(2024, 5, 1), 10900)
+        ]
+        assert self.status(authenticated_client, url)[0]["alerted_at"] == (
+            alerted_at
+        )
+
+    def test_one_budget_per_category(
+        self, authenticated_client, url, category_id, budget_id
+    ):
+        response = authenticated_client.post(
+            url, json={"category_id": category_id, "amount": 5}
+        )
+        assert response.status_code == HTTPStatus.CONFLICT
+        response = authenticated_client.delete(f"{url}{budget_id}")
+        assert response.status_code == HTTPStatus.NO_CONTENT
+        response = authenticated_client.post(
+            url, json={"category_id": category_id, "amount": 5}
+        )
+        assert response.status_code == HTTPStatus.CREATED
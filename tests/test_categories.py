@@ -0,0 +1,370 @@
+import pytest
+from datetime import datetime
+from fnmatch import fnmatch
+from http import HTTPStatus
+from sqlalchemy import select, update
+
+from src.extensions import db
+from src.models.categories import Category
+from src.models.data_versions import UserDataVersion
+from src.models.expenses import Expense
+from src.models.recurring import RecurringExpense
+from src.models.rollups import DailyExpenseRollup
+from src.services.cache import SharedCache
+from src.services.categories import category_cache
+
+
+class LocalSharedClient:
+    """Stand-in for the Redis commands ``SharedCache`` uses."""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+    def scan_iter(self, match="*"):
+        return [key for key in list(self.data) if fnmatch(key, match)]
+
+
+class TestCategoryCache:
+    @pytest.fixture(params=["local", "shared"])
+    def backend(self, request, monkeypatch):
+        if request.param == "shared":
+            client = LocalSharedClient()
+            monkeypatch.setattr(
+                category_cache,
+                "cache",
+                SharedCache(client, ttl=60, prefix="categories:"),
+            )
+            return client
+        return None
+
+    @pytest.fixture
+    def url(self, test_user):
+        return f"/users/{test_user.id}/categories/"
+
+    @pytest.fixture
+    def category(self, test_db, test_user):
+        return Category.create({"name": "Food", "user_id": test_user.id})
+
+    def category_queries(self, sql_statements):
+        return [s for s in sql_statements if "FROM categories" in s]
+
+    def test_reads_and_validation_hit_the_cache(
+        self,
+        backend,
+        authenticated_client,
+        url,
+        test_user,
+        category,
+        sql_statements,
+    ):
+        category_id = category.id
+        listed = authenticated_client.get(url).get_json()["data"]
+        assert [c["name"] for c in listed] == ["Food"]
+        if backend is not None:
+            assert list(backend.data) == [f"categories:{test_user.id}"]
+        sql_statements.clear()
+        response = authenticated_client.get(f"{url}{category_id}")
+        assert response.get_json()["name"] == "Food"
+        response = authenticated_client.post(
+            f"/users/{test_user.id}/expenses/",
+            json={"amount": 5, "category_id": category_id},
+        )
+        assert response.status_code == HTTPStatus.CREATED
+        # Expense writes leave the categories' version alone.
+        for category_id in (category_id, category_id, category_id + 1):
+            response = authenticated_client.post(
+                f"/users/{test_user.id}/expenses/",
+                json={"amount": 5, "category_id": category_id},
+            )
+        assert response.status_code == HTTPStatus.NOT_FOUND
+        assert self.category_queries(sql_statements) == []
+
+    def test_writes_invalidate(
+        self, backend, authenticated_client, url, test_user, category
+    ):
+        authenticated_client.get(url)
+        response = authenticated_client.post(url, json={"name": "Rent"})
+        assert response.status_code == HTTPStatus.CREATED
+        names = [
+            c["name"] for c in authenticated_client.get(url).get_json()["data"]
+        ]
+        assert names == ["Food", "Rent"]
+
+        category.update({"name": "Groceries"}, commit=True)
+        response = authenticated_client.get(f"{url}{category.id}")
+        assert response.get_json()["name"] == "Groceries"
+
+        category.soft_delete(commit=True)
+        response = authenticated_client.get(f"{url}{category.id}")
+        assert response.status_code == HTTPStatus.NOT_FOUND
+        response = authenticated_client.post(
+            f"/users/{test_user.id}/expenses/",
+            json={"amount": 5, "category_id": category.id},
+        )
+        assert response.status_code == HTTPStatus.NOT_FOUND
+
+    def test_changes_from_other_processes_are_seen(
+        self, backend, test_user, category
+    ):
+        assert category_cache.get(test_user.id, category.id)["name"] == "Food"
+        # As another process would: no listener here sees the write.
+        db.session.execute(
+            update(Category)
+            .where(Category.id == category.id)
+            .values(name="Groceries")
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        assert category_cache.get(test_user.id, category.id)["name"] == "Food"
+        UserDataVersion.bump([test_user.id])
+        db.session.commit()
+        assert category_cache.get(test_user.id, category.id)["name"] == "Food"
+        UserDataVersion.bump([test_user.id], counter="categories_version")
+        db.session.commit()
+        name = category_cache.get(test_user.id, category.id)["name"]
+        assert name == "Groceries"
+
+    def test_shared_cache_needs_a_prefix(self):
+        with pytest.raises(ValueError):
+            SharedCache(LocalSharedClient(), ttl=60, prefix="")
+
+    def test_rolled_back_rows_are_not_kept(self, test_user, category):
+        db.session.add(Category(name="Draft", user_id=test_user.id))
+        db.session.flush()
+        assert len(category_cache.categories(test_user.id)) == 2
+        db.session.rollback()
+        names = [c["name"] for c in category_cache.categories(test_user.id)]
+        assert names == ["Food"]
+
+
+class TestCategoryList:
+    @pytest.fixture
+    def url(self, test_user):
+        return f"/users/{test_user.id}/categories/"
+
+    @pytest.fixture
+    def categories(self, test_db, test_user):
+        ids = [
+            Category.create({"name": name, "user_id": test_user.id}).id
+            for name in ("Food", "Rent", "Travel")
+        ]
+        food, rent, _ = ids
+        for amount, currency, category_id, created_at in (
+            ("10.50", "USD", food, datetime(2024, 5, 1)),
+            (4, "USD", food, datetime(2024, 5, 3)),
+            (7, "EUR", food, datetime(2024, 4, 2)),
+            (900, "USD", rent, datetime(2024, 5, 2)),
+        ):
+            Expense.create(
+                {
+                    "amount": amount,
+                    "currency": currency,
+                    "category_id": category_id,
+                    "created_at": created_at,
+                    "user_id": test_user.id,
+                }
+            )
+        removed = Expense.create(
+            {
+                "amount": 1,
+                "category_id": rent,
+                "created_at": datetime(2024, 6, 1),
+                "user_id": test_user.id,
+            }
+        )
+        removed.soft_delete(commit=True)
+        return ids
+
+    def test_stats_in_one_query(
+        self, authenticated_client, url, categories, sql_statements
+    ):
+        food, rent, travel = categories
+        sql_statements.clear()
+        response = authenticated_client.get(
+            url, query_string={"include": "stats"}
+        )
+        assert response.status_code == HTTPStatus.OK
+        stats = {c["id"]: c["stats"] for c in response.get_json()["data"]}
+        assert stats == {
+            food: {
+                "count": 3,
+                "last_used_on": "2024-05-03",
+                "totals": [
+                    {"currency": "EUR", "total": 7.0, "count": 1},
+                    {"currency": "USD", "total": 14.5, "count": 2},
+                ],
+            },
+            rent: {
+                "count": 1,
+                "last_used_on": "2024-05-02",
+                "totals": [{"currency": "USD", "total": 900.0, "count": 1}],
+            },
+            travel: {"count": 0, "last_used_on": None, "totals": []},
+        }
+        reads = [
+            s
+            for s in sql_statements
+            if "FROM categories" in s or "FROM expenses" in s
+        ]
+        assert len(reads) == 1
+        assert "daily_expense_rollups" in reads[0]
+
+    @pytest.mark.parametrize("include", [None, "stats"])
+    def test_keyset_pagination(
+        self, authenticated_client, url, categories, include
+    ):
+        query = {"limit": 2, **({"include": include} if include else {})}
+        seen, next_url = [], url
+        while True:
+            data = authenticated_client.get(
+                next_url, query_string=None if seen else query
+            ).get_json()
+            if not data["data"]:
+                break
+            assert len(data["data"]) <= 2
+            assert all(("stats" in c) == bool(include) for c in data["data"])
+            seen += [c["id"] for c in data["data"]]
+            next_url = data["next_url"].replace("http://localhost", "")
+        assert seen == categories
+
+    @pytest.mark.parametrize("include", [None, "stats"])
+    @pytest.mark.parametrize("limit", [0, -1, 1001])
+    def test_limit_out_of_range(
+        self, authenticated_client, url, categories, include, limit
+    ):
+        query = {"limit": limit, **({"include": include} if include else {})}
+        response = authenticated_client.get(url, query_string=query)
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        assert "limit" in response.get_json()["details"]["query"]
+
+
+class TestDeleteCategory:
+    @pytest.fixture
+    def url(self, test_user):
+        return f"/users/{test_user.id}/categories/"
+
+    @pytest.fixture
+    def category_ids(self, test_db, test_user):
+        return [
+            Category.create({"name": name, "user_id": test_user.id}).id
+            for name in ("Food", "Groceries")
+        ]
+
+    def add_expenses(self, test_user, category_id, count):
+        return [
+            Expense.create(
+                {
+                    "amount": 10,
+                    "category_id": category_id,
+                    "created_at": datetime(2024, 5, day),
+                    "user_id": test_user.id,
+                }
+            )
+            for day in range(1, count + 1)
+        ]
+
+    def test_delete_unused_category(
+        self, authenticated_client, url, category_ids
+    ):
+        food, groceries = category_ids
+        assert len(authenticated_client.get(url).get_json()["data"]) == 2
+        response = authenticated_client.delete(f"{url}{food}")
+        assert response.status_code == HTTPStatus.OK
+        assert response.get_json() == {"moved_expenses": 0, "moved_rules": 0}
+        listed = authenticated_client.get(url).get_json()["data"]
+        assert [c["id"] for c in listed] == [groceries]
+        response = authenticated_client.delete(f"{url}{food}")
+        assert response.status_code == HTTPStatus.NOT_FOUND
+
+    def test_category_in_use_needs_reassign_to(
+        self, authenticated_client, url, test_user, category_ids
+    ):
+        food, groceries = category_ids
+        self.add_expenses(test_user, food, 1)
+        response = authenticated_client.delete(f"{url}{food}")
+        assert response.status_code == HTTPStatus.CONFLICT
+        for target, status in (
+            (food, HTTPStatus.BAD_REQUEST),
+            (groceries + 1, HTTPStatus.NOT_FOUND),
+        ):
+            response = authenticated_client.delete(
+                f"{url}{food}", query_string={"reassign_to": target}
+            )
+            assert response.status_code == status
+        assert authenticated_client.get(f"{url}{food}").status_code == (
+            HTTPStatus.OK
+        )
+
+    def test_reassign_in_batches(
+        self,
+        app,
+        monkeypatch,
+        authenticated_client,
+        url,
+        test_user,
+        category_ids,
+        sql_statements,
+    ):
+        food, groceries = category_ids
+        monkeypatch.setitem(app.config, "CATEGORY_REASSIGN_BATCH_SIZE", 2)
+        expenses = self.add_expenses(test_user, food, 5)
+        expenses[0].soft_delete(commit=True)
+        RecurringExpense.create(
+            {
+                "amount": 5,
+                "category_id": food,
+                "user_id": test_user.id,
+                "frequency": "monthly",
+                "starts_at": datetime(2030, 1, 1),
+            }
+        )
+        budgets = f"/users/{test_user.id}/budgets/"
+        for category_id in category_ids:
+            authenticated_client.post(
+                budgets, json={"category_id": category_id, "amount": 100}
+            )
+        expense_url = f"/users/{test_user.id}/expenses/"
+        etag = authenticated_client.get(expense_url).headers["ETag"]
+
+        sql_statements.clear()
+        response = authenticated_client.delete(
+            f"{url}{food}", query_string={"reassign_to": groceries}
+        )
+        assert response.status_code == HTTPStatus.OK
+        assert response.get_json() == {"moved_expenses": 4, "moved_rules": 1}
+        moves = [s for s in sql_statements if s.startswith("UPDATE expenses")]
+        assert len(moves) == 2
+
+        assert DailyExpenseRollup.verify() == []
+        response = authenticated_client.get(
+            expense_url, headers={"If-None-Match": etag}
+        )
+        assert response.status_code == HTTPStatus.OK
+        assert {e["category_id"] for e in response.get_json()["data"]} == {
+            groceries
+        }
+        assert (
+            db.session.scalar(
+                select(Expense.category_id).where(Expense.id == expenses[0].id)
+            )
+            == food
+        )
+        statuses = authenticated_client.get(
+            budgets, query_string={"month": "2024-05"}
+        ).get_json()
+        assert [(s["category_id"], s["spent"]) for s in statuses] == [
+            (groceries, 40.0)
+        ]
+        rule_categories = db.session.scalars(
+            select(RecurringExpense.category_id)
+        ).all()
+        assert rule_categories == [groceries]
@@ -1,5 +1,30 @@
+import csv
+import io
+import json
 import pytest
+from datetime import date, datetime
 from http import HTTPStatus
+from marshmallow import ValidationError
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy.orm import Session
+from unittest.mock import ANY
+
+from src.extensions import db
+from src.models.categories import Category
+from src.models.data_versions import UserDataVersion
+from src.models.expenses import Expense
+from src.models.fx_rates import FxRate
+from src.models.partitions import (
+    ensure_partitions,
+    is_partitioned,
+    months_between,
+    partition_name,
+)
+from src.models.rollups import DailyExpenseRollup
+from src.models.users import User
+from src.services.fx import fx_converter
+from src.services.money import from_minor, to_minor
 
 
 class TestExpenses:
@@ -118,6 +143,52 @@ class TestExpenses:
         assert "next_url" in data
         assert data["next_url"] is not None
 
+    def test_get_expenses_sparse_fields(
+        self, authenticated_client, test_user, setup_expense_category
+    ):
+        for i in range(3):
+            authenticated_client.post(
+                f"/users/{test_user.id}/expenses/",
+                json={
+                    "amount": 10.0 + i,
+                    "note": f"Expense {i}",
+                    "category_id": setup_expense_category,
+                },
+            )
+        response = authenticated_client.get(
+            f"/users/{test_user.id}/expenses/?fields=amount,note&limit=2"
+        )
+        assert response.status_code == HTTPStatus.OK
+        data = response.get_json()
+        assert data["data"] == [
+            {"amount": 12.0, "note": "Expense 2"},
+            {"amount": 11.0, "note": "Expense 1"},
+        ]
+        next_page = authenticated_client.get(data["next_url"]).get_json()
+        assert next_page["data"] == [{"amount": 10.0, "note": "Expense 0"}]
+
+    def test_get_expenses_sparse_fields_match_full_dump(
+        self, authenticated_client, test_user, setup_expense_category
+    ):
+        authenticated_client.post(
+            f"/users/{test_user.id}/expenses/",
+            json={"amount": 7.5, "category_id": setup_expense_category},
+        )
+        url = f"/users/{test_user.id}/expenses/"
+        full = authenticated_client.get(url).get_json()["data"][0]
+        sparse = authenticated_client.get(
+            url + "?fields=id,created_at,deleted_at"
+        ).get_json()["data"][0]
+        assert sparse == {
+            key: full[key] for key in ("id", "created_at", "deleted_at")
+        }
+
+    def test_get_expenses_unknown_field(self, authenticated_client, test_user):
+        response = authenticated_client.get(
+            f"/users/{test_user.id}/expenses/?fields=password_hash"
+        )
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+
     def test_create_expense_invalid_category(
         self, authenticated_client, test_user, setup_expense_category
     ):
@@ -132,3 +203,1290 @@ class TestExpenses:
         assert response.status_code == HTTPStatus.NOT_FOUND
         data = response.get_json()
         assert data["message"] == "The requested resource was not found"
+
+    def test_export_expenses_ndjson(
+        self, authenticated_client, test_user, setup_expense_category
+    ):
+        for i in range(3):
+            authenticated_client.post(
+                f"/users/{test_user.id}/expenses/",
+                json={
+                    "amount": 10.0 + i,
+                    "note": f"Expense {i}",
+                    "category_id": setup_expense_category,
+                },
+            )
+        response = authenticated_client.get(
+            f"/users/{test_user.id}/expenses/export"
+        )
+        assert response.status_code == HTTPStatus.OK
+        assert response.mimetype == "application/x-ndjson"
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        assert [row["amount"] for row in rows] == [12.0, 11.0, 10.0]
+        assert rows[0]["note"] == "Expense 2"
+        assert rows[0]["user_id"] == test_user.id
+
+    def test_export_expenses_csv_filters(
+        self, authenticated_client, test_user, setup_expense_category
+    ):
+        other = authenticated_client.post(
+            f"/users/{test_user.id}/categories/", json={"name": "Travel"}
+        ).get_json()["id"]
+        for category_id in (setup_expense_category, other):
+            authenticated_client.post(
+                f"/users/{test_user.id}/expenses/",
+                json={"amount": 5.0, "category_id": category_id},
+            )
+        response = authenticated_client.get(
+            f"/users/{test_user.id}/expenses/export"
+            f"?format=csv&category_ids={other}"
+        )
+        assert response.status_code == HTTPStatus.OK
+        assert response.mimetype == "text/csv"
+        rows = list(csv.DictReader(io.StringIO(response.text)))
+        assert len(rows) == 1
+        assert rows[0]["category_id"] == str(other)
+
+    def test_export_expenses_excludes_deleted(
+        self, authenticated_client, test_user, setup_expense_category
+    ):
+        expense_id = authenticated_client.post(
+            f"/users/{test_user.id}/expenses/",
+            json={"amount": 5.0, "category_id": setup_expense_category},
+        ).get_json()["id"]
+        authenticated_client.delete(
+            f"/users/{test_user.id}/expenses/{expense_id}"
+        )
+        response = authenticated_client.get(
+            f"/users/{test_user.id}/expenses/export"
+        )
+        assert response.text == ""
+
+
+class TestBulkCreateExpenses:
+    @pytest.fixture
+    def category_id(self, authenticated_client, test_user):
+        response = authenticated_client.post(
+            f"/users/{test_user.id}/categories/", json={"name": "Food"}
+        )
+        return response.get_json()["id"]
+
+    def test_bulk_create(
+        self, app, authenticated_client, test_user, category_id, monkeypatch
+    ):
+        monkeypatch.setitem(app.config, "BULK_INSERT_CHUNK_SIZE", 2)
+        items = [
+            {
+                "amount": 1.0 + i,
+                "note": f"Item {i}",
+                "category_id": category_id,
+            }
+            for i in range(5)
+        ]
+        response = authenticated_client.post(
+            f"/users/{test_user.id}/expenses/bulk", json={"items": items}
+        )
+        assert response.status_code == HTTPStatus.CREATED
+        data = response.get_json()
+        assert data["errors"] == []
+        assert [e["note"] for e in data["created"]] == [
+            f"Item {i}" for i in range(5)
+        ]
+        assert all(e["user_id"] == test_user.id for e in data["created"])
+        listed = authenticated_client.get(
+            f"/users/{test_user.id}/expenses/"
+        ).get_json()["data"]
+        assert len(listed) == 5
+
+    def test_bulk_create_reports_item_errors(
+        self, authenticated_client, test_user, category_id, sql_statements
+    ):
+        items = [
+            {"amount": 1.0, "category_id": category_id},
+            {"amount": "not a number", "category_id": category_id},
+            {"amount": 2.0, "category_id": 999},
+            {"amount": 3.0, "category_id": category_id},
+        ]
+        response = authenticated_client.post(
+            f"/users/{test_user.id}/expenses/bulk", json={"items": items}
+        )
+        assert response.status_code == HTTPStatus.CREATED
+        data = response.get_json()
+        assert [e["amount"] for e in data["created"]] == [1.0, 3.0]
+        assert [e["index"] for e in data["errors"]] == [1, 2]
+        assert "amount" in data["errors"][0]["messages"]
+        assert "category_id" in data["errors"][1]["messages"]
+        category_checks = [s for s in sql_statements if "FROM categories" in s]
+        assert len(category_checks) == 1
+
+    def test_rejected_chunk_keeps_its_valid_items(
+        self, test_user, category_id
+    ):
+        items = [
+            {"amount": 1 + i, "category_id": category_id} for i in range(5)
+        ]
+        # Not null in the database.
+        items[1]["category_id"] = None
+        created, rejected = Expense.bulk_create(
+            test_user.id, items, chunk_size=4
+        )
+        db.session.commit()
+        assert rejected == [1]
+        assert [e.amount_minor for e in created] == [100, 300, 400, 500]
+        assert DailyExpenseRollup.verify() == []
+
+    def test_bulk_create_requires_items(self, authenticated_client, test_user):
+        response = authenticated_client.post(
+            f"/users/{test_user.id}/expenses/bulk", json={"items": []}
+        )
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+
+
+class TestBulkModifyExpenses:
+    @pytest.fixture
+    def category_ids(self, authenticated_client, test_user):
+        return [
+            authenticated_client.post(
+                f"/users/{test_user.id}/categories/", json={"name": name}
+            ).get_json()["id"]
+            for name in ("Food", "Travel")
+        ]
+
+    @pytest.fixture
+    def expense_ids(self, authenticated_client, test_user, category_ids):
+        return [
+            authenticated_client.post(
+                f"/users/{test_user.id}/expenses/",
+                json={"amount": 1.0 + i, "category_id": category_ids[i % 2]},
+            ).get_json()["id"]
+            for i in range(4)
+        ]
+
+    def list_expenses(self, client, user_id):
+        return client.get(f"/users/{user_id}/expenses/").get_json()["data"]
+
+    def test_bulk_update_by_ids(
+        self,
+        authenticated_client,
+        test_user,
+        category_ids,
+        expense_ids,
+        sql_statements,
+    ):
+        response = authenticated_client.patch(
+            f"/users/{test_user.id}/expenses/",
+            json={
+                "ids": expense_ids[:3],
+                "changes": {"category_id": category_ids[1], "note": "moved"},
+            },
+        )
+        assert response.status_code == HTTPStatus.OK
+        assert response.get_json() == {"affected": 3}
+        updates = [
+            s for s in sql_statements if s.startswith("UPDATE expenses")
+        ]
+        assert len(updates) == 1
+        by_id = {
+            e["id"]: e
+            for e in self.list_expenses(authenticated_client, test_user.id)
+        }
+        assert [by_id[i]["note"] for i in expense_ids[:3]] == ["moved"] * 3
+        assert by_id[expense_ids[3]].get("note") is None
+        assert {by_id[i]["category_id"] for i in expense_ids[:3]} == {
+            category_ids[1]
+        }
+
+    def test_bulk_update_by_filter(
+        self, authenticated_client, test_user, category_ids, expense_ids
+    ):
+        response = authenticated_client.patch(
+            f"/users/{test_user.id}/expenses/",
+            json={
+                "category_ids": [category_ids[0]],
+                "changes": {"note": "food"},
+            },
+        )
+        assert response.get_json() == {"affected": 2}
+
+    def test_bulk_update_rejects_foreign_category(
+        self, authenticated_client, test_user, expense_ids
+    ):
+        response = authenticated_client.patch(
+            f"/users/{test_user.id}/expenses/",
+            json={"ids": expense_ids, "changes": {"category_id": 999}},
+        )
+        assert response.status_code == HTTPStatus.NOT_FOUND
+
+    def test_bulk_update_requires_selection_and_changes(
+        self, authenticated_client, test_user, expense_ids
+    ):
+        url = f"/users/{test_user.id}/expenses/"
+        response = authenticated_client.patch(
+            url, json={"changes": {"note": "all"}}
+        )
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        response = authenticated_client.patch(
+            url, json={"ids": expense_ids, "changes": {}}
+        )
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+
+    def test_bulk_soft_delete(
+        self, authenticated_client, test_user, expense_ids
+    ):
+        url = f"/users/{test_user.id}/expenses/"
+        response = authenticated_client.delete(
+            url, json={"ids": [*expense_ids[:2], 999]}
+        )
+        assert response.status_code == HTTPStatus.OK
+        assert response.get_json() == {"affected": 2}
+        remaining = self.list_expenses(authenticated_client, test_user.id)
+        assert sorted(e["id"] for e in remaining) == expense_ids[2:]
+        deleted = Expense.select_with_deleted().where(
+            Expense.id.in_(expense_ids[:2])
+        )
+        rows = db.session.execute(deleted).scalars().all()
+        assert all(e.deleted_at is not None for e in rows)
+        # Already-deleted rows are not counted again.
+        response = authenticated_client.delete(
+            url, json={"ids": expense_ids[:2]}
+        )
+        assert response.get_json() == {"affected": 0}
+
+
+class TestImportExpenses:
+    OFX = """OFXHEADER:100
+DATA:OFXSGML
+
+<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>
+<STMTTRN>
+<TRNTYPE>DEBIT
+<DTPOSTED>20240105120000.000[-5:EST]
+<TRNAMT>-12.50
+<NAME>Coffee shop
+</STMTTRN>
+<STMTTRN>
+<TRNTYPE>CREDIT
+<DTPOSTED>20240106
+<TRNAMT>1000.00
+<NAME>Salary
+</STMTTRN>
+<STMTTRN>
+<TRNTYPE>DEBIT
+<DTPOSTED>20240107
+<TRNAMT>-40.00
+<NAME>Groceries
+</STMTTRN>
+</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>
+"""
+
+    @pytest.fixture
+    def category_id(self, authenticated_client, test_user):
+        response = authenticated_client.post(
+            f"/users/{test_user.id}/categories/", json={"name": "Food"}
+        )
+        return response.get_json()["id"]
+
+    def upload(self, client, user_id, content, filename, **query):
+        return client.post(
+            f"/users/{user_id}/expenses/import",
+            query_string=query,
+            data={
+                "file": (
+                    io.BytesIO(
+                        content
+                        if isinstance(content, bytes)
+                        else content.encode()
+                    ),
+                    filename,
+                )
+            },
+            content_type="multipart/form-data",
+        )
+
+    def test_import_csv_in_chunks(
+        self, app, authenticated_client, test_user, category_id, monkeypatch
+    ):
+        monkeypatch.setitem(app.config, "IMPORT_CHUNK_SIZE", 2)
+        content = (
+            "Date,Amount,Description,Category\n"
+            "2024-01-01,10.5,Lunch,food\n"
+            "2024-01-02,not a number,Broken,Food\n"
+            "2024-01-03,7,Bus,Travel\n"
+            "2024-01-04T08:30:00,3.25,,Food\n"
+            "2024-01-01,10.5,Lunch,Food\n"
+        )
+        response = self.upload(
+            authenticated_client, test_user.id, content, "statement.csv"
+        )
+        assert response.status_code == HTTPStatus.OK
+        report = response.get_json()
+        assert report["processed"] == 5
+        assert report["imported"] == 2
+        assert report["duplicates"] == 1
+        assert [e["line"] for e in report["errors"]] == [3, 4]
+        assert "amount" in report["errors"][0]["messages"]
+        assert "category" in report["errors"][1]["messages"]
+        expenses = Expense.filter(user_id=test_user.id)
+        assert sorted(e.amount for e in expenses) == [3.25, 10.5]
+        assert {e.category_id for e in expenses} == {category_id}
+
+        # Importing the same statement again adds nothing.
+        again = self.upload(
+            authenticated_client, test_user.id, content, "statement.csv"
+        ).get_json()
+        assert again["imported"] == 0
+        assert again["duplicates"] == 3
+
+    def test_import_ofx(self, authenticated_client, test_user, category_id):
+        response = self.upload(
+            authenticated_client,
+            test_user.id,
+            self.OFX,
+            "statement.qfx",
+            format="ofx",
+            default_category_id=category_id,
+        )
+        report = response.get_json()
+        assert report["imported"] == 2
+        assert report["skipped"] == 1
+        expenses = Expense.filter(user_id=test_user.id)
+        assert [(e.amount, e.note) for e in expenses] == [
+            (40.0, "Groceries"),
+            (12.5, "Coffee shop"),
+        ]
+        assert expenses[1].created_at == datetime(2024, 1, 5, 12, 0)
+
+    @pytest.mark.parametrize(
+        "bad_line",
+        [b"2024-01-02,5,Caf\xe9,Food\n", b'2024-01-02,5,"' + b"x" * 200000],
+    )
+    def test_import_stops_at_unreadable_line(
+        self, authenticated_client, test_user, category_id, bad_line
+    ):
+        content = b"Date,Amount,Description,Category\n" + bad_line
+        response = self.upload(
+            authenticated_client, test_user.id, content, "statement.csv"
+        )
+        assert response.status_code == HTTPStatus.OK
+        report = response.get_json()
+        assert report["imported"] == 0
+        assert report["errors"] == [
+            {"line": 2, "messages": {"_schema": [ANY]}}
+        ]
+        assert report["errors"][0]["messages"]["_schema"][0].startswith(
+            "Cannot read the file"
+        )
+
+    def test_import_requires_known_format(
+        self, authenticated_client, test_user
+    ):
+        response = self.upload(
+            authenticated_client, test_user.id, "a,b\n", "statement.txt"
+        )
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+
+    def test_import_command(self, app, test_user, category_id, tmp_path):
+        path = tmp_path / "statement.csv"
+        path.write_text(
+            "date,amount,category_id\n2024-02-01,5," + (f"{category_id}\n")
+        )
+        result = app.test_cli_runner().invoke(
+            args=["import-expenses", str(path), "--user", "testuser"]
+        )
+        assert result.exit_code == 0, result.output
+        assert "Imported 1 of 1 lines" in result.output
+        assert len(Expense.filter(user_id=test_user.id)) == 1
+
+
+class TestExpenseSummary:
+    @pytest.fixture
+    def category_ids(self, test_db, test_user):
+        food = Category.create({"name": "Food", "user_id": test_user.id})
+        travel = Category.create({"name": "Travel", "user_id": test_user.id})
+        rows = [
+            (food.id, datetime(2024, 1, 7, 10), 10.0),  # Sunday
+            (food.id, datetime(2024, 1, 8, 9), 20.0),
+            (travel.id, datetime(2024, 1, 8, 18), 5.0),
+            (travel.id, datetime(2024, 2, 1), 15.0),
+        ]
+        for category_id, created_at, amount in rows:
+            Expense.create(
+                {
+                    "amount": amount,
+                    "category_id": category_id,
+                    "created_at": created_at,
+                    "user_id": test_user.id,
+                }
+            )
+        return food.id, travel.id
+
+    def summary(self, client, user_id, **query):
+        response = client.get(
+            f"/users/{user_id}/expenses/summary", query_string=query
+        )
+        assert response.status_code == HTTPStatus.OK, response.get_json()
+        return response.get_json()
+
+    def test_totals(self, authenticated_client, test_user, category_ids):
+        data = self.summary(authenticated_client, test_user.id)
+        totals = {
+            "currency": "USD",
+            "total": 50.0,
+            "count": 4,
+            "average": 12.5,
+        }
+        assert data == {**totals, "totals": [totals], "groups": []}
+
+    def test_by_category_and_week(
+        self, authenticated_client, test_user, category_ids, sql_statements
+    ):
+        food, travel = category_ids
+        data = self.summary(
+            authenticated_client, test_user.id, group_by="category,week"
+        )
+        groups = [
+            (g["category_id"], g["period"], g["total"], g["count"])
+            for g in data["groups"]
+        ]
+        assert groups == [
+            (food, "2024-01-01", 10.0, 1),
+            (food, "2024-01-08", 20.0, 1),
+            (travel, "2024-01-08", 5.0, 1),
+            (travel, "2024-01-29", 15.0, 1),
+        ]
+        assert any("GROUP BY" in s for s in sql_statements)
+
+    def test_by_month_with_filters(
+        self, authenticated_client, test_user, category_ids
+    ):
+        data = self.summary(
+            authenticated_client,
+            test_user.id,
+            group_by="month",
+            start_date="2024-01-08T00:00:00",
+        )
+        assert [
+            (g["period"], g["total"], g["count"], g["average"])
+            for g in data["groups"]
+        ] == [("2024-01-01", 25.0, 2, 12.5), ("2024-02-01", 15.0, 1, 15.0)]
+        assert all(g["category_id"] is None for g in data["groups"])
+
+    def test_empty_summary(self, authenticated_client, test_user):
+        data = self.summary(authenticated_client, test_user.id)
+        assert data == {
+            "currency": "USD",
+            "total": 0,
+            "count": 0,
+            "average": None,
+            "totals": [],
+            "groups": [],
+        }
+
+    def test_rejects_two_periods(self, authenticated_client, test_user):
+        response = authenticated_client.get(
+            f"/users/{test_user.id}/expenses/summary",
+            query_string={"group_by": "day,month"},
+        )
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+
+
+class TestDailyRollups:
+    @pytest.fixture
+    def category_ids(self, authenticated_client, test_user):
+        return [
+            authenticated_client.post(
+                f"/users/{test_user.id}/categories/", json={"name": name}
+            ).get_json()["id"]
+            for name in ("Food", "Travel")
+        ]
+
+    def rollups(self, test_db):
+        rows = test_db.session.execute(
+            select(
+                DailyExpenseRollup.category_id,
+                DailyExpenseRollup.total_minor,
+                DailyExpenseRollup.count,
+            ).order_by(DailyExpenseRollup.category_id)
+        )
+        return [tuple(row) for row in rows]
+
+    def test_orm_writes_keep_rollups_exact(
+        self, test_db, authenticated_client, test_user, category_ids
+    ):
+        food, travel = category_ids
+        url = f"/users/{test_user.id}/expenses/"
+        ids = [
+            authenticated_client.post(
+                url, json={"amount": amount, "category_id": food}
+            ).get_json()["id"]
+            for amount in (10.0, 5.0, 2.5)
+        ]
+        assert self.rollups(test_db) == [(food, 1750, 3)]
+
+        authenticated_client.put(
+            f"{url}{ids[0]}", json={"amount": 4.0, "category_id": travel}
+        )
+        assert self.rollups(test_db) == [(food, 750, 2), (travel, 400, 1)]
+
+        authenticated_client.delete(f"{url}{ids[0]}")
+        assert self.rollups(test_db) == [(food, 750, 2)]
+        assert DailyExpenseRollup.verify() == []
+
+    def test_set_based_writes_keep_rollups_exact(
+        self, test_db, authenticated_client, test_user, category_ids
+    ):
+        food, travel = category_ids
+        url = f"/users/{test_user.id}/expenses/"
+        items = [{"amount": 1.0 + i, "category_id": food} for i in range(4)]
+        created = authenticated_client.post(
+            url + "bulk", json={"items": items}
+        ).get_json()["created"]
+        assert self.rollups(test_db) == [(food, 1000, 4)]
+
+        authenticated_client.patch(
+            url,
+            json={
+                "ids": [e["id"] for e in created[:2]],
+                "changes": {"category_id": travel, "amount": 6.0},
+            },
+        )
+        assert self.rollups(test_db) == [(food, 700, 2), (travel, 1200, 2)]
+
+        authenticated_client.delete(url, json={"category_ids": [food]})
+        assert self.rollups(test_db) == [(travel, 1200, 2)]
+        assert DailyExpenseRollup.verify() == []
+
+    def test_two_sessions_writing_the_same_row(
+        self, test_db, test_user, category_ids
+    ):
+        food, travel = category_ids
+        expense = Expense.create(
+            {"amount": 10, "category_id": food, "user_id": test_user.id}
+        )
+        expense_id = expense.id
+        with Session(test_db.engine) as other:
+            stale = other.get(Expense, expense_id)
+            # Committed after the other session loaded the row.
+            expense.update({"amount": 4}, commit=True)
+            stale.category_id = travel
+            other.commit()
+            assert self.rollups(test_db) == [(travel, 400, 1)]
+
+            stale = other.get(Expense, expense_id)
+            Expense.bulk_soft_delete(test_user.id, [expense_id])
+            test_db.session.commit()
+            stale.deleted_at = datetime.now()
+            other.commit()
+        assert self.rollups(test_db) == []
+        assert DailyExpenseRollup.verify() == []
+
+    def test_summary_reads_rollups_for_whole_days(
+        self, test_db, test_user, category_ids, sql_statements
+    ):
+        food = category_ids[0]
+        for created_at, amount in [
+            (datetime(2024, 1, 1, 8), 1.0),
+            (datetime(2024, 1, 1, 20), 2.0),
+            (datetime(2024, 1, 2, 12), 4.0),
+            (datetime(2024, 1, 3, 6), 8.0),
+            (datetime(2024, 1, 3, 18), 16.0),
+        ]:
+            Expense.create(
+                {
+                    "amount": amount,
+                    "category_id": food,
+                    "created_at": created_at,
+                    "user_id": test_user.id,
+                }
+            )
+        sql_statements.clear()
+        rows = Expense.summarize(test_user.id, period="day")
+        assert [(r["period"], r["total_minor"]) for r in rows] == [
+            ("2024-01-01", 300),
+            ("2024-01-02", 400),
+            ("2024-01-03", 2400),
+        ]
+        assert not any("FROM expenses" in s for s in sql_statements)
+
+        # Partial first and last days come from the expenses themselves.
+        rows = Expense.summarize(
+            test_user.id,
+            start_date=datetime(2024, 1, 1, 12),
+            end_date=datetime(2024, 1, 3, 12),
+        )
+        assert [(r["total_minor"], r["count"]) for r in rows] == [(1400, 3)]
+
+    def test_rebuild_and_verify_commands(
+        self, app, test_db, test_user, category_ids
+    ):
+        Expense.create(
+            {
+                "amount": 3.0,
+                "category_id": category_ids[0],
+                "user_id": test_user.id,
+            }
+        )
+        test_db.session.execute(delete(DailyExpenseRollup))
+        test_db.session.commit()
+        runner = app.test_cli_runner()
+        result = runner.invoke(args=["rollups", "verify"])
+        assert result.exit_code == 1
+        assert "expected (300, 1)" in result.output
+        result = runner.invoke(args=["rollups", "rebuild"])
+        assert result.exit_code == 0, result.output
+        result = runner.invoke(
+            args=["rollups", "verify", "--user", "testuser"]
+        )
+        assert result.exit_code == 0, result.output
+
+
+class TestMoney:
+    @pytest.fixture
+    def url(self, test_user):
+        return f"/users/{test_user.id}/expenses/"
+
+    @pytest.fixture
+    def category_id(self, authenticated_client, test_user):
+        return authenticated_client.post(
+            f"/users/{test_user.id}/categories/", json={"name": "Food"}
+        ).get_json()["id"]
+
+    def create(self, client, url, category_id, **fields):
+        response = client.post(
+            url, json={"category_id": category_id, **fields}
+        )
+        assert response.status_code == HTTPStatus.CREATED, response.get_json()
+        return response.get_json()
+
+    def test_minor_unit_conversion(self):
+        assert to_minor("12.5", "USD") == 1250
+        assert to_minor(0.1, "USD") == 10
+        assert to_minor(3, "JPY") == 3
+        assert to_minor("1.005", "KWD") == 1005
+        assert str(from_minor(1250, "USD")) == "12.50"
+        assert str(from_minor(7, "JPY")) == "7"
+        with pytest.raises(ValidationError):
+            to_minor("1.005", "USD")
+
+    def test_sums_are_exact(
+        self, authenticated_client, url, category_id, test_user
+    ):
+        for _ in range(10):
+            self.create(authenticated_client, url, category_id, amount=0.1)
+        summary_url = f"{url}summary"
+        assert authenticated_client.get(summary_url).get_json()["total"] == 1.0
+        decimal = authenticated_client.get(
+            summary_url, headers={"X-Money-Format": "decimal"}
+        ).get_json()
+        assert (decimal["total"], decimal["average"]) == ("1.00", "0.10")
+        expense = Expense.filter(user_id=test_user.id)[0]
+        assert (expense.amount_minor, expense.currency) == (10, "USD")
+
+    def test_decimal_format_on_request(
+        self, authenticated_client, url, category_id
+    ):
+        created = self.create(
+            authenticated_client, url, category_id, amount="19.99"
+        )
+        assert (created["amount"], created["currency"]) == (19.99, "USD")
+        response = authenticated_client.get(
+            f"{url}{created['id']}", headers={"X-Money-Format": "decimal"}
+        )
+        assert response.get_json()["amount"] == "19.99"
+        assert "X-Money-Format" in response.headers["Vary"]
+        assert (
+            response.headers["ETag"]
+            != authenticated_client.get(f"{url}{created['id']}").headers[
+                "ETag"
+            ]
+        )
+
+    def test_rejects_more_decimals_than_currency(
+        self, authenticated_client, url, category_id
+    ):
+        for body in (
+            {"amount": 1.5, "currency": "JPY"},
+            {"amount": "1.005"},
+            {"amount": 1, "currency": "XXX"},
+        ):
+            response = authenticated_client.post(
+                url, json={"category_id": category_id, **body}
+            )
+            assert response.status_code == HTTPStatus.BAD_REQUEST
+
+    def test_currency_change_keeps_amount(
+        self, authenticated_client, url, category_id
+    ):
+        created = self.create(authenticated_client, url, category_id, amount=8)
+        response = authenticated_client.put(
+            f"{url}{created['id']}", json={"currency": "JPY"}
+        )
+        assert response.get_json()["amount"] == 8
+        assert response.get_json()["currency"] == "JPY"
+        response = authenticated_client.put(
+            f"{url}{created['id']}", json={"amount": 8.5}
+        )
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+
+    def test_summary_per_currency(
+        self, authenticated_client, url, category_id
+    ):
+        self.create(authenticated_client, url, category_id, amount=10)
+        self.create(authenticated_client, url, category_id, amount=5)
+        self.create(
+            authenticated_client,
+            url,
+            category_id,
+            amount=300,
+            currency="JPY",
+        )
+        data = authenticated_client.get(f"{url}summary").get_json()
+        assert (data["currency"], data["total"], data["count"]) == (
+            None,
+            None,
+            3,
+        )
+        assert [(t["currency"], t["total"]) for t in data["totals"]] == [
+            ("JPY", 300),
+            ("USD", 15.0),
+        ]
+
+    def test_bulk_amount_in_each_currency(
+        self, authenticated_client, url, category_id, test_user
+    ):
+        self.create(authenticated_client, url, category_id, amount=1)
+        self.create(
+            authenticated_client, url, category_id, amount=1, currency="JPY"
+        )
+        response = authenticated_client.patch(
+            url,
+            json={"category_ids": [category_id], "changes": {"amount": 3}},
+        )
+        assert response.get_json() == {"affected": 2}
+        expenses = Expense.filter(user_id=test_user.id)
+        assert sorted((e.currency, e.amount_minor) for e in expenses) == [
+            ("JPY", 3),
+            ("USD", 300),
+        ]
+        assert DailyExpenseRollup.verify() == []
+        response = authenticated_client.patch(
+            url,
+            json={
+                "category_ids": [category_id],
+                "changes": {"currency": "EUR"},
+            },
+        )
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+
+
+class TestFxConversion:
+    RATES = (
+        "Date,USD,JPY,\n"
+        "2024-01-08,1.0900,161.00,\n"
+        "2024-01-05,1.1000,160.00,\n"
+    )
+
+    @pytest.fixture
+    def url(self, test_user):
+        return f"/users/{test_user.id}/expenses/"
+
+    @pytest.fixture
+    def rates(self, app, test_db, tmp_path):
+        path = tmp_path / "eurofxref.csv"
+        path.write_text(self.RATES)
+        result = app.test_cli_runner().invoke(
+            args=["fx", "load", str(path), "--base", "EUR"]
+        )
+        assert result.exit_code == 0, result.output
+        assert "Loaded 4 rates" in result.output
+
+    @pytest.fixture
+    def category_id(self, test_db, test_user):
+        return Category.create({"name": "Trip", "user_id": test_user.id}).id
+
+    def add(self, test_user, category_id, amount, currency, created_at):
+        Expense.create(
+            {
+                "amount": amount,
+                "currency": currency,
+                "category_id": category_id,
+                "created_at": created_at,
+                "user_id": test_user.id,
+            }
+        )
+
+    def test_rates_as_of_day(self, rates):
+        series = fx_converter.series("EUR", "USD")
+        # Saturday uses Friday's rate; nothing before the first one.
+        assert series.rate_on(date(2024, 1, 6)) == 1.1
+        assert series.rate_on(date(2024, 1, 9)) == 1.09
+        assert series.rate_on(date(2024, 1, 4)) is None
+        assert fx_converter.convert(1100, "USD", "EUR", date(2024, 1, 6)) == (
+            1000
+        )
+        # JPY -> USD is crossed through the EUR base.
+        assert fx_converter.convert(16000, "JPY", "USD", date(2024, 1, 5)) == (
+            11000
+        )
+
+    def test_summary_in_reporting_currency(
+        self,
+        authenticated_client,
+        url,
+        test_user,
+        rates,
+        category_id,
+        sql_statements,
+    ):
+        self.add(test_user, category_id, "11.00", "USD", datetime(2024, 1, 6))
+        self.add(test_user, category_id, 1610, "JPY", datetime(2024, 1, 8, 9))
+        self.add(test_user, category_id, "5.00", "EUR", datetime(2024, 1, 8))
+        sql_statements.clear()
+        data = authenticated_client.get(
+            f"{url}summary",
+            query_string={"convert_to": "EUR", "group_by": "day"},
+            headers={"X-Money-Format": "decimal"},
+        ).get_json()
+        assert (data["currency"], data["total"], data["count"]) == (
+            "EUR",
+            "25.00",
+            3,
+        )
+        assert [(g["period"], g["total"]) for g in data["groups"]] == [
+            ("2024-01-06", "10.00"),
+            ("2024-01-08", "15.00"),
+        ]
+        # One series query per currency pair, then cached.
+        rate_queries = [s for s in sql_statements if "FROM fx_rates" in s]
+        authenticated_client.get(
+            f"{url}summary", query_string={"convert_to": "EUR"}
+        )
+        assert len([s for s in sql_statements if "FROM fx_rates" in s]) == (
+            len(rate_queries)
+        )
+        assert any("FROM fx_rate_revisions" in s for s in sql_statements)
+
+    def test_new_rates_change_summary_validators(
+        self, app, authenticated_client, url, test_user, rates, category_id
+    ):
+        self.add(test_user, category_id, "11.00", "USD", datetime(2024, 1, 6))
+        query = {"convert_to": "EUR"}
+        db.session.execute(
+            update(UserDataVersion).values(updated_at=datetime(2024, 5, 1, 12))
+        )
+        db.session.commit()
+        first = authenticated_client.get(f"{url}summary", query_string=query)
+        revision = FxRate.revision()
+        FxRate.upsert(
+            [
+                {
+                    "base": "EUR",
+                    "quote": "USD",
+                    "day": date(2024, 1, 5),
+                    "rate": 1.0,
+                }
+            ]
+        )
+        # Committed as another process would: this one's cache is not
+        # cleared, the new revision alone makes it reload.
+        db.session.commit()
+        assert FxRate.revision() == revision + 1
+        response = authenticated_client.get(
+            f"{url}summary",
+            query_string=query,
+            headers={
+                "If-None-Match": first.headers["ETag"],
+                "If-Modified-Since": first.headers["Last-Modified"],
+            },
+        )
+        assert response.status_code == HTTPStatus.OK
+        assert response.get_json()["total"] == 11.0
+        # Last-Modified does not cover the rates, so it alone never 304s.
+        response = authenticated_client.get(
+            f"{url}summary",
+            query_string=query,
+            headers={"If-Modified-Since": first.headers["Last-Modified"]},
+        )
+        assert response.status_code == HTTPStatus.OK
+
+    def test_missing_rate_is_rejected(
+        self, authenticated_client, url, test_user, rates, category_id
+    ):
+        self.add(test_user, category_id, 3, "USD", datetime(2023, 12, 1))
+        response = authenticated_client.get(
+            f"{url}summary", query_string={"convert_to": "EUR"}
+        )
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        assert "USD to EUR" in response.get_json()["message"]
+
+    def test_export_adds_converted_amount(
+        self, authenticated_client, url, test_user, rates, category_id
+    ):
+        self.add(test_user, category_id, "2.18", "USD", datetime(2024, 1, 8))
+        self.add(test_user, category_id, 1, "USD", datetime(2023, 1, 1))
+        response = authenticated_client.get(
+            f"{url}export", query_string={"format": "csv", "convert_to": "EUR"}
+        )
+        rows = list(csv.DictReader(io.StringIO(response.get_data(True))))
+        assert [
+            (r["amount"], r["converted_amount"], r["converted_currency"])
+            for r in rows
+        ] == [("2.18", "2.0", "EUR"), ("1.0", "", "EUR")]
+
+
+class TestPartitions:
+    def test_months_between(self):
+        assert months_between(date(2023, 11, 15), date(2024, 2, 1)) == [
+            date(2023, 11, 1),
+            date(2023, 12, 1),
+            date(2024, 1, 1),
+            date(2024, 2, 1),
+        ]
+        assert partition_name(date(2024, 2, 1)) == "expenses_p2024_02"
+
+    def test_sqlite_is_never_partitioned(self, app, test_db):
+        connection = test_db.session.connection()
+        assert not is_partitioned(connection)
+        assert ensure_partitions(connection, date(2030, 1, 1)) == []
+        result = app.test_cli_runner().invoke(args=["partitions", "ensure"])
+        assert result.exit_code == 0
+        assert "not partitioned" in result.output
+
+
+class TestExpenseSearch:
+    NOTES = [
+        "Uber to airport",
+        "Groceries",
+        "uber uber eats dinner",
+        "Uber",
+        None,
+        "Coffee with uber driver",
+    ]
+
+    @pytest.fixture
+    def expense_ids(self, authenticated_client, test_user):
+        category_id = authenticated_client.post(
+            f"/users/{test_user.id}/categories/", json={"name": "Food"}
+        ).get_json()["id"]
+        ids = []
+        for note in self.NOTES:
+            body = {"amount": 1.0, "category_id": category_id}
+            if note is not None:
+                body["note"] = note
+            ids.append(
+                authenticated_client.post(
+                    f"/users/{test_user.id}/expenses/", json=body
+                ).get_json()["id"]
+            )
+        return ids
+
+    def search(self, client, user_id, **query):
+        response = client.get(
+            f"/users/{user_id}/expenses/", query_string=query
+        )
+        assert response.status_code == HTTPStatus.OK, response.get_json()
+        return response.get_json()
+
+    def test_ranked_matches(
+        self, authenticated_client, test_user, expense_ids
+    ):
+        data = self.search(authenticated_client, test_user.id, q="UBER")
+        notes = [e["note"] for e in data["data"]]
+        assert sorted(notes) == sorted(
+            n for n in self.NOTES if n and "uber" in n.lower()
+        )
+        # The note made only of the term outranks the longer ones.
+        assert notes[0] == "Uber"
+
+    def test_rank_counts_the_words_the_match_found(self, test_db, test_user):
+        category = Category.create({"name": "Cafe", "user_id": test_user.id})
+        for note in (
+            "Crème brûlée and more",
+            "CRÈME",
+            "tea steak steak",
+            "Tea time",
+        ):
+            Expense.create(
+                {
+                    "amount": 1,
+                    "note": note,
+                    "category_id": category.id,
+                    "user_id": test_user.id,
+                }
+            )
+        # Case is folded beyond ASCII, as the match does.
+        expenses = Expense.filter(user_id=test_user.id, q="crème")
+        assert [e.note for e in expenses] == ["CRÈME", "Crème brûlée and more"]
+        # "tea" inside "steak" is not a match, so it does not count.
+        expenses = Expense.filter(user_id=test_user.id, q="tea")
+        assert [e.note for e in expenses] == ["Tea time", "tea steak steak"]
+
+    def test_prefix_and_all_terms(
+        self, authenticated_client, test_user, expense_ids
+    ):
+        data = self.search(authenticated_client, test_user.id, q="ub eat")
+        assert [e["note"] for e in data["data"]] == ["uber uber eats dinner"]
+        data = self.search(authenticated_client, test_user.id, q='"uber" OR')
+        assert data["data"] == []
+        data = self.search(authenticated_client, test_user.id, q="***")
+        assert data["data"] == []
+
+    def test_keyset_pages_through_ranked_results(
+        self, authenticated_client, test_user, expense_ids
+    ):
+        full = self.search(authenticated_client, test_user.id, q="uber")
+        seen = []
+        data = self.search(
+            authenticated_client, test_user.id, q="uber", limit=1
+        )
+        while data["data"]:
+            seen.extend(e["id"] for e in data["data"])
+            data = authenticated_client.get(data["next_url"]).get_json()
+        assert seen == [e["id"] for e in full["data"]]
+
+    def test_other_users_notes_do_not_move_the_cursor(
+        self, authenticated_client, test_user, expense_ids
+    ):
+        full = self.search(authenticated_client, test_user.id, q="uber")
+        data = self.search(
+            authenticated_client, test_user.id, q="uber", limit=2
+        )
+        seen = [e["id"] for e in data["data"]]
+        other = User.create(
+            {
+                "first_name": "Other",
+                "last_name": "User",
+                "username": "other",
+                "email": "other@example.com",
+                "password_hash": "x",
+            }
+        )
+        category = Category.create({"name": "Taxi", "user_id": other.id})
+        for note in ("uber", "uber uber", "uber pool", "groceries"):
+            Expense.create(
+                {
+                    "amount": 1,
+                    "note": note,
+                    "category_id": category.id,
+                    "user_id": other.id,
+                }
+            )
+        while data["next_url"]:
+            data = authenticated_client.get(data["next_url"]).get_json()
+            seen.extend(e["id"] for e in data["data"])
+        assert seen == [e["id"] for e in full["data"]]
+
+    def test_search_follows_writes_and_filters(
+        self, authenticated_client, test_user, expense_ids
+    ):
+        url = f"/users/{test_user.id}/expenses/"
+        authenticated_client.put(
+            f"{url}{expense_ids[1]}", json={"note": "Uber groceries"}
+        )
+        authenticated_client.delete(f"{url}{expense_ids[3]}")
+        data = self.search(
+            authenticated_client, test_user.id, q="uber", fields="id,note"
+        )
+        ids = {e["id"] for e in data["data"]}
+        assert expense_ids[1] in ids
+        assert expense_ids[3] not in ids
+        assert set(data["data"][0]) == {"id", "note"}
+
+
+class TestConditionalRequests:
+    @pytest.fixture
+    def category_id(self, authenticated_client, test_user):
+        response = authenticated_client.post(
+            f"/users/{test_user.id}/categories/", json={"name": "Food"}
+        )
+        return response.get_json()["id"]
+
+    @pytest.fixture
+    def expense_id(self, authenticated_client, test_user, category_id):
+        response = authenticated_client.post(
+            f"/users/{test_user.id}/expenses/",
+            json={"amount": 5.0, "category_id": category_id},
+        )
+        return response.get_json()["id"]
+
+    def test_unchanged_list_is_not_modified(
+        self, authenticated_client, test_user, expense_id, sql_statements
+    ):
+        url = f"/users/{test_user.id}/expenses/"
+        first = authenticated_client.get(url)
+        assert first.headers["ETag"]
+        assert first.headers["Last-Modified"]
+        sql_statements.clear()
+        second = authenticated_client.get(
+            url, headers={"If-None-Match": first.headers["ETag"]}
+        )
+        assert second.status_code == HTTPStatus.NOT_MODIFIED
+        assert second.headers["ETag"] == first.headers["ETag"]
+        assert not [s for s in sql_statements if "FROM expenses" in s]
+
+    def test_write_changes_etag(
+        self, authenticated_client, test_user, expense_id, category_id
+    ):
+        url = f"/users/{test_user.id}/expenses/"
+        etag = authenticated_client.get(url).headers["ETag"]
+        authenticated_client.put(f"{url}{expense_id}", json={"amount": 6.0})
+        response = authenticated_client.get(
+            url, headers={"If-None-Match": etag}
+        )
+        assert response.status_code == HTTPStatus.OK
+        assert response.headers["ETag"] != etag
+
+    def test_query_string_is_part_of_etag(
+        self, authenticated_client, test_user, expense_id
+    ):
+        url = f"/users/{test_user.id}/expenses/"
+        etag = authenticated_client.get(url).headers["ETag"]
+        response = authenticated_client.get(
+            url + "?limit=1", headers={"If-None-Match": etag}
+        )
+        assert response.status_code == HTTPStatus.OK
+
+    def test_single_expense_not_modified(
+        self, authenticated_client, test_user, expense_id
+    ):
+        url = f"/users/{test_user.id}/expenses/{expense_id}"
+        etag = authenticated_client.get(url).headers["ETag"]
+        response = authenticated_client.get(
+            url, headers={"If-None-Match": etag}
+        )
+        assert response.status_code == HTTPStatus.NOT_MODIFIED
+
+    def test_if_modified_since(
+        self, authenticated_client, test_user, expense_id
+    ):
+        url = f"/users/{test_user.id}/categories/"
+        last_modified = authenticated_client.get(url).headers["Last-Modified"]
+        # The marker has sub-second precision, which the header lacks.
+        response = authenticated_client.get(
+            url, headers={"If-Modified-Since": last_modified}
+        )
+        assert response.status_code == HTTPStatus.OK
+
+        db.session.execute(
+            update(UserDataVersion).values(
+                updated_at=datetime(2024, 5, 1, 12, 0, 0)
+            )
+        )
+        db.session.commit()
+        response = authenticated_client.get(
+            url, headers={"If-Modified-Since": "Wed, 01 May 2024 12:00:00 GMT"}
+        )
+        assert response.status_code == HTTPStatus.NOT_MODIFIED
+        assert response.headers["ETag"]
+
+    def test_category_create_changes_category_etag(
+        self, authenticated_client, test_user, category_id
+    ):
+        url = f"/users/{test_user.id}/categories/"
+        etag = authenticated_client.get(url).headers["ETag"]
+        authenticated_client.post(url, json={"name": "Travel"})
+        response = authenticated_client.get(
+            url, headers={"If-None-Match": etag}
+        )
+        assert response.status_code == HTTPStatus.OK
+        assert len(response.get_json()["data"]) == 2
+
+
+class TestExpenseListIndex:
+    @pytest.mark.parametrize(
+        "filters",
+        [
+            {},
+            {"cursor_created_at": datetime(2025, 1, 1), "cursor_id": 10},
+            {"start_date": datetime(2024, 1, 1), "category_ids": [1, 2]},
+        ],
+    )
+    def test_list_query_uses_index_without_sort(self, query_plan, filters):
+        stmt = Expense.filter_stmt(user_id=1, **filters).limit(100)
+        plan = query_plan(stmt)
+        assert "idx_expense_user_created_at_id" in plan
+        assert "TEMP B-TREE" not in plan
+        assert "Sort" not in plan
+
+
+class TestIncludeCategory:
+    @pytest.fixture
+    def url(self, test_user):
+        return f"/users/{test_user.id}/expenses/"
+
+    @pytest.fixture
+    def expense_ids(self, test_db, test_user):
+        categories = [
+            Category.create({"name": name, "user_id": test_user.id})
+            for name in ("Food", "Travel")
+        ]
+        categories[1].update({"color": "#00ff00"}, commit=True)
+        ids = [
+            Expense.create(
+                {
+                    "amount": index + 1,
+                    "category_id": categories[index % 2].id,
+                    "created_at": datetime(2024, 5, index + 1),
+                    "user_id": test_user.id,
+                }
+            ).id
+            for index in range(6)
+        ]
+        db.session.expunge_all()
+        return ids
+
+    def category_reads(self, sql_statements):
+        return [s for s in sql_statements if "FROM categories" in s]
+
+    def test_list_loads_categories_in_one_query(
+        self, authenticated_client, url, expense_ids, sql_statements
+    ):
+        sql_statements.clear()
+        response = authenticated_client.get(
+            url, query_string={"include": "category", "limit": 4}
+        )
+        assert response.status_code == HTTPStatus.OK
+        data = response.get_json()
+        assert [e["category"]["name"] for e in data["data"]] == [
+            "Travel",
+            "Food",
+            "Travel",
+            "Food",
+        ]
+        assert data["data"][0]["category"]["color"] == "#00ff00"
+        assert len(self.category_reads(sql_statements)) == 1
+        assert "include=category" in data["next_url"]
+
+        data = authenticated_client.get(url).get_json()
+        assert "category" not in data["data"][0]
+
+    def test_sparse_fields_with_category(
+        self, authenticated_client, url, expense_ids, sql_statements
+    ):
+        sql_statements.clear()
+        data = authenticated_client.get(
+            url, query_string={"include": "category", "fields": "amount"}
+        ).get_json()
+        first = data["data"][0]
+        assert set(first) == {"amount", "category"}
+        assert (first["amount"], first["category"]["name"]) == (6.0, "Travel")
+        assert len(self.category_reads(sql_statements)) == 1
+
+    def test_detail(
+        self, authenticated_client, url, expense_ids, sql_statements
+    ):
+        sql_statements.clear()
+        data = authenticated_client.get(
+            f"{url}{expense_ids[0]}", query_string={"include": "category"}
+        ).get_json()
+        assert data["category"]["name"] == "Food"
+        # Joined to the expense query rather than loaded separately.
+        assert self.category_reads(sql_statements) == []
+        assert any("JOIN categories" in s for s in sql_statements)
+        data = authenticated_client.get(f"{url}{expense_ids[0]}").get_json()
+        assert "category" not in data
+
+    def test_lazy_loads_raise_in_tests(self, expense_ids):
+        expense = Expense.get_by_id(expense_ids[0])
+        with pytest.raises(InvalidRequestError, match="lazy='raise'"):
+            expense.category
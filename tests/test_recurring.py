@@ -0,0 +1,194 @@
+import pytest
+from datetime import datetime
+from http import HTTPStatus
+from sqlalchemy import select
+
+from src.extensions import db
+from src.models.categories import Category
+from src.models.expenses import Expense
+from src.models.recurring import RecurringExpense, occurrence
+from src.models.rollups import DailyExpenseRollup
+
+
+class TestRecurringExpenses:
+    @pytest.fixture
+    def url(self, test_user):
+        return f"/users/{test_user.id}/recurring-expenses/"
+
+    @pytest.fixture
+    def category_id(self, test_db, test_user):
+        return Category.create({"name": "Bills", "user_id": test_user.id}).id
+
+    def rule(self, test_user, category_id, **values):
+        return RecurringExpense.create(
+            {
+                "amount": "1200.00",
+                "note": "Rent",
+                "category_id": category_id,
+                "user_id": test_user.id,
+                "frequency": "monthly",
+                "starts_at": datetime(2024, 1, 31, 9),
+                **values,
+            }
+        )
+
+    def expenses(self, test_user):
+        return db.session.execute(
+            select(Expense.created_at, Expense.recurring_expense_id)
+            .where(Expense.user_id == test_user.id)
+            .order_by(Expense.created_at)
+        ).all()
+
+    def test_month_end_occurrences(self):
+        start = datetime(2024, 1, 31, 9)
+        assert [occurrence(start, "monthly", 1, i) for i in range(4)] == [
+            datetime(2024, 1, 31, 9),
+            datetime(2024, 2, 29, 9),
+            datetime(2024, 3, 31, 9),
+            datetime(2024, 4, 30, 9),
+        ]
+        assert occurrence(start, "weekly", 2, 1) == datetime(2024, 2, 14, 9)
+        assert occurrence(start, "yearly", 1, 1) == datetime(2025, 1, 31, 9)
+
+    def test_create_and_list(self, authenticated_client, url, category_id):
+        response = authenticated_client.post(
+            url,
+            json={
+                "amount": 9.99,
+                "note": "Music",
+                "category_id": category_id,
+                "frequency": "monthly",
+                "starts_at": "2024-03-01T08:00:00+02:00",
+            },
+        )
+        assert response.status_code == HTTPStatus.CREATED
+        data = response.get_json()
+        assert data["amount"] == 9.99
+        assert data["interval"] == 1
+        assert data["next_run_at"] == "2024-03-01T06:00:00"
+        listed = authenticated_client.get(url).get_json()
+        assert [rule["id"] for rule in listed] == [data["id"]]
+
+    def test_create_rejects_bad_rules(
+        self, authenticated_client, url, category_id
+    ):
+        rule = {
+            "amount": 5,
+            "category_id": category_id,
+            "frequency": "hourly",
+            "starts_at": "2024-03-01T08:00:00",
+            "until": "2024-02-01T08:00:00",
+        }
+        response = authenticated_client.post(url, json=rule)
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        assert set(response.get_json()["details"]["json"]) == {"frequency"}
+        response = authenticated_client.post(
+            url, json={**rule, "frequency": "daily"}
+        )
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        assert "until" in response.get_json()["details"]["json"]
+        del rule["until"]
+        response = authenticated_client.post(
+            url, json={**rule, "frequency": "daily", "category_id": 999}
+        )
+        assert response.status_code == HTTPStatus.NOT_FOUND
+
+    def test_scheduler_catches_up_and_is_idempotent(
+        self, test_user, category_id
+    ):
+        rule = self.rule(test_user, category_id)
+        now = datetime(2024, 4, 15)
+        assert RecurringExpense.materialize_due(now) == (1, 3)
+        assert [created_at for created_at, _ in self.expenses(test_user)] == [
+            datetime(2024, 1, 31, 9),
+            datetime(2024, 2, 29, 9),
+            datetime(2024, 3, 31, 9),
+        ]
+        db.session.refresh(rule)
+        assert rule.occurrences == 3
+        assert rule.next_run_at == datetime(2024, 4, 30, 9)
+        assert RecurringExpense.materialize_due(now) == (0, 0)
+
+        # A rerun of already-entered occurrences inserts nothing.
+        rule.update(
+            {"occurrences": 1, "next_run_at": datetime(2024, 2, 29, 9)},
+            commit=True,
+        )
+        assert RecurringExpense.materialize_due(now) == (1, 0)
+        assert len(self.expenses(test_user)) == 3
+        assert DailyExpenseRollup.verify() == []
+
+    def test_scheduler_batches_and_stops_at_until(
+        self, test_user, category_id, sql_statements
+    ):
+        for day in range(1, 6):
+            self.rule(
+                test_user,
+                category_id,
+                frequency="daily",
+                starts_at=datetime(2024, 1, day),
+                until=datetime(2024, 1, 6),
+            )
+        finished = self.rule(test_user, category_id)
+        finished.soft_delete(commit=True)
+        sql_statements.clear()
+        assert RecurringExpense.materialize_due(
+            datetime(2024, 2, 1), batch_size=2
+        ) == (5, 6 + 5 + 4 + 3 + 2)
+        # Three batches and a last empty SELECT, not a query per rule.
+        due_selects = [
+            s for s in sql_statements if s.startswith("SELECT recurring")
+        ]
+        assert len(due_selects) == 4
+        rules = RecurringExpense.query.order_by(RecurringExpense.id).all()
+        assert [rule.next_run_at for rule in rules] == [None] * 6
+        assert len(self.expenses(test_user)) == 20
+        assert DailyExpenseRollup.verify() == []
+
+    def test_scheduler_caps_occurrences_per_batch(
+        self, test_user, category_id, sql_statements
+    ):
+        rule = self.rule(
+            test_user,
+            category_id,
+            frequency="daily",
+            starts_at=datetime(2024, 1, 1, 9),
+        )
+        sql_statements.clear()
+        assert RecurringExpense.materialize_due(
+            datetime(2024, 1, 10), max_occurrences=4
+        ) == (3, 9)
+        inserts = [s for s in sql_statements if s.startswith("INSERT")]
+        assert len([s for s in inserts if "INTO expenses" in s]) == 3
+        db.session.refresh(rule)
+        assert rule.occurrences == 9
+        assert rule.next_run_at == datetime(2024, 1, 10, 9)
+        assert len(self.expenses(test_user)) == 9
+        assert DailyExpenseRollup.verify() == []
+
+    def test_scheduler_skips_inactive_users(self, test_user, category_id):
+        rule = self.rule(test_user, category_id)
+        test_user.deactivate(commit=True)
+        assert RecurringExpense.materialize_due(datetime(2024, 4, 1)) == (0, 0)
+        test_user.active = True
+        test_user.soft_delete(commit=True)
+        assert RecurringExpense.materialize_due(datetime(2024, 4, 1)) == (0, 0)
+        db.session.refresh(rule)
+        assert rule.next_run_at == datetime(2024, 1, 31, 9)
+        assert self.expenses(test_user) == []
+
+    def test_run_scheduler_command(self, app, test_user, category_id):
+        self.rule(test_user, category_id, starts_at=datetime(2024, 1, 1))
+        result = app.test_cli_runner().invoke(args=["run-scheduler"])
+        assert result.exit_code == 0, result.output
+        assert "Ran 1 recurring rules" in result.output
+
+    def test_delete_stops_the_rule(
+        self, authenticated_client, url, test_user, category_id
+    ):
+        rule = self.rule(test_user, category_id)
+        response = authenticated_client.delete(f"{url}{rule.id}")
+        assert response.status_code == HTTPStatus.NO_CONTENT
+        assert RecurringExpense.materialize_due(datetime(2024, 4, 1)) == (0, 0)
+        response = authenticated_client.get(f"{url}{rule.id}")
+        assert response.status_code == HTTPStatus.NOT_FOUND
@@ -0,0 +1,129 @@
+import json
+import pytest
+from datetime import datetime, timezone
+from marshmallow import Schema, fields
+
+from src.models.categories import Category
+from src.models.expenses import Expense
+from src.models.users import User
+from src.schemas.auth import UserSchema
+from src.schemas.categories import CategorySchema
+from src.schemas.compiled import compile_schema, json_response
+from src.schemas.expenses import ExpenseSchema
+
+
+class ExoticSchema(Schema):
+    id = fields.Int()
+    flag = fields.Bool()
+    price = fields.Float(as_string=True)
+    label = fields.Str(data_key="displayName")
+    renamed = fields.Int(attribute="source")
+    stamp = fields.DateTime(format="rfc")
+    fallback = fields.Str(dump_default="n/a")
+    tags = fields.List(fields.Str())
+    category = fields.Nested(CategorySchema(only=("id", "name")))
+    children = fields.Nested(lambda: ExoticSchema(only=("id",)), many=True)
+
+
+def assert_parity(schema, objs):
+    expected = schema.dump(objs, many=True)
+    actual = compile_schema(schema).dump_many(objs)
+    assert actual == expected
+    # Same keys in the same order, so the encoded bytes match even
+    # without sort_keys.
+    assert json.dumps(actual) == json.dumps(expected)
+    assert json_response(actual).data == json_response(expected).data
+
+
+class TestCompiledSchema:
+    @pytest.fixture
+    def expenses(self, test_db, test_user):
+        category = Category.create({"name": "Food", "user_id": test_user.id})
+        expenses = [
+            Expense(amount=12.5, note="Lunch", category_id=category.id),
+            Expense(amount=3, note=None, category_id=category.id),
+            Expense(amount=0.1, note="Ünïcødé", category_id=category.id),
+        ]
+        for expense in expenses:
+            expense.user_id = test_user.id
+            expense.save()
+        expenses[1].soft_delete(commit=True)
+        return expenses
+
+    def test_expense_schema_parity(self, expenses):
+        assert_parity(ExpenseSchema(), expenses)
+
+    def test_expense_schema_only_parity(self, expenses):
+        schema = ExpenseSchema(only=("id", "amount", "created_at"))
+        assert_parity(schema, expenses)
+
+    def test_category_schema_parity(self, expenses, test_db):
+        categories = test_db.session.query(Category).all()
+        assert_parity(CategorySchema(), categories)
+
+    def test_user_schema_parity(self, test_user, test_db):
+        assert_parity(UserSchema(), test_db.session.query(User).all())
+
+    def test_row_projection_parity(self, expenses, test_user):
+        columns = ["id", "amount_minor", "currency", "created_at"]
+        rows = Expense.filter_rows(columns, user_id=test_user.id)
+        assert_parity(ExpenseSchema(only=["id", "amount", "created_at"]), rows)
+
+    def test_mapping_with_missing_keys_parity(self):
+        objs = [
+            {"id": 1, "amount_minor": 100, "currency": "USD", "note": None},
+            {
+                "amount_minor": 250,
+                "currency": "JPY",
+                "created_at": datetime(2025, 1, 2, 3, 4, 5),
+            },
+            {},
+        ]
+        assert_parity(ExpenseSchema(), objs)
+
+    def test_fallback_fields_parity(self):
+        stamp = datetime(2025, 5, 6, 7, 8, 9, tzinfo=timezone.utc)
+        objs = [
+            {
+                "id": 1,
+                "flag": "yes",
+                "price": 9.99,
+                "label": "A",
+                "source": 7,
+                "stamp": stamp,
+                "tags": ["x", "y"],
+                "category": {"id": 3, "name": "Food", "color": "#fff"},
+                "children": [{"id": 2, "flag": False}],
+            },
+            {"id": 2, "flag": None, "category": None, "children": []},
+        ]
+        assert_parity(ExoticSchema(), objs)
+
+    def test_compiled_class_is_cached(self):
+        assert compile_schema(ExpenseSchema) is compile_schema(ExpenseSchema)
+        assert compile_schema(
+            ExpenseSchema, only=["id", "amount"]
+        ) is compile_schema(ExpenseSchema, only=["amount", "id"])
+
+
+class TestListResponses:
+    def test_expense_list_matches_marshmallow(
+        self, app, authenticated_client, test_user
+    ):
+        category_id = authenticated_client.post(
+            f"/users/{test_user.id}/categories/", json={"name": "Food"}
+        ).get_json()["id"]
+        for amount in (1.5, 2, 3.25):
+            authenticated_client.post(
+                f"/users/{test_user.id}/expenses/",
+                json={"amount": amount, "category_id": category_id},
+            )
+        response = authenticated_client.get(f"/users/{test_user.id}/expenses/")
+        expenses = Expense.filter(user_id=test_user.id)
+        expected = json_response(
+            {
+                "data": ExpenseSchema(many=True).dump(expenses),
+                "next_url": response.get_json()["next_url"],
+            }
+        )
+        assert response.data == expected.data